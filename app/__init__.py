@@ -7,6 +7,12 @@ Responsibilities:
 - Initializes the Flask app with configurations
 - Registers blueprints for modular route organization
 - Sets up Flask extensions (SQLAlchemy, LoginManager, CSRF, etc.)
+- Binds the buffered activity log writer, the password hashing pool and the
+  login / join throttle
+- Binds the cross-worker change bus and the live list event broadcaster (SSE)
+- Serves the Flask-Login user loader from a per-process cache
+- Binds the content-addressed upload storage
+- Registers custom `flask` CLI commands
 - Ensures necessary upload folders exist
 """
 
@@ -24,8 +30,17 @@ from .files.routes import files_bp
 # Configuration
 from .config import Config
 
+# CLI commands
+from .commands import register_commands
+
 # Extensions
 from app.extensions import db, bcrypt, login_manager, migrate, csrf
+from app.passwords import password_hasher
+from app.throttle import throttle
+from app.bus import change_bus
+from app.events import list_events
+from app.user_cache import user_cache
+from app.storage import upload_storage
 
 # Configure Flask-Login defaults
 login_manager.login_view = 'auth.auth'  # Redirect to this endpoint if not logged in
@@ -69,6 +84,12 @@ def create_app():
     login_manager.init_app(app)
     bcrypt.init_app(app)
     csrf.init_app(app)
+    password_hasher.init_app(app)
+    throttle.init_app(app)
+    change_bus.init_app(app)
+    list_events.init_app(app)
+    user_cache.init_app(app)
+    upload_storage.init_app(app)
 
     # Register route blueprints (modular structure)
     app.register_blueprint(main)
@@ -78,6 +99,9 @@ def create_app():
     app.register_blueprint(settings_bp, url_prefix='/settings')
     app.register_blueprint(files_bp, url_prefix='/files')
 
+    # Register `flask` CLI maintenance commands
+    register_commands(app)
+
     # Import models to ensure they are registered before migrations
     with app.app_context():
         from .models import User  # Only importing what's needed here
@@ -87,7 +111,8 @@ def create_app():
     def load_user(user_id):
         """
         Callback to reload the user object from the user ID stored in the session.
+        Served from the per-process cache (see app/user_cache.py).
         """
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
 
     return app  # Return the fully configured Flask app
@@ -14,8 +14,11 @@ from flask import Blueprint, render_template, url_for, flash, redirect, request
 from app.extensions import db
 from flask_login import login_user, current_user, logout_user
 from app.auth.forms import RegistrationForm, LoginForm
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import User
+from app.utils import unit_of_work, too_many_attempts
+from app.passwords import password_hasher
+from app.throttle import throttle
+import math
 
 # Define the authentication blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -43,14 +46,37 @@ def auth():
     register_form = RegistrationForm()
     action = request.form.get("action")  # Determines whether login or register was submitted
 
+    # Throttle login attempts before any hashing or database work. Only failed
+    # attempts count against the username, and only from this client.
+    login_attempt = f'{request.remote_addr}/{request.form.get("username", "").strip().lower()}'
+    if request.method == "POST" and action == "login":
+        retry_after = throttle.check(login_username=login_attempt) or throttle.hit(login_ip=request.remote_addr)
+        if retry_after:
+            flash(f"Too many login attempts. Try again in {math.ceil(retry_after)} seconds.", "danger")
+            return too_many_attempts(render_template(
+                "auth.html",
+                title="Get Started",
+                login_form=login_form,
+                register_form=register_form,
+                initial_active_tab='login'
+            ), retry_after)
+
     # Handle login submission
     if action == "login" and login_form.validate_on_submit():
         user = User.query.filter_by(username=login_form.username.data).first()
-        if user and check_password_hash(user.password, login_form.password.data):
+        valid, new_hash = False, None
+        if user:
+            valid, new_hash = password_hasher.verify_and_update(user.password, login_form.password.data)
+        if valid:
+            if new_hash:
+                # Stored hash predates the current hashing settings
+                with unit_of_work():
+                    user.password = new_hash
             login_user(user, remember=True)
             flash("You have been logged in!", "success")
             return redirect(url_for("main.dashboard"))
         else:
+            throttle.hit(login_username=login_attempt)
             flash("Login failed. Check username and/or password!", "danger")
 
     # Handle registration submission
@@ -59,18 +85,16 @@ def auth():
         if existing_user:
             flash("Username already exists. Please choose a different one.", "danger")
         else:
-            hashed_password = generate_password_hash(register_form.password.data)
-            user = User(
-                username=register_form.username.data,
-                name=register_form.name.data,
-                password=hashed_password,
-            )
-            db.session.add(user)
-            db.session.commit()
-
-            # Set DiceBear avatar as default
-            user.avatar_url = f'https://api.dicebear.com/7.x/initials/svg?seed={user.name}'
-            db.session.commit()
+            hashed_password = password_hasher.hash(register_form.password.data)
+            with unit_of_work():
+                user = User(
+                    username=register_form.username.data,
+                    name=register_form.name.data,
+                    password=hashed_password,
+                    # Set DiceBear avatar as default
+                    avatar_url=f'https://api.dicebear.com/7.x/initials/svg?seed={register_form.name.data}'
+                )
+                db.session.add(user)
 
             login_user(user)
             flash("Your account has been created successfully!", "success")
@@ -0,0 +1,143 @@
+"""
+avatars.py
+
+Processing of uploaded avatar images.
+
+Uploads are decoded, turned upright according to their EXIF orientation,
+center-cropped to a square and re-encoded at each of AVATAR_SIZES, as WebP and
+as a JPEG fallback. Nothing from the original file is kept, so EXIF data
+(camera, GPS position, ...) is dropped along with it.
+
+Variants are kept in the upload storage (app/storage.py) under the hash of
+the uploaded file, so an image that was uploaded before is not processed or
+stored again. The user's `avatar_url` then holds a pattern such as
+"avatars/<sha256>/{size}.{ext}", and `User.get_avatar_url()` picks the
+variant for the place the avatar is shown (AVATAR_CONTEXTS).
+
+Pillow is a required dependency; the app does not start without it.
+"""
+
+import io
+import os
+import re
+
+from PIL import Image, ImageOps
+
+AVATAR_SIZES = (32, 64, 256)
+
+# Variant shown in each place, chosen to cover its CSS size on high-density screens
+AVATAR_CONTEXTS = {
+    'thumb': 32,     # .profile-pic-thumb, 20px (item "added by" pills)
+    'table': 64,     # .avatar-in-table, 40px (member lists)
+    'profile': 64,   # .profile-pic-actual, 50px (dashboard)
+    'full': 256,     # settings preview
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+
+# Refuse images that would take more memory than this to decode (about 120 MB as RGB)
+AVATAR_MAX_PIXELS = 40_000_000
+
+# Avatars uploaded before the upload storage are files directly in the avatar folder,
+# and their avatar_url is the file's URL ("/files/uploads/avatars/<file>")
+LEGACY_AVATAR = re.compile(r'^/files/uploads/avatars/([^/]+)$')
+
+
+class AvatarError(ValueError):
+    """
+    The upload is not an image we can process.
+    """
+
+
+def variant_path(pattern, context='full', fmt='jpg'):
+    """
+    Fill an avatar pattern for a display context and format.
+    """
+    return pattern.format(size=AVATAR_CONTEXTS.get(context, AVATAR_SIZES[-1]), ext=fmt)
+
+
+def save_avatar(file_storage, storage):
+    """
+    Store an uploaded avatar in the upload storage, unless the same image is
+    stored already.
+
+    Returns:
+        (value for `User.avatar_url`, PendingBlob to `storage.acquire()` in the
+        unit of work that saves it). The value is a variant pattern relative
+        to the upload folder.
+
+    Raises:
+        AvatarError: The upload could not be decoded as an image.
+    """
+    digest, length = storage.digest(file_storage)
+    stream = file_storage.stream
+    key = f"avatars/{digest}"
+
+    def write():
+        stream.seek(0)
+        square = _load_square(stream)
+        for size in AVATAR_SIZES:
+            variant = square.resize((size, size), Image.Resampling.LANCZOS) if square.width != size else square
+            for ext, options in FORMATS.items():
+                buffer = io.BytesIO()
+                variant.save(buffer, **options)
+                buffer.seek(0)
+                storage.backend.put(f"{key}/{size}.{ext}", buffer)
+
+    return f"{key}/{{size}}.{{ext}}", storage.prepare(key, length, write)
+
+
+def legacy_avatar_files(avatar_url):
+    """
+    Names of the files in the avatar folder that belong to an avatar uploaded
+    before the upload storage; empty for any other avatar.
+    """
+    match = LEGACY_AVATAR.match(avatar_url or '')
+    if not match:
+        return []
+    return [match.group(1)]
+
+
+def delete_avatar(avatar_url, folder):
+    """
+    Remove the files of an avatar uploaded before the upload storage, if any.
+    Stored avatars are released instead and garbage-collected.
+    """
+    for name in legacy_avatar_files(avatar_url):
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+
+
+def _load_square(stream):
+    """
+    Decode an upload into an upright RGB image, center-cropped to a square no
+    larger than the biggest variant.
+    """
+    try:
+        image = Image.open(stream)
+        if image.width * image.height > AVATAR_MAX_PIXELS:
+            raise AvatarError("Image is too large.")
+        # Let JPEG decode at a reduced scale; a 12 MP photo never needs full resolution
+        image.draft('RGB', (AVATAR_SIZES[-1] * 2, AVATAR_SIZES[-1] * 2))
+        image = ImageOps.exif_transpose(image)
+    except AvatarError:
+        raise
+    except Exception as e:
+        raise AvatarError("Could not read the image.") from e
+
+    if image.mode in ('RGBA', 'LA', 'P', 'PA'):
+        # Flatten transparency onto white; JPEG has no alpha channel
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+
+    side = min(AVATAR_SIZES[-1], image.width, image.height)
+    return ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS, centering=(0.5, 0.5))
@@ -0,0 +1,396 @@
+"""
+bus.py
+
+Cross-worker change notifications.
+
+Every gunicorn worker is its own process, so in-process features (live list
+streams, caches) only see the writes that worker handled. Routes therefore
+announce each committed change on a shared bus as a small message:
+
+    {"household_id": 3, "entity": "list", "id": 12, "version": 7, "event": {...}}
+
+`event` is optional and carries the live-update payload for list viewers.
+
+Before the transaction commits, the bus bumps the version counter of every
+household and list named in its messages, once per row per transaction, and
+stamps the new value on the message. A household's version doubles as its
+change sequence (see `change_seq`). Any change in a household therefore moves
+`Household.version`; a change to a list or its items also moves
+`ShoppingList.version`; a change to a user ('user' entity) moves the versions
+of every list in their household, since items show who added them.
+Every worker, including the one that published, receives every message and
+passes it to the callbacks registered with `change_bus.subscribe()`.
+
+Backends (CHANGE_BUS_BACKEND):
+- postgres: NOTIFY inside the committing transaction, LISTEN on a dedicated
+  connection per worker. Notifications are delivered only if the commit succeeds.
+- file: append-only JSON-lines file tailed by each worker. A stand-in for
+  local development on SQLite; not meant for production.
+- local: deliver in-process only (single worker, tests, scripts).
+- auto (default): postgres on PostgreSQL, file otherwise.
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: the file backend runs without locking
+    fcntl = None
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Household, ShoppingList
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7900
+
+
+class LocalBackend:
+    """
+    Delivers messages straight to this process's subscribers.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def stage(self, session, messages):
+        pass
+
+    def send(self, messages):
+        for message in messages:
+            self.bus.dispatch(message)
+
+    def listen(self, stopping):
+        pass
+
+
+class FileBackend:
+    """
+    Shares messages between local processes through an append-only file.
+
+    Each message is one line written with O_APPEND, so lines from different
+    workers never interleave. Listeners tail the file from where it ended when
+    they started. The file is truncated once it grows past CHANGE_BUS_FILE_MAX_BYTES.
+    Publishers hold an exclusive flock over the size check, truncate and append,
+    and listeners a shared one while reading, so no publisher truncates the
+    file between another's check and its write, or under a listener.
+    """
+
+    def __init__(self, bus, path, max_bytes, poll_interval):
+        self.bus = bus
+        self.path = path
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def stage(self, session, messages):
+        pass
+
+    def send(self, messages):
+        data = ''.join(json.dumps(message) + '\n' for message in messages).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size > self.max_bytes:
+                os.ftruncate(fd, 0)
+            os.write(fd, data)
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def listen(self, stopping):
+        offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        pending = b''
+        while not stopping.is_set():
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size < offset:
+                # Truncated by a publisher: start again from the top
+                offset, pending = 0, b''
+            if size > offset:
+                with open(self.path, 'rb') as handle:
+                    if fcntl:
+                        fcntl.flock(handle, fcntl.LOCK_SH)
+                    handle.seek(offset)
+                    chunk = handle.read(size - offset)
+                offset += len(chunk)
+                *lines, pending = (pending + chunk).split(b'\n')
+                for line in lines:
+                    if line:
+                        self._dispatch(line)
+            stopping.wait(self.poll_interval)
+
+    def _dispatch(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            # A line torn by a truncate; the listener carries on with the next one
+            logging.warning(f"Change bus skipped an unreadable message {line[:200]!r}: {e}")
+            return
+        self.bus.dispatch(message)
+
+
+class PostgresBackend:
+    """
+    LISTEN/NOTIFY on PostgreSQL.
+
+    NOTIFY is issued in the same transaction as the change, so PostgreSQL
+    only delivers it once that transaction commits.
+    """
+
+    def __init__(self, bus, channel):
+        self.bus = bus
+        self.channel = channel
+
+    def stage(self, session, messages):
+        for message in messages:
+            payload = json.dumps(message)
+            if len(payload.encode('utf-8')) > NOTIFY_MAX_BYTES:
+                # Too big for NOTIFY: viewers are told to resync instead of getting the data
+                payload = json.dumps({**message, 'event': {'type': 'resync', 'data': {}}})
+            session.execute(db.text("SELECT pg_notify(:channel, :payload)"),
+                            {'channel': self.channel, 'payload': payload})
+
+    def send(self, messages):
+        pass
+
+    def listen(self, stopping):
+        while not stopping.is_set():
+            try:
+                connection = db.engine.raw_connection()
+                connection.detach()
+                driver_connection = connection.driver_connection
+                driver_connection.autocommit = True
+                with driver_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+
+                while not stopping.is_set():
+                    if select.select([driver_connection], [], [], 5)[0]:
+                        driver_connection.poll()
+                        while driver_connection.notifies:
+                            notification = driver_connection.notifies.pop(0)
+                            self._dispatch(notification.payload)
+            except Exception as e:
+                logging.exception(f"Change bus listener lost its connection, reconnecting: {e}")
+                stopping.wait(1)
+
+    def _dispatch(self, payload):
+        # A bad payload must not tear down the connection and drop the notifications behind it
+        try:
+            message = json.loads(payload)
+        except ValueError as e:
+            logging.warning(f"Change bus skipped an unreadable notification {payload[:200]!r}: {e}")
+            return
+        self.bus.dispatch(message)
+
+
+class ChangeBus:
+    """
+    Publishes committed changes to every worker and hands them to subscribers.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self._subscribers = []
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the bus to an app. The listener thread starts with the first
+        request handled by each worker process.
+        """
+        app.config.setdefault('CHANGE_BUS_BACKEND', 'auto')
+        app.config.setdefault('CHANGE_BUS_CHANNEL', 'shopping_changes')
+        app.config.setdefault('CHANGE_BUS_FILE', os.path.join(app.instance_path, 'change_bus.jsonl'))
+        app.config.setdefault('CHANGE_BUS_FILE_MAX_BYTES', 1024 * 1024)
+        app.config.setdefault('CHANGE_BUS_POLL_INTERVAL', 0.2)
+
+        self.app = app
+        self.backend = None
+        app.extensions['change_bus'] = self
+        app.before_request(self.ensure_listening)
+
+    def _get_backend(self):
+        if self.backend is None:
+            config = self.app.config
+            name = config['CHANGE_BUS_BACKEND']
+            if name == 'auto':
+                with self.app.app_context():
+                    name = 'postgres' if db.engine.dialect.name == 'postgresql' else 'file'
+
+            if name == 'postgres':
+                self.backend = PostgresBackend(self, config['CHANGE_BUS_CHANNEL'])
+            elif name == 'file':
+                self.backend = FileBackend(self, config['CHANGE_BUS_FILE'],
+                                           config['CHANGE_BUS_FILE_MAX_BYTES'], config['CHANGE_BUS_POLL_INTERVAL'])
+            elif name == 'local':
+                self.backend = LocalBackend(self)
+            else:
+                raise ValueError(f"Unknown CHANGE_BUS_BACKEND '{name}'")
+        return self.backend
+
+    def subscribe(self, callback):
+        """
+        Call `callback(message)` for every change published by any worker.
+        Callbacks run on the listener thread and must be quick.
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def dispatch(self, message):
+        for callback in list(self._subscribers):
+            try:
+                callback(message)
+            except Exception as e:
+                logging.exception(f"Change bus subscriber failed on {message}: {e}")
+
+    def ensure_listening(self):
+        """
+        Start the listener thread if this process does not have one yet.
+        Checks the PID so that each forked gunicorn worker gets its own thread.
+        """
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        if isinstance(self._get_backend(), LocalBackend):
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='change-bus', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            self._get_backend().listen(self._stopping)
+
+    def stop(self):
+        self._stopping.set()
+
+
+# Shared bus instance, bound to the app in create_app()
+change_bus = ChangeBus()
+
+
+def notify_change(household_id, entity, entity_id, version=None, event=None):
+    """
+    Announce a change to every worker once the current transaction commits.
+
+    Args:
+        household_id (int): Household the changed row belongs to.
+        entity (str): Kind of row, e.g. 'list', 'household', 'user'.
+        entity_id (int): Primary key of the changed row.
+        version (int, optional): Row version after the change. Filled in at
+            commit time from the household / list version counters when omitted.
+        event (dict, optional): Live-update payload ({"type": ..., "data": {...}}).
+    """
+    message = {'household_id': household_id, 'entity': entity, 'id': entity_id, 'version': version}
+    if event is not None:
+        message['event'] = event
+    db.session.info.setdefault('change_messages', []).append(message)
+
+
+def change_seq(household_id):
+    """
+    The household's change sequence number for the current transaction.
+
+    Bumps `Household.version` on first use and returns the same value for the
+    rest of the transaction; rows changed in it are stamped with this number
+    (`changed_seq`). The UPDATE holds the household row lock until commit, so
+    a household's sequence numbers become visible in order.
+    """
+    seqs = db.session.info.setdefault('change_seqs', {})
+    if household_id not in seqs:
+        seqs[household_id] = db.session.execute(
+            db.update(Household)
+            .where(Household.id == household_id)
+            .values(version=Household.version + 1)
+            .returning(Household.version)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+    return seqs[household_id]
+
+
+def _bump_versions(session, messages):
+    """
+    Increment the version counters named by `messages` and fill in their
+    `version` (the list's for 'list' messages, the household's otherwise).
+    Lists take one UPDATE ... RETURNING whatever the number of messages;
+    households reuse the transaction's change sequence.
+    """
+    household_ids = {message['household_id'] for message in messages if message['household_id']}
+    list_ids = {message['id'] for message in messages if message['entity'] == 'list'}
+    user_household_ids = {message['household_id'] for message in messages
+                          if message['entity'] == 'user' and message['household_id']}
+
+    list_criteria = []
+    if list_ids:
+        list_criteria.append(ShoppingList.id.in_(list_ids))
+    if user_household_ids:
+        list_criteria.append(ShoppingList.household_id.in_(user_household_ids))
+
+    versions = {}
+    if list_criteria:
+        rows = session.execute(
+            db.update(ShoppingList)
+            .where(db.or_(*list_criteria))
+            .values(version=ShoppingList.version + 1)
+            .returning(ShoppingList.id, ShoppingList.version)
+            .execution_options(synchronize_session=False)
+        )
+        versions.update((('list', row_id), version) for row_id, version in rows)
+    for household_id in household_ids:
+        versions['household', household_id] = change_seq(household_id)
+
+    for message in messages:
+        if message['version'] is None:
+            key = ('list', message['id']) if message['entity'] == 'list' else ('household', message['household_id'])
+            message['version'] = versions.get(key)
+
+
+@event.listens_for(Session, 'before_commit')
+def _stage_change_messages(session):
+    messages = session.info.get('change_messages')
+    if messages:
+        # Stamp pending ORM changes first, so the whole transaction shares one sequence number
+        session.flush()
+        _bump_versions(session, messages)
+        change_bus._get_backend().stage(session, messages)
+
+
+@event.listens_for(Session, 'after_commit')
+def _send_change_messages(session):
+    session.info.pop('change_seqs', None)
+    messages = session.info.pop('change_messages', None)
+    if messages:
+        # The change is already committed: a failed announcement is logged, not raised
+        # into the request that made it
+        try:
+            change_bus._get_backend().send(messages)
+        except Exception as e:
+            logging.exception(f"Change bus could not publish {len(messages)} committed change(s): {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_change_messages(session):
+    session.info.pop('change_seqs', None)
+    session.info.pop('change_messages', None)
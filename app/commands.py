@@ -0,0 +1,340 @@
+"""
+commands.py
+
+Custom `flask` CLI commands for maintenance tasks.
+
+Commands:
+- flask lists recount: Rebuild the cached item counters on every shopping list
+- flask lists prune-tombstones: Delete sync tombstones past their retention age
+- flask explain-queries: Print the query plan of every hot query path
+- flask activity compact: Archive old activity rows and roll them up into daily summaries
+- flask uploads gc: Delete stored uploads and legacy avatar files that are no longer referenced
+"""
+
+import gzip
+import json
+import os
+import time as clock
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.orm import configure_mappers
+from tzlocal import get_localzone
+from app.extensions import db
+from app.models import User, Household, ShoppingList, ListItem, ActivityLog, SyncTombstone
+from app.storage import upload_storage
+from app.avatars import legacy_avatar_files
+from app.shopping_lists.routes import item_page_query
+
+tz = get_localzone()
+
+lists_cli = AppGroup('lists', help='Shopping list maintenance commands.')
+activity_cli = AppGroup('activity', help='Activity log maintenance commands.')
+uploads_cli = AppGroup('uploads', help='Upload storage maintenance commands.')
+
+# action_type of the rows that replace compacted activity
+SUMMARY_ACTION = "Daily Summary"
+
+
+@lists_cli.command('recount')
+def recount_lists():
+    """
+    Recompute items_count and purchased_items_count for every list from scratch.
+
+    The counters are normally kept up to date incrementally; this is the
+    repair path if they ever drift (e.g. after manual database edits).
+    Version counters are bumped as well, so cached pages are revalidated.
+    """
+    items_total = (
+        db.select(db.func.count(ListItem.id))
+        .where(ListItem.shoppinglist_id == ShoppingList.id)
+        .scalar_subquery()
+    )
+    purchased_total = (
+        db.select(db.func.count(ListItem.id))
+        .where(ListItem.shoppinglist_id == ShoppingList.id, ListItem.purchased.is_(True))
+        .scalar_subquery()
+    )
+
+    result = db.session.execute(
+        db.update(ShoppingList)
+        .values(items_count=items_total, purchased_items_count=purchased_total, version=ShoppingList.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(db.update(Household).values(version=Household.version + 1))
+    db.session.commit()
+
+    click.echo(f"Recounted items on {result.rowcount} shopping lists.")
+
+
+@lists_cli.command('prune-tombstones')
+@click.option('--older-than', 'older_than', type=int, default=None,
+              help='Age in days after which tombstones are deleted [default: SYNC_TOMBSTONE_RETENTION_DAYS].')
+def prune_tombstones(older_than):
+    """
+    Delete sync tombstones older than the retention age.
+
+    /shopping/sync sends clients whose cursor is older than
+    SYNC_TOMBSTONE_RETENTION_DAYS a full resync, so they never need these.
+    """
+    if older_than is None:
+        older_than = current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS']
+    cutoff = datetime.now(tz) - timedelta(days=older_than)
+
+    result = db.session.execute(
+        db.delete(SyncTombstone)
+        .where(SyncTombstone.deleted_at < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    click.echo(f"Deleted {result.rowcount} sync tombstones older than {older_than} days.")
+
+
+def hot_queries(household_id=1, list_id=1):
+    """
+    The queries issued on every page view, keyed by a short description.
+    Each one should be served by an index added in the hot-path migration.
+    """
+    # Backref attributes (ListItem.added_by) only exist once the mappers are configured
+    configure_mappers()
+    return {
+        # The statement the route runs, so the two cannot drift apart
+        "view_list: items of a list": item_page_query(list_id),
+        "dashboard: recent activity": (
+            db.select(ActivityLog)
+            .where(ActivityLog.household_id == household_id)
+            .order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc())
+            .limit(5)
+        ),
+        "dashboard: household lists": (
+            db.select(ShoppingList)
+            .where(ShoppingList.household_id == household_id)
+            .order_by(ShoppingList.created_at.desc())
+        ),
+        "create_list: duplicate name check": (
+            db.select(ShoppingList)
+            .where(db.func.lower(ShoppingList.name) == 'groceries', ShoppingList.household_id == household_id)
+            .limit(1)
+        ),
+        "household pages: members": (
+            db.select(User)
+            .where(User.household_id == household_id)
+        ),
+    }
+
+
+@click.command('explain-queries')
+@with_appcontext
+@click.option('--household-id', default=1, show_default=True, help='Household id used in the sample queries.')
+@click.option('--list-id', default=1, show_default=True, help='Shopping list id used in the sample queries.')
+def explain_queries(household_id, list_id):
+    """
+    Print EXPLAIN output for each hot query on the configured database.
+
+    Supports SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN). Plans
+    that still contain a full table scan are flagged.
+    """
+    dialect = db.engine.dialect
+    if dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif dialect.name == 'postgresql':
+        prefix = 'EXPLAIN '
+    else:
+        raise click.ClickException(f"EXPLAIN is not supported for the '{dialect.name}' dialect.")
+
+    for description, statement in hot_queries(household_id, list_id).items():
+        sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        rows = db.session.execute(db.text(prefix + sql)).all()
+        plan = [row[-1] for row in rows]
+
+        # SQLite reports "SCAN <table>" without "USING INDEX" for full scans; Postgres uses "Seq Scan"
+        full_scan = any(
+            ('SCAN' in line and 'USING' not in line) if dialect.name == 'sqlite' else 'Seq Scan' in line
+            for line in plan
+        )
+
+        click.echo(f"== {description}{'  [FULL SCAN]' if full_scan else ''}")
+        click.echo(sql)
+        for line in plan:
+            click.echo(f"    {line}")
+        click.echo()
+
+
+def _local_day(moment):
+    """
+    Calendar day of a timestamp in the server's timezone. SQLite hands back
+    naive local datetimes, PostgreSQL aware ones.
+    """
+    return (moment.astimezone(tz) if moment.tzinfo else moment).date()
+
+
+def _merge_summaries(batch):
+    """
+    Fold one batch of raw activity rows into the daily summary rows.
+
+    Each (household, day) gets a single SUMMARY_ACTION row timestamped at
+    local midnight, with per-action counts in `details`. Days that span
+    several batches (or runs) update the summary that already exists.
+    """
+    counts = defaultdict(Counter)
+    for row in batch:
+        counts[(row.household_id, _local_day(row.timestamp))][row.action_type] += 1
+
+    household_ids = {household_id for household_id, _ in counts}
+    admins = dict(db.session.execute(
+        db.select(Household.id, Household.admin_id).where(Household.id.in_(household_ids))
+    ).all())
+
+    for (household_id, day), actions in counts.items():
+        day_start = datetime.combine(day, time.min, tzinfo=tz)
+        summary = ActivityLog.query.filter_by(
+            household_id=household_id, action_type=SUMMARY_ACTION, timestamp=day_start
+        ).first()
+
+        if summary is None:
+            # Summary rows need an owner; they are attributed to the household admin
+            summary = ActivityLog(user_id=admins[household_id], household_id=household_id,
+                                  action_type=SUMMARY_ACTION, timestamp=day_start)
+            db.session.add(summary)
+
+        merged = Counter((summary.details or {}).get('actions', {}))
+        merged.update(actions)
+        # JSON columns are not change-tracked in place, so assign a new dict
+        summary.details = {
+            'date': day.isoformat(),
+            'total': sum(merged.values()),
+            'actions': dict(merged),
+        }
+
+
+@activity_cli.command('compact')
+@click.option('--older-than', 'older_than', type=int, default=None,
+              help='Age in days after which rows are compacted [default: ACTIVITY_RETENTION_DAYS].')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows archived and deleted per transaction [default: ACTIVITY_COMPACT_BATCH_SIZE].')
+@click.option('--archive-dir', type=click.Path(file_okay=False), default=None,
+              help='Folder for the .jsonl.gz archives [default: ACTIVITY_ARCHIVE_FOLDER].')
+@click.option('--pause', type=float, default=0.0, show_default=True,
+              help='Seconds to sleep between batches to leave room for other writers.')
+def compact_activity(older_than, batch_size, archive_dir, pause):
+    """
+    Archive, summarise and delete activity rows older than the retention age.
+
+    Works through old rows in id order, one bounded batch per transaction:
+    the raw rows are appended to a gzip-compressed JSON-lines archive (and
+    flushed to disk) first, then folded into per-household daily summary
+    rows, then deleted by id. Short transactions keep the table available to
+    the app while a large backlog is processed.
+    """
+    config = current_app.config
+    older_than = config['ACTIVITY_RETENTION_DAYS'] if older_than is None else older_than
+    batch_size = batch_size or config['ACTIVITY_COMPACT_BATCH_SIZE']
+    archive_dir = archive_dir or config['ACTIVITY_ARCHIVE_FOLDER'] or os.path.join(current_app.instance_path, 'activity_archive')
+
+    # Whole days only, so a day is never split between raw rows and its summary
+    cutoff = datetime.combine((datetime.now(tz) - timedelta(days=older_than)).date(), time.min, tzinfo=tz)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_path = os.path.join(archive_dir, f"activity-{datetime.now(tz):%Y%m%dT%H%M%S%f}.jsonl.gz")
+
+    columns = (ActivityLog.id, ActivityLog.user_id, ActivityLog.household_id,
+               ActivityLog.action_type, ActivityLog.timestamp, ActivityLog.details)
+    total = 0
+    last_id = 0
+
+    # 'xb' never overwrites an earlier archive
+    with open(archive_path, 'xb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+        while True:
+            batch = db.session.execute(
+                db.select(*columns)
+                .where(ActivityLog.timestamp < cutoff,
+                       ActivityLog.action_type != SUMMARY_ACTION,
+                       ActivityLog.id > last_id)
+                .order_by(ActivityLog.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+
+            for row in batch:
+                archive.write(json.dumps({
+                    'id': row.id,
+                    'user_id': row.user_id,
+                    'household_id': row.household_id,
+                    'action_type': row.action_type,
+                    'timestamp': row.timestamp.isoformat(),
+                    'details': row.details,
+                }).encode('utf-8') + b'\n')
+            # Rows must be safely on disk before they are deleted
+            archive.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+            try:
+                _merge_summaries(batch)
+                db.session.execute(
+                    db.delete(ActivityLog)
+                    .where(ActivityLog.id.in_([row.id for row in batch]))
+                    .execution_options(synchronize_session=False)
+                )
+                # The activity feeds of these households changed
+                db.session.execute(
+                    db.update(Household)
+                    .where(Household.id.in_({row.household_id for row in batch}))
+                    .values(version=Household.version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            total += len(batch)
+            last_id = batch[-1].id
+            click.echo(f"Compacted {total} rows...")
+            if pause:
+                clock.sleep(pause)
+
+    if total == 0:
+        os.remove(archive_path)
+        click.echo(f"No activity older than {cutoff:%Y-%m-%d} to compact.")
+        return
+
+    click.echo(f"Compacted {total} activity rows older than {cutoff:%Y-%m-%d}; archived to {archive_path}.")
+
+
+@uploads_cli.command('gc')
+@click.option('--grace-hours', 'grace_hours', type=float, default=None,
+              help='Hours a blob must have been unreferenced before it is deleted [default: UPLOAD_GC_GRACE_HOURS].')
+def collect_uploads(grace_hours):
+    """
+    Delete stored uploads without references, e.g. replaced avatars.
+
+    Also removes objects that never got a blob row (requests that failed
+    half-way), and avatar files from before the upload storage that no user
+    refers to. The grace period keeps uploads still in flight safe.
+    """
+    grace = timedelta(hours=grace_hours) if grace_hours is not None else None
+    deleted, stray = upload_storage.collect(grace)
+
+    # No new legacy avatars are written, so this set can only shrink while the pass runs
+    avatar_urls = db.session.scalars(db.select(User.avatar_url).where(User.avatar_url.like('/files/uploads/avatars/%'))).all()
+    db.session.rollback()
+    keep = {name for avatar_url in avatar_urls for name in legacy_avatar_files(avatar_url)}
+    legacy = upload_storage.collect_legacy('avatars', keep, grace)
+
+    click.echo(f"Deleted {deleted} unreferenced uploads, {stray} stray uploads and {legacy} unused legacy avatars.")
+
+
+def register_commands(app):
+    """
+    Attach all CLI command groups to the app.
+    """
+    app.cli.add_command(lists_cli)
+    app.cli.add_command(activity_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(explain_queries)
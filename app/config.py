@@ -26,3 +26,71 @@ class Config:
 
     # Allowed file extensions for image uploads
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+    # Activity log retention (flask activity compact)
+    # Rows older than ACTIVITY_RETENTION_DAYS are archived, rolled into daily summaries and deleted
+    ACTIVITY_RETENTION_DAYS = int(os.environ.get('ACTIVITY_RETENTION_DAYS', 90))
+    ACTIVITY_COMPACT_BATCH_SIZE = int(os.environ.get('ACTIVITY_COMPACT_BATCH_SIZE', 1000))
+    # Where compressed JSON-lines archives are written (defaults to <instance>/activity_archive)
+    ACTIVITY_ARCHIVE_FOLDER = os.environ.get('ACTIVITY_ARCHIVE_FOLDER')
+
+    # Live list updates (Server-Sent Events)
+    # Each open stream holds a worker thread, so gunicorn.conf.py runs threaded workers. A worker
+    # process serves at most LIST_EVENTS_MAX_STREAMS streams (503 beyond that); keep it below the
+    # gunicorn thread count. Streams end after LIST_EVENTS_MAX_AGE seconds and the browser reconnects.
+    LIST_EVENTS_HEARTBEAT = int(os.environ.get('LIST_EVENTS_HEARTBEAT', 15))
+    LIST_EVENTS_MAX_AGE = int(os.environ.get('LIST_EVENTS_MAX_AGE', 300))
+    LIST_EVENTS_MAX_STREAMS = int(os.environ.get('LIST_EVENTS_MAX_STREAMS', 8))
+
+    # Cross-worker change bus: 'postgres' (LISTEN/NOTIFY), 'file' (local stand-in),
+    # 'local' (single process) or 'auto' to pick postgres or file from the database URI
+    CHANGE_BUS_BACKEND = os.environ.get('CHANGE_BUS_BACKEND', 'auto')
+    CHANGE_BUS_CHANNEL = os.environ.get('CHANGE_BUS_CHANNEL', 'shopping_changes')
+
+    # Delta sync (/shopping/sync): tombstones of deleted lists and items are kept this
+    # long (flask lists prune-tombstones); older sync cursors get a full resync
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+    # Password hashing (see app/passwords.py): 'bcrypt', 'scrypt' or 'pbkdf2'. PASSWORD_HASH_COST is
+    # the bcrypt log rounds / scrypt N / pbkdf2 iterations (empty for the default). Stored hashes are
+    # upgraded to these settings when their owner next logs in.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'bcrypt')
+    PASSWORD_HASH_COST = int(os.environ['PASSWORD_HASH_COST']) if os.environ.get('PASSWORD_HASH_COST') else None
+    # Hashes run on a bounded pool so they cannot take every core: 'thread', 'process' or 'inline'.
+    # The pool is per worker process: N gunicorn workers can hash N * PASSWORD_HASH_WORKERS at once.
+    PASSWORD_HASH_POOL = os.environ.get('PASSWORD_HASH_POOL', 'thread')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+    # Throttling of login and join-code attempts (see app/throttle.py). Limits are "<count>/<period>"
+    # token buckets per client IP, per join code and per client + username (failed logins only).
+    # 'memory' counts per worker process; 'redis' shares the buckets between workers
+    THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1') == '1'
+    THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND', 'memory')
+    THROTTLE_REDIS_URL = os.environ.get('THROTTLE_REDIS_URL', 'redis://localhost:6379/0')
+    THROTTLE_LOGIN_PER_IP = os.environ.get('THROTTLE_LOGIN_PER_IP', '30/minute')
+    THROTTLE_LOGIN_PER_USERNAME = os.environ.get('THROTTLE_LOGIN_PER_USERNAME', '5/minute')
+    THROTTLE_JOIN_PER_IP = os.environ.get('THROTTLE_JOIN_PER_IP', '10/minute')
+    THROTTLE_JOIN_PER_CODE = os.environ.get('THROTTLE_JOIN_PER_CODE', '5/minute')
+
+    # Per-process cache of the logged-in user and their household (Flask-Login user loader).
+    # Entries live USER_CACHE_TTL seconds (0 disables the cache); at most USER_CACHE_SIZE are kept
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+    # Upload storage (see app/storage.py): 'local' (files below UPLOAD_STORAGE_PATH, default the
+    # upload folder) or 's3' (any S3-compatible server; needs boto3 and AWS_* credentials).
+    # Uploads are streamed and cut off with 413 past UPLOAD_MAX_BYTES
+    UPLOAD_STORAGE_BACKEND = os.environ.get('UPLOAD_STORAGE_BACKEND', 'local')
+    UPLOAD_STORAGE_PATH = os.environ.get('UPLOAD_STORAGE_PATH')
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+    UPLOAD_S3_BUCKET = os.environ.get('UPLOAD_S3_BUCKET')
+    UPLOAD_S3_PREFIX = os.environ.get('UPLOAD_S3_PREFIX', '')
+    # e.g. http://localhost:9000 for a local MinIO
+    UPLOAD_S3_ENDPOINT_URL = os.environ.get('UPLOAD_S3_ENDPOINT_URL')
+    UPLOAD_S3_REGION = os.environ.get('UPLOAD_S3_REGION')
+    # Unreferenced uploads are deleted by `flask uploads gc` once they are this old
+    UPLOAD_GC_GRACE_HOURS = float(os.environ.get('UPLOAD_GC_GRACE_HOURS', 24))
+    # Who sends stored upload bytes: 'app', or the front proxy via 'x-accel-redirect' (nginx; map
+    # UPLOAD_ACCEL_PREFIX to the storage in an `internal` location) or 'x-sendfile' (local storage only)
+    UPLOAD_SERVE_MODE = os.environ.get('UPLOAD_SERVE_MODE', 'app')
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '/_uploads/')
@@ -0,0 +1,164 @@
+"""
+events.py
+
+Live list updates over Server-Sent Events.
+
+Routes call `publish_list_event` inside their unit of work. Events travel on
+the change bus (app/bus.py), which only sends them once the transaction
+commits (and drops them on rollback), so viewers never see changes that did
+not happen, and delivers them to every worker.
+
+ListEventBroadcaster keeps one bounded queue per open `/events` stream and
+fans each committed event out to the streams watching that list. Streams
+send a comment line every LIST_EVENTS_HEARTBEAT seconds so proxies keep the
+connection open, and end after LIST_EVENTS_MAX_AGE seconds; the browser's
+EventSource reconnects on its own.
+
+Each worker's broadcaster subscribes to the bus, so a stream sees changes made
+through any worker.
+
+Every open stream holds a worker thread for its whole life, so the app is
+served by threaded gunicorn workers (gunicorn.conf.py). A process accepts at
+most LIST_EVENTS_MAX_STREAMS streams at a time and answers 503 beyond that,
+which keeps threads free for ordinary requests; view_list.js then tries again
+later.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from flask_login import current_user
+
+from app.bus import change_bus, notify_change
+
+
+class ListEventBroadcaster:
+    """
+    Fans committed list events out to the SSE streams of that list.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the broadcaster to an app and read its settings.
+        """
+        app.config.setdefault('LIST_EVENTS_HEARTBEAT', 15)
+        app.config.setdefault('LIST_EVENTS_MAX_AGE', 300)
+        app.config.setdefault('LIST_EVENTS_QUEUE_SIZE', 100)
+        app.config.setdefault('LIST_EVENTS_MAX_STREAMS', 8)
+
+        self.app = app
+        app.extensions['list_events'] = self
+        change_bus.subscribe(self._on_change)
+
+    def _on_change(self, message):
+        """
+        Change bus callback: forward list events to this worker's streams.
+        """
+        if message['entity'] == 'list' and 'event' in message:
+            self.publish(message['id'], message['event']['type'], message['event']['data'])
+
+    def at_capacity(self):
+        """
+        True if this process already serves LIST_EVENTS_MAX_STREAMS streams.
+        """
+        with self._lock:
+            open_streams = sum(len(subscribers) for subscribers in self._subscribers.values())
+        return open_streams >= self.app.config['LIST_EVENTS_MAX_STREAMS']
+
+    def subscribe(self, list_id):
+        """
+        Register a new stream for a list and return its queue.
+        """
+        subscriber = queue.Queue(maxsize=self.app.config['LIST_EVENTS_QUEUE_SIZE'])
+        with self._lock:
+            self._subscribers[list_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, list_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(list_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[list_id]
+
+    def publish(self, list_id, event_type, data):
+        """
+        Deliver one event to every stream of the list right away.
+
+        A stream whose queue is full has stopped reading; it is dropped and
+        told to close so the client reconnects and starts afresh.
+        """
+        with self._lock:
+            self._next_id += 1
+            message = (self._next_id, event_type, data)
+            subscribers = list(self._subscribers.get(list_id, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                logging.warning(f"Dropping slow event stream for list {list_id}")
+                self.unsubscribe(list_id, subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    def stream(self, list_id):
+        """
+        Generator producing the SSE body for one client of a list.
+
+        Does not touch the database or the request context, so it can run
+        after the view has returned.
+        """
+        heartbeat = self.app.config['LIST_EVENTS_HEARTBEAT']
+        deadline = time.monotonic() + self.app.config['LIST_EVENTS_MAX_AGE']
+        subscriber = self.subscribe(list_id)
+
+        try:
+            # Ask the browser to wait a few seconds before reconnecting
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    message = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if message is None:
+                    return
+                event_id, event_type, data = message
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(list_id, subscriber)
+
+
+# Shared broadcaster instance, bound to the app in create_app()
+list_events = ListEventBroadcaster()
+
+
+def publish_list_event(list_id, event_type, **data):
+    """
+    Queue an event for the viewers of a list, to be sent on the change bus
+    when the current transaction commits.
+
+    Usage:
+        with unit_of_work():
+            ...
+            publish_list_event(list_id, 'item_deleted', id=item_id)
+    """
+    notify_change(current_user.household_id, 'list', list_id, event={'type': event_type, 'data': data})
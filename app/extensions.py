@@ -5,7 +5,11 @@ Initializes Flask extensions used across the app. These are imported and initial
 once here, and later linked to the Flask app in the application factory or main script.
 """
 
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
@@ -14,6 +18,18 @@ from flask_wtf import CSRFProtect
 # ORM: Handles models and database operations
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    SQLite ignores foreign keys unless asked to, per connection. Turn them on so
+    ON DELETE CASCADE / SET NULL behave the same as on Postgres.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 # DB migrations: Handles schema versioning
 migrate = Migrate()
 
@@ -2,37 +2,109 @@
 files.routes.py
 
 This blueprint handles file access via secure serving of uploaded files (like avatars).
-It ensures users cannot access files outside the upload directory (prevents path traversal attacks).
+Files come from the upload storage (app/storage.py), which keeps keys inside its
+root or bucket (prevents path traversal attacks).
+
+Stored blobs live under content-hashed keys ("avatars/<sha256>/64.webp") whose bytes
+never change, so they are sent with a year-long immutable Cache-Control and a strong
+ETag derived from the key. Browsers do not revalidate them at all, and a revalidation
+that does come in gets its 304 without the file being opened.
+
+UPLOAD_SERVE_MODE decides who sends the bytes:
+- app: this worker streams the file.
+- x-accel-redirect: nginx does, from an internal location, e.g.
+
+      location /_uploads/ {
+          internal;
+          alias /path/to/app/static/images/uploads/;  # or proxy_pass to the S3 bucket
+      }
+
+- x-sendfile: Apache (mod_xsendfile) or lighttpd does, from the local storage path.
+
+Uploads from before content-addressed storage are always served by the app.
 """
 
-from flask import Blueprint, send_from_directory, current_app, abort
+from flask import Blueprint, Response, send_file, abort, current_app, request
+from app.storage import upload_storage, blob_key
+import mimetypes
 import os
 
 # Define a blueprint for serving uploaded files
 files_bp = Blueprint('files_bp', __name__)
 
+# One year, the customary maximum for content that never changes
+IMMUTABLE_MAX_AGE = 31536000
+
+
 @files_bp.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """
-    Serve uploaded files securely from the UPLOAD_FOLDER.
+    Serve uploaded files from the upload storage.
 
     Args:
-        filename (str): The relative path of the file requested.
+        filename (str): The storage key of the file requested, relative to the upload folder.
 
     Returns:
-        Flask Response: The file content or a 403 error if path validation fails.
+        Flask Response: The file content (or a proxy redirect to it), a 304 if the
+        client's copy is current, or a 404 error if there is no such file.
     """
-    upload_dir = current_app.config['UPLOAD_FOLDER']
+    key = blob_key(filename)
+    if key is None:
+        return send_legacy_file(filename)
+
+    # The key is the content hash, so it identifies these exact bytes
+    etag = f"{key.rsplit('/', 1)[1]}-{os.path.basename(filename)}"
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        mode = current_app.config['UPLOAD_SERVE_MODE']
+        if mode == 'x-accel-redirect':
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_PREFIX'] + filename
+        elif mode == 'x-sendfile':
+            path = upload_storage.backend.path(filename)
+            if path is None:
+                abort(404)
+            response = Response(mimetype=mimetype)
+            response.headers['X-Sendfile'] = path
+        else:
+            stored = upload_storage.backend.open(filename)
+            if stored is None:
+                abort(404)
+            if stored.path:
+                stored.stream.close()
+            response = send_file(stored.path or stored.stream, mimetype=mimetype,
+                                 download_name=os.path.basename(filename),
+                                 last_modified=stored.modified, etag=etag, conditional=True)
 
-    # Build absolute path of the requested file
-    requested_path = os.path.abspath(os.path.join(upload_dir, filename))
+    response.set_etag(etag)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
-    # Prevent directory traversal (e.g., .../../../etc/passwd)
-    if not requested_path.startswith(os.path.abspath(upload_dir)):
-        abort(403)  # Forbidden
 
-    # Get clean directory and filename to serve the file safely
-    directory = os.path.dirname(requested_path)
-    filename = os.path.basename(requested_path)
+def send_legacy_file(filename):
+    """
+    Serve an upload that is not content-addressed, revalidated by the browser
+    like any other file.
+    """
+    stored = upload_storage.open(filename)
+    if stored is None:
+        abort(404)
+
+    # Local files are sent by path, which lets werkzeug add ETag / Range support
+    if stored.path:
+        stored.stream.close()
+        return send_file(stored.path, conditional=True)
 
-    return send_from_directory(directory, filename)
+    return send_file(
+        stored.stream,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        download_name=os.path.basename(filename),
+        last_modified=stored.modified,
+        conditional=True,
+    )
@@ -11,11 +11,15 @@ Routes include:
 
 from flask import Blueprint, render_template, url_for, flash, redirect, request,jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app.extensions import db
 from app.models import Household as HouseholdModel, User as UsersModel
 from app.household.forms import HouseholdCreationForm, HouseholdJoinForm
-from app.utils import log_activity
-import secrets, logging
+from app.utils import log_activity, unit_of_work, too_many_attempts
+from app.bus import notify_change
+from app.user_cache import user_cache
+from app.throttle import throttle
+import secrets, logging, math
 from tzlocal import get_localzone
 from datetime import datetime
 
@@ -42,52 +46,61 @@ def setup():
         join_form = HouseholdJoinForm(request.form, prefix='join')
         action = request.form.get("action")
 
+        # Throttle join attempts before the join code is looked up
+        if action == "join":
+            retry_after = throttle.hit(join_ip=request.remote_addr,
+                                       join_code=request.form.get("join-join_code", "").strip().upper())
+            if retry_after:
+                flash(f"Too many join attempts. Try again in {math.ceil(retry_after)} seconds.", "danger")
+                return too_many_attempts(render_template('household/setup.html', join_form=join_form, create_form=create_form,
+                                                         initial_active_tab='join'), retry_after)
+
         if action == "create" and create_form.validate():
             if current_user.household_id:
                 flash("You already belong to a household.", "warning")
                 return redirect(url_for("main.dashboard"))
             
-            household = HouseholdModel(name=create_form.household_name.data, admin_id=current_user.id, join_code=secrets.token_hex(4).upper())
-            db.session.add(household)
-            db.session.flush()
-            current_user.household_id = household.id
-            current_user.role = 'admin'
-            db.session.commit()
-
-            log_successful = True
             try:
-                log_activity(user_id=current_user.id, 
-                             household_id=household.id, 
-                             action_type="Household Creation", 
-                             timestamp=datetime.now(tz))
+                with unit_of_work():
+                    household = HouseholdModel(name=create_form.household_name.data, admin_id=current_user.id, join_code=secrets.token_hex(4).upper())
+                    db.session.add(household)
+                    db.session.flush()
+                    current_user.household_id = household.id
+                    current_user.role = 'admin'
+                    notify_change(household.id, 'household', household.id)
+                    notify_change(household.id, 'user', current_user.id)
+                    log_activity(user_id=current_user.id, 
+                                 household_id=household.id, 
+                                 action_type="Household Creation", 
+                                 timestamp=datetime.now(tz))
             except Exception as e:
-                logging.exception(f"Failed to log household creation activity: {e}")
-                log_successful = False
-            
-            if log_successful:
-                flash('Household created successfully!', 'success')
-            else:
-                flash('Household created, but logging the activity failed. Please contact support if issues persist.', 'warning')
-            
+                logging.exception(f"Failed to create household: {e}")
+                flash('A server error occurred while creating the household.', 'danger')
+                return redirect(url_for("household_bp.setup", tab='create'))
+            user_cache.invalidate(current_user.id)
+
+            flash('Household created successfully!', 'success')
             return redirect(url_for("main.dashboard"))
 
         elif action == "join" and join_form.validate():
             
             household_to_join = HouseholdModel.query.filter_by(join_code=join_form.join_code.data).first() 
             if household_to_join:
-                current_user.household_id = household_to_join.id
-                current_user.role = 'member'
-                db.session.flush()
-                db.session.commit()
-
                 try:
-                    log_activity(user_id=current_user.id, 
-                                 household_id=household_to_join.id, 
-                                 action_type="Household Joining", 
-                                 timestamp=datetime.now(tz))
+                    with unit_of_work():
+                        current_user.household_id = household_to_join.id
+                        current_user.role = 'member'
+                        notify_change(household_to_join.id, 'user', current_user.id)
+                        log_activity(user_id=current_user.id, 
+                                     household_id=household_to_join.id, 
+                                     action_type="Household Joining", 
+                                     timestamp=datetime.now(tz))
                 except Exception as e:
+                    logging.exception(f"Failed to join household: {e}")
+                    flash('A server error occurred while joining the household.', 'danger')
+                    return redirect(url_for('household_bp.setup'))
+                user_cache.invalidate(current_user.id)
 
-                    logging.exception(f"Failed to log household joining activity: {e}")
                 flash(f'Welcome to {household_to_join.name}!', 'success')
 
                 return redirect(url_for('main.dashboard'))
@@ -125,7 +138,13 @@ def manage_household(household_id):
         flash("Access denied!", "danger")
         return redirect(url_for("main.index"))
 
-    household = current_user.household
+    # Households are small, so load the members in the same query as the household
+    household = None
+    if current_user.household_id:
+        household = HouseholdModel.query.options(
+            joinedload(HouseholdModel.members)
+        ).filter_by(id=current_user.household_id).first()
+
     if not household or not current_user.id == household.admin_id:
         flash("Access denied!", "danger")
         return redirect(url_for("main.index"))
@@ -166,27 +185,23 @@ def remove_member(user_id_to_remove):
     removed_member_username = member_to_remove.username 
     household_id_for_log = household.id
 
-    member_to_remove.household_id = None
-    if hasattr(member_to_remove, 'role'):
-        member_to_remove.role = None
-    db.session.add(member_to_remove)
-
     try:
-        db.session.commit()
+        with unit_of_work():
+            member_to_remove.household_id = None
+            if hasattr(member_to_remove, 'role'):
+                member_to_remove.role = None
+            notify_change(household_id_for_log, 'user', member_to_remove.id)
+            log_activity(
+                user_id=admin.id,
+                household_id=household_id_for_log,
+                action_type="Member Removal",
+                timestamp=datetime.now(tz),
+                old_name=removed_member_username
+            )
     except Exception as e:
-        db.session.rollback()
         logging.exception(f"Error removing member {user_id_to_remove} from household {household_id_for_log}: {e}")
         return jsonify({'success': False, 'error': "A server error occurred while removing the member."}), 500
-
-    try:
-        log_activity(
-            user_id=admin.id,
-            household_id=household_id_for_log,
-            action_type="Member Removal",
-            timestamp=datetime.now(tz)
-        )
-    except Exception as e:
-        logging.exception(f"Failed to log member removal activity: {e}")
+    user_cache.invalidate(user_id_to_remove)
 
     return jsonify({
         "success": True,
@@ -215,17 +230,21 @@ def rename(household_id):
     
     new_name = data.get('new_name')
     if new_name:
-        household.name = new_name
-        db.session.commit()
         try:
-            log_activity(user_id=current_user.id,
-                         household_id=current_user.household.admin_id,
-                         action_type="Household Renaming",
-                         timestamp=datetime.now(tz),
-                         new_name=new_name)
+            with unit_of_work():
+                old_name = household.name
+                household.name = new_name
+                notify_change(household.id, 'household', household.id)
+                log_activity(user_id=current_user.id,
+                             household_id=household.id,
+                             action_type="Household Renaming",
+                             timestamp=datetime.now(tz),
+                             old_name=old_name,
+                             new_name=new_name)
         except Exception as e:
-
-            logging.exception(f"Failed to log activity: {e}")
+            logging.exception(f"Error renaming household {household.id}: {e}")
+            return jsonify({'error': "A server error occurred while renaming the household."}), 500
+        user_cache.invalidate_household(household.id)
 
         return jsonify({ 'success': True, 'message': 'Household renamed successfully', 'new_name': new_name}), 200
     else:
@@ -237,6 +256,9 @@ def delete(household_id):
     """
     Deletes a household along with detaching its members.
 
+    Members are detached with a single UPDATE; lists, items and activity rows
+    are removed by the database through ON DELETE CASCADE.
+
     Only the admin can perform this action.
     """
 
@@ -252,37 +274,31 @@ def delete(household_id):
         return jsonify({'error': "Unauthorized. Only the household admin can delete the household."}), 403
 
     household_id_for_log = household.id
+    household_name_for_log = household.name
 
-    members_to_remove = list(household.members)
-    for member in members_to_remove:
-        member.household_id = None
-        member.role = None  
-        db.session.add(member) 
-
-    db.session.delete(household) 
-    
+    # No activity row is written here: it would reference the household being deleted.
     try:
-        db.session.commit() 
+        with unit_of_work():
+            db.session.execute(
+                db.update(UsersModel)
+                .where(UsersModel.household_id == household_id_for_log)
+                .values(household_id=None, role=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(
+                db.delete(HouseholdModel)
+                .where(HouseholdModel.id == household_id_for_log)
+                .execution_options(synchronize_session=False)
+            )
+            notify_change(household_id_for_log, 'household', household_id_for_log)
     except Exception as e:
-
-        db.session.rollback()
         logging.exception(f"Error committing household deletion for household ID {household_id_for_log}: {e}")
         return jsonify({'error': "A server error occurred while trying to delete the household."}), 500
-
-    try:
-        log_activity(
-            user_id=current_user.id,
-            household_id=household_id_for_log, 
-            action_type="Household Deletion",
-            timestamp=datetime.now(tz))
-    except Exception as e:
-
-        logging.exception(f"CRITICAL: Failed to log household deletion activity for household ID {household_id_for_log} (user: {current_user.id}), but household was deleted. Error: {e}")
-        log_action_message += " Logging failed (see server logs)."
+    user_cache.invalidate_household(household_id_for_log)
 
     return jsonify({
         "success": True,
-        "message": log_action_message, 
+        "message": f"Household '{household_name_for_log}' has been deleted.", 
         "redirect_url": url_for('household_bp.setup')
     }), 200
 
@@ -301,8 +317,10 @@ def regenerate_code():
         if not household or not current_user.id == household.admin_id:
             return jsonify({'error': "Unauthorized!"}), 403
         
-        household.join_code = secrets.token_hex(4).upper()
-        db.session.commit()
+        with unit_of_work():
+            household.join_code = secrets.token_hex(4).upper()
+            notify_change(household.id, 'household', household.id)
+        user_cache.invalidate_household(household.id)
         return jsonify({"success": True, "new_code": household.join_code}), 200
     
     except Exception as e:
@@ -342,35 +360,30 @@ def leave():
             return redirect('main.dashboard')
         else:
             new_admin = other_members[0]
-            household_to_be_left.admin_id = new_admin.id
-            if hasattr(new_admin, 'role'): 
-                new_admin.role = 'admin'
-                db.session.add(new_admin)
-            
-            user_to_leave.household_id = None
-            if hasattr(user_to_leave, 'role'):
-                user_to_leave.role = None 
-            
-            db.session.add(user_to_leave)
-            db.session.add(household_to_be_left) 
-
             try:
-                db.session.commit()
+                with unit_of_work():
+                    household_to_be_left.admin_id = new_admin.id
+                    if hasattr(new_admin, 'role'): 
+                        new_admin.role = 'admin'
+                    
+                    user_to_leave.household_id = None
+                    if hasattr(user_to_leave, 'role'):
+                        user_to_leave.role = None 
+
+                    notify_change(household_id_for_log, 'household', household_id_for_log)
+                    notify_change(household_id_for_log, 'user', new_admin.id)
+                    notify_change(household_id_for_log, 'user', user_to_leave.id)
+                    log_activity(
+                        user_id=user_to_leave.id,
+                        household_id=household_id_for_log,
+                        action_type= "Admin Leaving",
+                        timestamp=datetime.now(tz),
+                        new_name=new_admin.username
+                    )
             except Exception as e:
-                db.session.rollback()
                 logging.exception(f"Error during admin leave & transfer for household {household_id_for_log}: {e}")
                 return jsonify({'success': False, 'error': "A server error occurred during the admin transfer process."}), 500
-
-            try:
-                log_activity(
-                    user_id=user_to_leave.id,
-                    household_id=household_id_for_log,
-                    action_type= "Admin Leaving",
-                    timestamp=datetime.now(tz),
-                    new_name=new_admin.username
-                )
-            except Exception as e:
-                logging.exception(f"Failed to log admin leave and transfer activity: {e}")
+            user_cache.invalidate_household(household_id_for_log)
 
             return jsonify({
                 "success": True,
@@ -379,27 +392,23 @@ def leave():
             }), 200
     else:
         # Regular member leaving
-        user_to_leave.household_id = None
-        if hasattr(user_to_leave, 'role'):
-            user_to_leave.role = None
-        db.session.add(user_to_leave)
-
         try:
-            db.session.commit()
+            with unit_of_work():
+                user_to_leave.household_id = None
+                if hasattr(user_to_leave, 'role'):
+                    user_to_leave.role = None
+
+                notify_change(household_id_for_log, 'user', user_to_leave.id)
+                log_activity(
+                    user_id=user_to_leave.id,
+                    household_id=household_id_for_log,
+                    action_type="Household Leaving",
+                    timestamp=datetime.now(tz)
+                )
         except Exception as e:
-            db.session.rollback()
             logging.exception(f"Error during member leave for household {household_id_for_log}: {e}")
             return jsonify({'success': False, 'error': "A server error occurred while leaving the household."}), 500
-        
-        try:
-            log_activity(
-                user_id=user_to_leave.id,
-                household_id=household_id_for_log,
-                action_type="Household Leaving",
-                timestamp=datetime.now(tz)
-            )
-        except Exception as e:
-            logging.exception(f"Failed to log member leave activity: {e}")
+        user_cache.invalidate(user_to_leave.id)
 
         return jsonify({
             "success": True,
@@ -421,11 +430,14 @@ def view(household_id):
         flash('You must be in a household.')
         return redirect(url_for('household_bp.setup'))
     
-    household =HouseholdModel.query.get_or_404(household_id)
-    
     if not current_user.household_id == household_id:
         flash('Access Denied')
         return jsonify({"success": False, "message": "You do not belong to this household."}), 403
+
+    # Households are small, so load the members in the same query as the household
+    household = HouseholdModel.query.options(
+        joinedload(HouseholdModel.members)
+    ).filter_by(id=household_id).first_or_404()
     
     members = household.members 
     
@@ -9,10 +9,13 @@ Models:
 - ShoppingList: A list of items belonging to a household
 - ListItem: An individual item in a shopping list
 - ActivityLog: Tracks user actions within a household
+- SyncTombstone: Records deleted lists and items for delta sync
+- UploadBlob: Reference count of a stored, content-addressed upload
 """
 
 from flask import url_for
 from app.extensions import db
+from app.avatars import variant_path
 from flask_login import UserMixin
 from datetime import datetime
 from tzlocal import get_localzone
@@ -32,10 +35,10 @@ class User(db.Model, UserMixin):
     name = db.Column(db.String(80), nullable=False)
     password = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), default='member')  # member or admin
-    avatar_url = db.Column(db.String(256), nullable=True)  # DiceBear URL or uploaded file path
+    avatar_url = db.Column(db.String(256), nullable=True)  # DiceBear URL, uploaded file path or variant pattern (app/avatars.py)
 
     # Relationships
-    household_id = db.Column(db.Integer, db.ForeignKey('households.id'))
+    household_id = db.Column(db.Integer, db.ForeignKey('households.id', ondelete='SET NULL'))
     household = db.relationship('Household', back_populates='members', foreign_keys=[household_id])
     administered_household = db.relationship('Household', back_populates='admin',
                                              foreign_keys='Household.admin_id', uselist=False)
@@ -43,20 +46,36 @@ class User(db.Model, UserMixin):
     added_items = db.relationship('ListItem', backref='added_by', lazy=True)
     activities = db.relationship('ActivityLog', backref='user', lazy=True)
 
-    def get_avatar_url(self):
+    __table_args__ = (
+        db.Index('ix_users_household_id', household_id),
+    )
+
+    def get_avatar_url(self, context='full', fmt='jpg'):
         """
         Returns the appropriate avatar URL for the user.
         Prioritizes:
         1. Custom URL (external or local)
         2. Auto-generated DiceBear avatar (initials)
+
+        For processed uploads, `context` ('thumb', 'table', 'profile', 'full')
+        picks the image size and `fmt` ('jpg' or 'webp') the encoding; other
+        avatars have a single URL.
         """
         if not self.avatar_url:
             return f"https://api.dicebear.com/7.x/initials/svg?seed={self.username}"
 
-        if self.avatar_url.startswith(('http://', 'https://')):
+        # External URLs, and uploads saved before avatars were stored relative to the upload folder
+        if self.avatar_url.startswith(('http://', 'https://', '/')):
             return self.avatar_url
 
-        return url_for('files_bp.uploaded_file', filename=self.avatar_url)
+        return url_for('files_bp.uploaded_file', filename=variant_path(self.avatar_url, context, fmt))
+
+    @property
+    def has_avatar_variants(self):
+        """
+        True if the avatar is a processed upload with WebP / JPEG variants.
+        """
+        return bool(self.avatar_url) and '{size}' in self.avatar_url
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -77,11 +96,19 @@ class Household(db.Model):
     default=lambda: datetime.now(tz)
     )
 
+    # Bumped in the committing transaction whenever anything shown on the dashboard
+    # changes (see app/bus.py); used for ETags
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
     admin_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     admin = db.relationship('User', back_populates='administered_household', foreign_keys=[admin_id])
 
-    members = db.relationship('User', back_populates='household', lazy=True, foreign_keys='User.household_id')
-    shopping_lists = db.relationship('ShoppingList', backref='household', lazy=True, cascade="all, delete-orphan")
+    # Child rows are removed / detached by the database (ON DELETE CASCADE / SET NULL),
+    # so deleting a household never loads its lists, items or members into the session.
+    members = db.relationship('User', back_populates='household', lazy=True, foreign_keys='User.household_id',
+                              passive_deletes=True)
+    shopping_lists = db.relationship('ShoppingList', backref='household', lazy=True, cascade="all, delete-orphan",
+                                     passive_deletes=True)
 
     def __repr__(self):
         return f'<Household {self.name} ({self.join_code})>'
@@ -96,7 +123,7 @@ class ShoppingList(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    household_id = db.Column(db.Integer, db.ForeignKey('households.id'), nullable=False)
+    household_id = db.Column(db.Integer, db.ForeignKey('households.id', ondelete='CASCADE'), nullable=False)
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(
     db.DateTime(timezone=True),
@@ -106,7 +133,67 @@ class ShoppingList(db.Model):
     items_count = db.Column(db.Integer, default=0)
     purchased_items_count = db.Column(db.Integer, default=0)
 
-    items = db.relationship('ListItem', backref='shopping_list', lazy=True, cascade="all, delete-orphan")
+    # Bumped in the committing transaction whenever the list or its items change
+    # (see app/bus.py); used for ETags
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # Optimistic lock for edits of the list itself (its name). The ORM adds
+    # `WHERE row_version = :loaded` to every UPDATE and increments it, so a
+    # concurrent edit raises StaleDataError instead of being overwritten.
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # Household change sequence (Household.version) of the last change to this row;
+    # /shopping/sync returns rows with changed_seq above the client's cursor
+    changed_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    items = db.relationship('ListItem', backref='shopping_list', lazy=True, cascade="all, delete-orphan",
+                            passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_shoppinglists_household_id_created_at', household_id, created_at),
+        db.Index('ix_shoppinglists_household_id_lower_name', household_id, db.func.lower(name)),
+        db.Index('ix_shoppinglists_household_id_changed_seq', household_id, changed_seq),
+    )
+
+    __mapper_args__ = {'version_id_col': row_version}
+
+    @property
+    def completion_percentage(self):
+        """
+        Share of items marked as purchased (0-100), read from the cached counters.
+        """
+        total = self.items_count or 0
+        return (self.purchased_items_count or 0) / total * 100 if total else 0
+
+    @classmethod
+    def adjust_counts(cls, list_id, items=0, purchased=0):
+        """
+        Shifts the cached item counters of a list by the given amounts.
+
+        Issued as a single `UPDATE ... SET items_count = items_count + :n` so
+        concurrent requests never overwrite each other's changes. Runs in the
+        caller's session and is committed with the rest of the unit of work.
+
+        Returns:
+            Row with the new (items_count, purchased_items_count), read back via
+            RETURNING, or None if nothing changed or the list does not exist.
+        """
+        values = {}
+        if items:
+            values['items_count'] = db.func.coalesce(cls.items_count, 0) + items
+        if purchased:
+            values['purchased_items_count'] = db.func.coalesce(cls.purchased_items_count, 0) + purchased
+        if not values:
+            return None
+
+        return db.session.execute(
+            db.update(cls)
+            .where(cls.id == list_id)
+            .values(**values)
+            .returning(db.func.coalesce(cls.items_count, 0).label('items_count'),
+                       db.func.coalesce(cls.purchased_items_count, 0).label('purchased_items_count'))
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
 
     def __repr__(self):
         return f'<ShoppingList {self.name}>'
@@ -124,7 +211,7 @@ class ListItem(db.Model):
     quantity = db.Column(db.Integer, default=1)
     measure = db.Column(db.String(10), nullable=True, default='')
 
-    shoppinglist_id = db.Column(db.Integer, db.ForeignKey('shoppinglists.id'), nullable=False)
+    shoppinglist_id = db.Column(db.Integer, db.ForeignKey('shoppinglists.id', ondelete='CASCADE'), nullable=False)
     added_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
     added_at = db.Column(
@@ -133,6 +220,22 @@ class ListItem(db.Model):
     )
     purchased = db.Column(db.Boolean, default=False)
 
+    # Optimistic lock for edits of the item's details (name, quantity, measure).
+    # ORM updates check and increment it; bulk UPDATEs of those columns must
+    # increment it themselves. Purchase toggles are atomic flips and leave it alone.
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # Household change sequence of the last change to this row (see ShoppingList.changed_seq).
+    # Bulk INSERTs and UPDATEs must set it themselves.
+    changed_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_listitems_shoppinglist_id_added_at', shoppinglist_id, added_at),
+        db.Index('ix_listitems_shoppinglist_id_changed_seq', shoppinglist_id, changed_seq),
+    )
+
+    __mapper_args__ = {'version_id_col': row_version}
+
     def __repr__(self):
         return f'<ListItem {self.name}>'
 
@@ -146,9 +249,66 @@ class ActivityLog(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    household_id = db.Column(db.Integer, db.ForeignKey('households.id'), nullable=False)
+    household_id = db.Column(db.Integer, db.ForeignKey('households.id', ondelete='CASCADE'), nullable=False)
     action_type = db.Column(db.String(50), nullable=False)
     timestamp = db.Column(
     db.DateTime(timezone=True),
     default=lambda: datetime.now(tz)
-    )
\ No newline at end of file
+    )
+    # Names involved in the action (item_name, list_name, old_name, new_name)
+    details = db.Column(db.JSON, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_activity_log_household_id_timestamp', household_id, timestamp),
+    )
+
+
+class SyncTombstone(db.Model):
+    """
+    Marks a deleted list or item so offline clients can drop their copy on
+    the next /shopping/sync. Items of a deleted list get no tombstones of
+    their own; clients drop them together with the list.
+    """
+    __tablename__ = 'sync_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True)
+    household_id = db.Column(db.Integer, db.ForeignKey('households.id', ondelete='CASCADE'), nullable=False)
+    entity = db.Column(db.String(10), nullable=False)  # list or item
+    entity_id = db.Column(db.Integer, nullable=False)
+    # List a deleted item belonged to (no foreign key: the list may be gone as well)
+    list_id = db.Column(db.Integer, nullable=True)
+    seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(
+    db.DateTime(timezone=True),
+    default=lambda: datetime.now(tz)
+    )
+
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_household_id_seq', household_id, seq),
+    )
+
+
+class UploadBlob(db.Model):
+    """
+    A piece of uploaded content, stored once under a key derived from its hash
+    (see app/storage.py), and the number of references to it. Blobs left
+    without references are deleted by `flask uploads gc`.
+    """
+    __tablename__ = 'upload_blobs'
+
+    key = db.Column(db.String(100), primary_key=True)  # e.g. avatars/<sha256>
+    size = db.Column(db.Integer, nullable=False)  # bytes of the uploaded original
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(
+    db.DateTime(timezone=True),
+    default=lambda: datetime.now(tz)
+    )
+    # Last time a reference was taken or dropped; the GC grace period counts from here
+    updated_at = db.Column(
+    db.DateTime(timezone=True),
+    default=lambda: datetime.now(tz)
+    )
+
+    __table_args__ = (
+        db.Index('ix_upload_blobs_ref_count_updated_at', ref_count, updated_at),
+    )
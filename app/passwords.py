@@ -0,0 +1,209 @@
+"""
+passwords.py
+
+Password hashing service.
+
+Password hashes are deliberately slow to compute. This service runs them on
+a small bounded pool so that a burst of logins cannot take every core.
+bcrypt, hashlib.pbkdf2_hmac and hashlib.scrypt all release the GIL, so with
+the default thread pool a worker process spends at most
+PASSWORD_HASH_WORKERS cores on hashing at any time.
+
+The bound is per process. Each gunicorn worker has its own pool, so N
+workers can run up to N * PASSWORD_HASH_WORKERS hashes at once; size
+PASSWORD_HASH_WORKERS with the worker count in mind. The pool does not free
+the request either: the caller waits for its hash, so a sync worker is
+still busy for the whole duration. Only threaded workers (gthread) gain
+concurrency from it.
+
+Settings:
+- PASSWORD_HASH_METHOD: 'bcrypt' (Flask-Bcrypt), 'scrypt' or 'pbkdf2' (Werkzeug)
+- PASSWORD_HASH_COST: bcrypt log rounds, scrypt N or pbkdf2 iterations;
+  None uses the library default
+- PASSWORD_HASH_POOL: 'thread', 'process' or 'inline' (no pool; scripts, tests)
+- PASSWORD_HASH_WORKERS: size of the pool in each worker process
+
+Hashes made with any supported method still verify. Once a password has been
+verified, `verify_and_update` also returns a new hash when the stored one
+used a different method or cost. The login route saves it, so hashes move to
+new settings as users log in.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import flask_bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+BCRYPT_DEFAULT_ROUNDS = 12
+# Werkzeug's own defaults (werkzeug.security)
+SCRYPT_DEFAULT_N = 2 ** 15
+PBKDF2_DEFAULT_ITERATIONS = 1_000_000
+# bcrypt only uses the first 72 bytes of a password. bcrypt 4.x drops the rest
+# silently and 5.x raises, so it is cut explicitly to behave the same on both.
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+def _method_spec(method, cost):
+    """
+    Normalise (method, cost) so stored hashes can be compared with the settings.
+    """
+    if method == 'bcrypt':
+        return 'bcrypt', cost or BCRYPT_DEFAULT_ROUNDS
+    if method == 'scrypt':
+        return 'scrypt', cost or SCRYPT_DEFAULT_N
+    if method == 'pbkdf2':
+        return 'pbkdf2', cost or PBKDF2_DEFAULT_ITERATIONS
+    raise ValueError(f"Unknown PASSWORD_HASH_METHOD '{method}'")
+
+
+def _identify(pw_hash):
+    """
+    (method, cost) a stored hash was made with, or (None, None) if unknown.
+    """
+    try:
+        if pw_hash.startswith('$2'):
+            # $2b$<rounds>$<salt+hash>
+            return 'bcrypt', int(pw_hash.split('$')[2])
+        params = pw_hash.split('$', 1)[0].split(':')
+        if params[0] == 'scrypt':
+            # scrypt:<n>:<r>:<p>
+            return 'scrypt', int(params[1]) if len(params) > 1 else SCRYPT_DEFAULT_N
+        if params[0] == 'pbkdf2':
+            # pbkdf2:<hash>:<iterations>
+            return 'pbkdf2', int(params[2]) if len(params) > 2 else PBKDF2_DEFAULT_ITERATIONS
+    except (IndexError, ValueError):
+        pass
+    return None, None
+
+
+# The two functions below run on the pool. They are module-level so that a
+# process pool can pickle them.
+
+def _bcrypt_password(password):
+    return password.encode('utf-8')[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def _hash(password, method, cost):
+    if method == 'bcrypt':
+        return flask_bcrypt.generate_password_hash(_bcrypt_password(password), cost).decode('utf-8')
+    if method == 'scrypt':
+        return generate_password_hash(password, method=f'scrypt:{cost}:8:1')
+    return generate_password_hash(password, method=f'pbkdf2:sha256:{cost}')
+
+
+def _verify(pw_hash, password):
+    if pw_hash.startswith('$2'):
+        return flask_bcrypt.check_password_hash(pw_hash, _bcrypt_password(password))
+    return check_password_hash(pw_hash, password)
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on a bounded pool.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the hasher to an app. The pool is started by the first hash
+        computed in each worker process, and bounds that process only.
+        """
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'bcrypt')
+        app.config.setdefault('PASSWORD_HASH_COST', None)
+        app.config.setdefault('PASSWORD_HASH_POOL', 'thread')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+
+        # Fail at startup rather than on the first login
+        _method_spec(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_COST'])
+
+        self.app = app
+        self._pool = None
+        app.extensions['password_hasher'] = self
+
+    @property
+    def spec(self):
+        return _method_spec(self.app.config['PASSWORD_HASH_METHOD'], self.app.config['PASSWORD_HASH_COST'])
+
+    def hash(self, password):
+        """
+        Hash a password with the configured method and cost.
+        """
+        method, cost = self.spec
+        return self._run(_hash, password, method, cost)
+
+    def verify(self, pw_hash, password):
+        """
+        Check a password against a stored hash made with any supported method.
+        """
+        if not pw_hash:
+            return False
+        return self._run(_verify, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """
+        True if the stored hash was not made with the configured method and cost.
+        """
+        return _identify(pw_hash) != self.spec
+
+    def verify_and_update(self, pw_hash, password):
+        """
+        Verify a password and, if it matches a hash made with outdated
+        settings, hash it again with the current ones.
+
+        Returns:
+            (bool, str | None): Whether the password matched, and the new hash
+            to store (None if the stored one is current or did not match).
+        """
+        if not self.verify(pw_hash, password):
+            return False, None
+        if self.needs_rehash(pw_hash):
+            return True, self.hash(password)
+        return True, None
+
+    def _run(self, function, *args):
+        pool = self._get_pool()
+        if pool is None:
+            return function(*args)
+        return pool.submit(function, *args).result()
+
+    def _get_pool(self):
+        """
+        Start the pool lazily. Checks the PID so that each forked gunicorn
+        worker gets its own pool.
+        """
+        kind = self.app.config['PASSWORD_HASH_POOL']
+        if kind == 'inline':
+            return None
+        if self._pool is not None and self._pid == os.getpid():
+            return self._pool
+
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                return self._pool
+            workers = self.app.config['PASSWORD_HASH_WORKERS']
+            if kind == 'process':
+                # Spawned rather than forked: the worker already runs threads
+                self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            elif kind == 'thread':
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+            else:
+                raise ValueError(f"Unknown PASSWORD_HASH_POOL '{kind}'")
+            self._pid = os.getpid()
+            return self._pool
+
+
+# Shared hasher instance, bound to the app in create_app()
+password_hasher = PasswordHasher()
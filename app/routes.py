@@ -8,16 +8,52 @@ the homepage, dashboard, and AJAX-based list search functionality.
 Routes:
 - /: Home page
 - /dashboard: Main user dashboard (requires login)
+- /activity: Full household activity feed, one page at a time (JSON)
 """
 
-from flask import Blueprint, render_template, url_for, flash, redirect
+from flask import Blueprint, render_template, url_for, flash, redirect, jsonify, request
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from app.extensions import db
 from app.models import Household as HouseholdModel, ShoppingList as ShoppingListModel, ActivityLog, ListItem as ListItemModel
-from app.utils import format_action
+from app.utils import format_action, encode_cursor, decode_cursor, version_etag, not_modified, with_etag
 from app.shopping_lists.forms import ShoppingListForm
 
 main = Blueprint('main', __name__, template_folder="templates")
 
+# Activity rows shown on the dashboard before "Show more"
+DASHBOARD_ACTIVITY_LIMIT = 5
+
+# Default and largest page size of the activity feed
+ACTIVITY_PAGE_SIZE = 20
+ACTIVITY_PAGE_MAX = 100
+
+
+def activity_page(household_id, before=None, limit=ACTIVITY_PAGE_SIZE):
+    """
+    Load one page of a household's activity, newest first.
+
+    Rows are ordered by (timestamp, id) descending and each page seeks below
+    the previous cursor on the (household_id, timestamp) index, so reading
+    old history costs the same as reading the latest rows.
+
+    Returns:
+        (activities, next_cursor), where next_cursor is None on the last page.
+    """
+    query = ActivityLog.query.options(
+        joinedload(ActivityLog.user)
+    ).filter(ActivityLog.household_id == household_id)
+
+    if before is not None:
+        query = query.filter(db.tuple_(ActivityLog.timestamp, ActivityLog.id) < db.tuple_(*before))
+
+    # One extra row tells us whether another page exists
+    activities = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(limit + 1).all()
+    if len(activities) > limit:
+        last = activities[limit - 1]
+        return activities[:limit], encode_cursor(last.timestamp, last.id)
+    return activities, None
+
 @main.route('/')
 def index():
     """
@@ -32,11 +68,14 @@ def dashboard():
     """
     Authenticated user's dashboard. Displays:
     - All shopping lists for the user's household
-    - Recent household activity (latest 5 logs)
+    - Recent household activity (latest DASHBOARD_ACTIVITY_LIMIT logs; older ones via /activity)
     - Household name and admin status
     - New shopping list form
 
     If the user doesn't belong to a household, they're redirected to household setup.
+
+    The page carries a weak ETag built from the household's version counter;
+    an unchanged revalidation is answered with 304 after the household lookup.
     """
     new_list_form = ShoppingListForm()
     household_id = current_user.household_id
@@ -53,6 +92,10 @@ def dashboard():
         flash("Household not found.", "danger")
         return redirect(url_for('main.dashboard'))
 
+    etag = version_etag('dashboard', household.id, household.version)
+    if (response := not_modified(etag)) is not None:
+        return response
+
     is_admin = (current_user.id == household.admin_id)
 
     # Fetch all shopping lists for the household, newest first
@@ -62,20 +105,64 @@ def dashboard():
         ShoppingListModel.created_at.desc()
     ).all()
 
-    # Fetch 5 most recent activities
-    recent_activity = ActivityLog.query.filter_by(
-        household_id=household_id
-    ).order_by(
-        ActivityLog.timestamp.desc()
-    ).limit(5).all()
+    # Most recent activities, joining in the user shown on each row
+    recent_activity, activity_cursor = activity_page(household_id, limit=DASHBOARD_ACTIVITY_LIMIT)
 
-    return render_template(
+    return with_etag(render_template(
         'dashboard.html',
         title=f"Dashboard - {household.name}",
         household=household,
         lists=all_household_lists,
         is_admin=is_admin,
         recent_activity=recent_activity,
+        activity_cursor=activity_cursor,
         format_action=format_action,
         new_list_form=new_list_form
-    )
+    ), etag)
+
+
+@main.route('/activity')
+@login_required
+def activity_feed():
+    """
+    Return one page of the current household's activity as JSON (AJAX).
+
+    Query parameters:
+    - before: the `next_cursor` of the previous page (omit for the newest rows)
+    - limit: page size, default ACTIVITY_PAGE_SIZE, capped at ACTIVITY_PAGE_MAX
+
+    Pages carry a weak ETag from the household's version counter, like the dashboard.
+    """
+    household_id = current_user.household_id
+    if not household_id:
+        return jsonify({"success": False, "message": "You are not part of any household."}), 403
+
+    version = db.session.scalar(db.select(HouseholdModel.version).where(HouseholdModel.id == household_id))
+    etag = version_etag('activity', household_id, version)
+    if (response := not_modified(etag)) is not None:
+        return response
+
+    before = None
+    if request.args.get('before'):
+        before = decode_cursor(request.args['before'])
+        if before is None:
+            return jsonify({"success": False, "message": "Invalid cursor."}), 400
+
+    limit = min(max(request.args.get('limit', ACTIVITY_PAGE_SIZE, type=int), 1), ACTIVITY_PAGE_MAX)
+    activities, next_cursor = activity_page(household_id, before=before, limit=limit)
+
+    return with_etag(jsonify({
+        "success": True,
+        "activities": [
+            {
+                "id": activity.id,
+                "user": {"id": activity.user.id, "name": activity.user.name},
+                "action_type": activity.action_type,
+                "details": activity.details or {},
+                "description": format_action(activity.action_type, **(activity.details or {})),
+                "timestamp": activity.timestamp.isoformat()
+            }
+            for activity in activities
+        ],
+        "next_cursor": next_cursor
+    }), etag)
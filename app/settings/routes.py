@@ -14,12 +14,14 @@ Forms used:
 
 from flask import Blueprint, render_template, url_for, redirect, flash, current_app, request, jsonify
 from flask_login import login_required, current_user, logout_user
-from app.extensions import db
 from app.settings.forms import PasswordChangeForm, NameChangeForm, AvatarForm
-from app.utils import log_activity
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-import os
+from app.utils import log_activity, unit_of_work
+from app.bus import notify_change
+from app.user_cache import user_cache
+from app.passwords import password_hasher
+from app.avatars import save_avatar, delete_avatar, AvatarError
+from app.storage import upload_storage, blob_key
+from werkzeug.exceptions import RequestEntityTooLarge
 import logging
 from datetime import datetime
 from tzlocal import get_localzone
@@ -76,8 +78,8 @@ def change_password():
     name_change_form = NameChangeForm()
 
     if password_change_form.validate_on_submit():
-        if not check_password_hash(current_user.password, password_change_form.old_password.data):
-            form.old_password.errors.append('Incorrect current password')
+        if not password_hasher.verify(current_user.password, password_change_form.old_password.data):
+            password_change_form.old_password.errors.append('Incorrect current password')
             return render_template(
                 'settings.html',
                 form=form,
@@ -85,12 +87,13 @@ def change_password():
                 name_change_form=name_change_form,
                 seeds=['lion', 'tiger', 'dragon', 'phoenix', 'storm', 'warrior']
             )
-        current_user.password = generate_password_hash(password_change_form.new_password.data)
-        db.session.commit()
+        with unit_of_work():
+            current_user.password = password_hasher.hash(password_change_form.new_password.data)
+        user_cache.invalidate(current_user.id)
 
         logout_user()
         flash('Password changed successfully. Please log in again.', 'success')
-        return redirect(url_for('auth.login'))
+        return redirect(url_for('auth.auth'))
 
     return render_template(
         'settings.html',
@@ -118,13 +121,16 @@ def change_name():
         return jsonify({'error': 'Name cannot be empty'}), 400
     
     try:
-        current_user.name = new_name
-        db.session.commit()
-
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Name Change", timestamp=datetime.now(tz), old_name=old_name, new_name=new_name)
+        with unit_of_work():
+            current_user.name = new_name
+            notify_change(current_user.household_id, 'user', current_user.id)
+            # Activity is scoped to a household, so there is nothing to log for users without one
+            if current_user.household_id:
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Name Change", timestamp=datetime.now(tz), old_name=old_name, new_name=new_name)
     except Exception as e:
-        db.session.rollback()
-        logging.error(f"Error creating list: {e}")
+        logging.error(f"Error changing name: {e}")
+        return jsonify({'error': 'Could not update name'}), 500
+    user_cache.invalidate(current_user.id)
 
     return jsonify({'message': 'Name updated successfully'})
 
@@ -149,27 +155,37 @@ def change_avatar():
             flash("Choose either DiceBear avatar or upload your own, not both.", "warning")
             return redirect(url_for('settings_bp.account_settings'))
 
-        # File upload path handling
+        # File upload path handling: decoded, cropped and re-encoded into fixed sizes,
+        # stored once per distinct image
+        pending_blob = None
         if form.avatar_upload.data and allowed_file(form.avatar_upload.data.filename):
-            filename = f"{current_user.id}_{secure_filename(form.avatar_upload.data.filename)}"
-            file_path = os.path.join(current_app.config['AVATAR_FOLDER'], filename)
-
-            # Save file
-            form.avatar_upload.data.save(file_path)
-
-            # Store relative path used by files_bp
-            db_path = f"avatars/{filename}"
-            current_user.avatar_url = url_for('files_bp.uploaded_file', filename=db_path)
+            try:
+                new_avatar_url, pending_blob = save_avatar(form.avatar_upload.data, upload_storage)
+            except AvatarError as e:
+                flash(f"{e} Please upload a JPEG or PNG picture.", "warning")
+                return redirect(url_for('settings_bp.account_settings'))
 
         # DiceBear URL handling
         elif form.dicebear_url.data:
-            current_user.avatar_url = form.dicebear_url.data
+            new_avatar_url = form.dicebear_url.data
 
         else:
             flash("Please provide either a DiceBear avatar or upload an image.", "warning")
             return redirect(url_for('settings_bp.account_settings'))
 
-        db.session.commit()
+        old_avatar_url = current_user.avatar_url
+        with unit_of_work():
+            current_user.avatar_url = new_avatar_url
+            # Move the reference from the old stored avatar (if any) to the new one
+            if old_avatar_url != new_avatar_url:
+                if pending_blob:
+                    upload_storage.acquire(pending_blob)
+                if blob_key(old_avatar_url):
+                    upload_storage.release(blob_key(old_avatar_url))
+            notify_change(current_user.household_id, 'user', current_user.id)
+        user_cache.invalidate(current_user.id)
+        if old_avatar_url != new_avatar_url:
+            delete_avatar(old_avatar_url, current_app.config['AVATAR_FOLDER'])
         flash("Profile picture updated!", "success")
         return redirect(url_for('settings_bp.account_settings'))
 
@@ -180,3 +196,17 @@ def change_avatar():
         name_change_form=name_change_form,
         seeds=['lion', 'tiger', 'dragon', 'phoenix', 'storm', 'warrior']
     )
+
+
+@settings_bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    """
+    Uploads are cut off while streaming once they pass UPLOAD_MAX_BYTES
+    (see app/storage.py).
+
+    Returns:
+        Redirect to settings with a warning.
+    """
+    limit = current_app.config['UPLOAD_MAX_BYTES'] / (1024 * 1024)
+    flash(f"The picture is too large. Please upload an image smaller than {limit:g} MB.", "warning")
+    return redirect(url_for('settings_bp.account_settings'))
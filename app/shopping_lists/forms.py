@@ -1,7 +1,17 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, IntegerField, SelectField
+from wtforms import StringField, SubmitField, IntegerField, SelectField, HiddenField
 from wtforms.validators import DataRequired,Length
 
+# Units an item quantity can be measured in (value, label)
+MEASURE_CHOICES = [
+    ('', 'Select Unit'),  
+    ('kg', 'Kilogram (kg)'),
+    ('g', 'Gram (g)'),
+    ('l', 'Liter (l)'),
+    ('ml', 'Milliliter (ml)'),
+    ('Pcs', 'Piece'),  
+]
+
 class ShoppingListForm(FlaskForm):
     name = StringField('List Name', validators=[DataRequired()])
     submit = SubmitField('Create List')
@@ -12,19 +22,14 @@ class AddItemForm(FlaskForm):
     quantity = IntegerField('Quantity', default=1)
     measure = SelectField(
         'Unit of Measurement:',
-        choices=[
-            ('', 'Select Unit'),  
-            ('kg', 'Kilogram (kg)'),
-            ('g', 'Gram (g)'),
-            ('l', 'Liter (l)'),
-            ('ml', 'Milliliter (ml)'),
-            ('Pcs', 'Piece'),  
-        ]
+        choices=MEASURE_CHOICES
     )
     submit = SubmitField('Add Item')
 
 class EditShoppingListForm(FlaskForm):
     name = StringField('List Name', validators=[DataRequired("You must choose a name"), Length(min=2, max=100)])
+    # row_version of the list when the form was rendered (filled from the list itself)
+    row_version = HiddenField()
     submit = SubmitField('Save Changes')
 
 class EditItemForm(FlaskForm):
@@ -32,13 +37,8 @@ class EditItemForm(FlaskForm):
     quantity = IntegerField('Quantity', default=1)
     measure = SelectField(
         'Unit of Measurement:',
-        choices=[
-            ('', 'Select Unit'),  
-            ('kg', 'Kilogram (kg)'),
-            ('g', 'Gram (g)'),
-            ('l', 'Liter (l)'),
-            ('ml', 'Milliliter (ml)'),
-            ('Pcs', 'Piece'),  
-        ]
+        choices=MEASURE_CHOICES
     )
+    # row_version of the item when the form was rendered (filled from the item itself)
+    row_version = HiddenField()
     submit = SubmitField('Save Changes')
@@ -5,23 +5,287 @@ This blueprint handles all routes related to managing shopping lists and their i
 Includes:
 - Creating, editing, deleting, viewing lists
 - Adding, editing, deleting, renaming, toggling items
+- Bulk-adding pasted items in one transaction
+- Applying a batch of queued item operations in one transaction
+- Set-based list cleanup (clear purchased, check/uncheck all)
+- Keyset-paginated item pages for incremental loading of large lists
+- Server-Sent Events stream of committed changes for live list views
 - AJAX and HTML form compatibility
 """
 
-from flask import Blueprint, render_template, url_for, flash, redirect, abort, jsonify, request
+from flask import Blueprint, render_template, url_for, flash, redirect, abort, jsonify, request, Response, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload, contains_eager
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
-from app.models import ShoppingList as ShoppingListModel, ListItem as ListItemModel
-from app.shopping_lists.forms import AddItemForm, EditShoppingListForm, EditItemForm
-from app.utils import log_activity
+from app.models import ShoppingList as ShoppingListModel, ListItem as ListItemModel, Household as HouseholdModel
+from app.shopping_lists.forms import AddItemForm, EditShoppingListForm, EditItemForm, MEASURE_CHOICES
+from app.utils import log_activity, unit_of_work, encode_cursor, decode_cursor, version_etag, not_modified, with_etag
+from app.events import list_events, publish_list_event
+from app.bus import notify_change
+from app.sync import change_seq, record_deletions, changes_since, encode_sync_cursor, decode_sync_cursor
 import logging
-from datetime import datetime
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import wraps
 from tzlocal import get_localzone
 
 tz = get_localzone()
 
 shoppinglist_bp = Blueprint('shoppinglist_bp', __name__)
 
+# Largest number of items accepted by a single bulk-add request
+BULK_ADD_MAX_ITEMS = 200
+
+# Largest number of operations accepted by a single batch request
+BATCH_MAX_OPERATIONS = 100
+
+# Items rendered with view_list and returned per page by the items endpoint
+ITEMS_PAGE_SIZE = 100
+
+# Largest page the items endpoint will return
+ITEMS_PAGE_MAX = 500
+
+# Seconds a client refused a live stream waits before asking again
+STREAM_RETRY_AFTER = 30
+
+# Operations understood by the batch endpoint
+BATCH_OPERATIONS = {'add', 'rename', 'toggle', 'set_purchased', 'delete', 'set_quantity'}
+
+# Largest number of queued offline mutations accepted by one sync request
+SYNC_MAX_MUTATIONS = 500
+
+# Lookup of valid units by lower-case spelling, e.g. 'pcs' -> 'Pcs'
+MEASURES = {value.lower(): value for value, _ in MEASURE_CHOICES if value}
+
+# One pasted line: optional bullet, optional quantity (with optional 'x'), optional unit, then the name.
+# Matches e.g. "- 2 kg apples", "3x eggs", "500 g flour", "milk".
+ITEM_LINE_RE = re.compile(
+    r'^(?:[-*\u2022]\s*|\d+[.)]\s+)?'
+    r'(?:(?P<quantity>\d+)\s*(?:x\s+|x(?=\S)|\s))?'
+    r'(?:(?P<measure>' + '|'.join(re.escape(m) for m in MEASURES) + r')\.?\s+)?'
+    r'(?P<name>.+?)\s*$',
+    re.IGNORECASE
+)
+
+
+def parse_item_lines(text):
+    """
+    Parse a pasted multi-line shopping list into item rows.
+
+    Args:
+        text (str): Raw text, one item per line. Blank lines are skipped.
+
+    Returns:
+        list[dict]: Rows with 'name', 'quantity' and 'measure' keys.
+    """
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = ITEM_LINE_RE.match(line)
+        rows.append({
+            "name": match.group('name'),
+            "quantity": int(match.group('quantity')) if match.group('quantity') else 1,
+            "measure": MEASURES.get((match.group('measure') or '').lower(), '')
+        })
+    return rows
+
+
+def clean_item_row(row):
+    """
+    Validate and normalise one {name, quantity, measure} row from a JSON request.
+
+    Returns:
+        tuple: (row, error) where exactly one of the two is None.
+    """
+    if not isinstance(row, dict):
+        return None, "Each item must be an object."
+
+    name = str(row.get('name') or '').strip()
+    if not name:
+        return None, "Item name cannot be empty."
+    if len(name) > 100:
+        return None, f"Item name '{name[:20]}...' is too long."
+
+    try:
+        quantity = int(row.get('quantity') or 1)
+    except (TypeError, ValueError):
+        return None, f"Invalid quantity for '{name}'."
+    if quantity < 1:
+        return None, f"Quantity for '{name}' must be at least 1."
+
+    measure = MEASURES.get(str(row.get('measure') or '').strip().lower(), '')
+    return {"name": name, "quantity": quantity, "measure": measure}, None
+
+
+def serialize_added_by(user):
+    """
+    JSON representation of the user in an item's "Added by" pill. The avatar
+    URLs point at the thumbnail size; `avatar_webp_url` is None when there is
+    no WebP variant.
+    """
+    return {
+        "id": user.id,
+        "name": user.name,
+        "avatar_url": user.get_avatar_url('thumb'),
+        "avatar_webp_url": user.get_avatar_url('thumb', 'webp') if user.has_avatar_variants else None
+    }
+
+
+def serialize_item(item):
+    """
+    JSON representation of a list item, as rendered by view_list.js.
+    """
+    return {
+        "id": item.id,
+        "list_id": item.shoppinglist_id,
+        "name": item.name,
+        "purchased": item.purchased,
+        "added_by": serialize_added_by(item.added_by),
+        "quantity": item.quantity,
+        "measure": item.measure,
+        "added_at": item.added_at.isoformat() if item.added_at else None,
+        "version": item.row_version
+    }
+
+
+def serialize_list(shopping_list):
+    """
+    JSON representation of a shopping list (without its items).
+    """
+    return {
+        "id": shopping_list.id,
+        "name": shopping_list.name,
+        "created_at": shopping_list.created_at.isoformat() if shopping_list.created_at else None,
+        "items_count": shopping_list.items_count or 0,
+        "purchased_items_count": shopping_list.purchased_items_count or 0,
+        "version": shopping_list.row_version
+    }
+
+
+def is_stale(row, sent_version):
+    """
+    True if a client edited an older `row_version` of `row` than the stored one.
+
+    Clients that send no version are not checked (last writer wins), so older
+    pages and scripts keep working.
+    """
+    if sent_version is None or sent_version == '':
+        return False
+    try:
+        return int(sent_version) != row.row_version
+    except (TypeError, ValueError):
+        return True
+
+
+def item_conflict(item_id):
+    """
+    409 response for an item edit based on an outdated version.
+
+    Carries the item as currently stored (or null if it was deleted meanwhile)
+    so the client can refresh and retry that one row.
+    """
+    db.session.expire_all()
+    item = db.session.get(ListItemModel, item_id)
+    return jsonify({
+        "success": False,
+        "conflict": True,
+        "message": "This item was changed by someone else. Review it and try again.",
+        "item": serialize_item(item) if item else None
+    }), 409
+
+
+def item_page_query(list_id, after=None, limit=ITEMS_PAGE_SIZE):
+    """
+    SELECT for one page of a list's items in (added_at, id) order, with one
+    extra row that tells whether another page exists.
+
+    Pages seek past the previous cursor on the (shoppinglist_id, added_at)
+    index instead of using OFFSET, so every page costs the same no matter
+    how far into the list it is. `flask explain-queries` checks this statement.
+    """
+    # Every row shows who added it. Items share a handful of users, so selectinload
+    # fetches each distinct user once instead of repeating user columns per joined row.
+    query = db.select(ListItemModel).options(
+        selectinload(ListItemModel.added_by)
+    ).where(ListItemModel.shoppinglist_id == list_id)
+
+    if after is not None:
+        query = query.where(db.tuple_(ListItemModel.added_at, ListItemModel.id) > db.tuple_(*after))
+
+    return query.order_by(ListItemModel.added_at, ListItemModel.id).limit(limit + 1)
+
+
+def item_page(list_id, after=None, limit=ITEMS_PAGE_SIZE):
+    """
+    Load one page of a list's items in (added_at, id) order.
+
+    Returns:
+        (items, next_cursor), where next_cursor is None on the last page.
+    """
+    items = db.session.scalars(item_page_query(list_id, after, limit)).all()
+    if len(items) > limit:
+        last = items[limit - 1]
+        return items[:limit], encode_cursor(last.added_at, last.id)
+    return items, None
+
+
+def toggle_item(*criteria):
+    """
+    Flip the purchased flag of the item matching `criteria` inside the database.
+
+    Runs `UPDATE listitems SET purchased = NOT purchased WHERE <criteria> RETURNING ...`
+    so concurrent toggles never lose an update. Callers pass the id and a
+    household/list scope; the list counters are left to the caller.
+
+    Returns:
+        Row (id, purchased, name, shoppinglist_id), or None if nothing matched.
+    """
+    return db.session.execute(
+        db.update(ListItemModel)
+        .where(*criteria)
+        .values(purchased=db.not_(db.func.coalesce(ListItemModel.purchased, False)), changed_seq=change_seq())
+        .returning(ListItemModel.id, ListItemModel.purchased, ListItemModel.name, ListItemModel.shoppinglist_id)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+
+
+def household_item(json_errors=True):
+    """
+    Decorator for item routes: loads the item and checks household ownership.
+
+    The item and its shopping list are fetched in one joined SELECT, so the
+    route receives `item` (with `item.shopping_list` already populated) in
+    place of `item_id`. Responds 404 if the item does not exist and 403 if it
+    belongs to another household, as JSON or via abort() for HTML routes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(item_id, *args, **kwargs):
+            item = db.session.execute(
+                db.select(ListItemModel)
+                .join(ListItemModel.shopping_list)
+                .options(contains_eager(ListItemModel.shopping_list))
+                .where(ListItemModel.id == item_id)
+            ).scalar_one_or_none()
+
+            if item is None:
+                if json_errors:
+                    return jsonify({"success": False, "message": "Item not found"}), 404
+                abort(404)
+
+            if not current_user.household_id or item.shopping_list.household_id != current_user.household_id:
+                if json_errors:
+                    return jsonify({"success": False, "message": "Forbidden"}), 403
+                abort(403)
+
+            return view(item, *args, **kwargs)
+        return wrapper
+    return decorator
+
 
 @shoppinglist_bp.route('/create_list', methods=['POST'])
 @login_required
@@ -59,14 +323,16 @@ def create_list():
         return jsonify({"success": False, "message": msg}), 400 if is_ajax else flash(msg, 'error')
 
     try:
-        new_list = ShoppingListModel(
-            name=list_name,
-            created_by_user_id=current_user.id,
-            household_id=current_user.household_id
-        )
-        db.session.add(new_list)
-        db.session.commit()
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Creation", timestamp=datetime.now(tz), list_name=new_list.name)
+        with unit_of_work():
+            new_list = ShoppingListModel(
+                name=list_name,
+                created_by_user_id=current_user.id,
+                household_id=current_user.household_id
+            )
+            db.session.add(new_list)
+            db.session.flush()
+            notify_change(current_user.household_id, 'list', new_list.id)
+            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Creation", timestamp=datetime.now(tz), list_name=list_name)
 
         if is_ajax:
             return jsonify({
@@ -94,9 +360,13 @@ def view_list(list_id):
     """
     View a specific shopping list and its items.
     Allows adding items via form or AJAX.
+
+    Only the first page of items is rendered; view_list.js loads the rest
+    from `list_items` as the user scrolls. GET responses carry a weak ETag
+    from the list's version counter and revalidate with 304 after the list lookup.
     """
     shopping_list = ShoppingListModel.query.get_or_404(list_id)
-    if not current_user.household or shopping_list.household_id != current_user.household_id:
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
         return jsonify({"success": False, "message": "Forbidden"}), 403 if request.is_json else abort(403)
 
     item_form = AddItemForm()
@@ -115,32 +385,36 @@ def view_list(list_id):
                 return jsonify({"success": False, "message": "Item name cannot be empty."}), 400
 
             try:
-                new_item = ListItemModel(
-                    name=item_name,
-                    shoppinglist_id=list_id,
-                    added_by_user_id=current_user.id,
-                    quantity=quantity,
-                    measure=measure
-                )
-                db.session.add(new_item)
-                db.session.commit()
-                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Addition", timestamp=datetime.now(tz) ,item_name=new_item.name)
+                with unit_of_work():
+                    new_item = ListItemModel(
+                        name=item_name,
+                        shoppinglist_id=list_id,
+                        added_by_user_id=current_user.id,
+                        quantity=quantity,
+                        measure=measure
+                    )
+                    db.session.add(new_item)
+                    # The counter UPDATE flushes the INSERT, so new_item.id is known below
+                    counts = ShoppingListModel.adjust_counts(list_id, items=1)
+                    log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Addition", timestamp=datetime.now(tz), item_name=item_name)
 
-                return jsonify({
-                    "success": True,
-                    "message": f'Item "{new_item.name}" added!',
-                    "item": {
+                    item_data = {
                         "id": new_item.id,
                         "name": new_item.name,
                         "purchased": new_item.purchased,
-                        "added_by": {
-                            "id": current_user.id,
-                            "name": current_user.name,
-                            "avatar_url": current_user.avatar_url
-                        },
+                        "added_by": serialize_added_by(current_user),
                         "quantity": new_item.quantity,
-                        "measure": new_item.measure
+                        "measure": new_item.measure,
+                        "version": new_item.row_version
                     }
+                    publish_list_event(list_id, 'items_added', items=[item_data], items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
+                return jsonify({
+                    "success": True,
+                    "message": f'Item "{new_item.name}" added!',
+                    "item": item_data,
+                    "items_count": counts.items_count,
+                    "purchased_items_count": counts.purchased_items_count
                 }), 201
 
             except Exception as e:
@@ -151,17 +425,27 @@ def view_list(list_id):
         # --- Handle Standard Form Submission ---
         elif item_form.validate_on_submit():
             try:
-                new_item = ListItemModel(
-                    name=item_form.name.data,
-                    shoppinglist_id=list_id,
-                    quantity=item_form.quantity.data,
-                    measure=item_form.measure.data,
-                    added_by_user_id=current_user.id
-                )
-                db.session.add(new_item)
-                db.session.commit()
-                
-                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Addition",timestamp= datetime.now(tz) ,item_name=new_item.name)
+                with unit_of_work():
+                    new_item = ListItemModel(
+                        name=item_form.name.data,
+                        shoppinglist_id=list_id,
+                        quantity=item_form.quantity.data,
+                        measure=item_form.measure.data,
+                        added_by_user_id=current_user.id
+                    )
+                    db.session.add(new_item)
+                    counts = ShoppingListModel.adjust_counts(list_id, items=1)
+                    log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Addition", timestamp=datetime.now(tz), item_name=item_form.name.data)
+                    publish_list_event(list_id, 'items_added', items=[{
+                        "id": new_item.id,
+                        "name": new_item.name,
+                        "purchased": False,
+                        "added_by": serialize_added_by(current_user),
+                        "quantity": new_item.quantity,
+                        "measure": new_item.measure,
+                        "version": new_item.row_version
+                    }], items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
                 return redirect(url_for('shoppinglist_bp.view_list', list_id=list_id))
             except Exception as e:
                 db.session.rollback()
@@ -169,41 +453,680 @@ def view_list(list_id):
                 logging.error(f"Error adding item via form: {e}")
 
     # --- GET Request: Render List View ---
-    items = ListItemModel.query.filter_by(shoppinglist_id=list_id).order_by(ListItemModel.added_at.asc()).all()
-    total_items = len(items)
-    purchased_items = sum(1 for item in items if item.purchased)
-    completion_percentage = (purchased_items / total_items) * 100 if total_items else 0
+    etag = version_etag('list', list_id, shopping_list.version)
+    if request.method == 'GET' and (response := not_modified(etag)) is not None:
+        return response
+
+    # First page only, so the response stays the same size however long the list is
+    items, next_cursor = item_page(list_id)
 
-    return render_template(
+    response = render_template(
         'shopping/view_list.html',
         title=shopping_list.name,
         shopping_list=shopping_list,
         items=items,
+        next_cursor=next_cursor,
         item_form=item_form,
-        completion_percentage=completion_percentage
+        completion_percentage=shopping_list.completion_percentage
+    )
+    # A re-rendered form with validation errors must not be revalidated later
+    return with_etag(response, etag) if request.method == 'GET' else response
+
+
+@shoppinglist_bp.route('/list/<int:list_id>/items', methods=['GET'])
+@login_required
+def list_items(list_id):
+    """
+    Return one page of a list's items as JSON (AJAX).
+
+    Query parameters:
+    - after: the `next_cursor` of the previous page (omit for the first page)
+    - limit: page size, default ITEMS_PAGE_SIZE, capped at ITEMS_PAGE_MAX
+
+    The list counters are included so the client can draw progress without
+    having every item loaded. Pages carry a weak ETag from the list's version counter.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    after = None
+    if request.args.get('after'):
+        after = decode_cursor(request.args['after'])
+        if after is None:
+            return jsonify({"success": False, "message": "Invalid cursor."}), 400
+
+    etag = version_etag('items', list_id, shopping_list.version)
+    if (response := not_modified(etag)) is not None:
+        return response
+
+    limit = min(max(request.args.get('limit', ITEMS_PAGE_SIZE, type=int), 1), ITEMS_PAGE_MAX)
+    items, next_cursor = item_page(list_id, after=after, limit=limit)
+
+    return with_etag(jsonify({
+        "success": True,
+        "items": [serialize_item(item) for item in items],
+        "next_cursor": next_cursor,
+        "items_count": shopping_list.items_count or 0,
+        "purchased_items_count": shopping_list.purchased_items_count or 0
+    }), etag)
+
+
+@shoppinglist_bp.route('/list/<int:list_id>/events')
+@login_required
+def list_event_stream(list_id):
+    """
+    Server-Sent Events stream of committed changes to a list.
+
+    view_list.js applies the events (items_added, item_updated, items_deleted,
+    items_marked, counts, list_updated, list_deleted) to the page, so members
+    see each other's edits without reloading.
+
+    Each stream holds a worker thread; once this worker serves
+    LIST_EVENTS_MAX_STREAMS of them, further clients get a 503 and retry later.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    if list_events.at_capacity():
+        response = jsonify({"success": False, "message": "Too many live connections, try again later."})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response
+
+    # The stream never touches the database; the session is released when the view returns
+    return Response(
+        list_events.stream(list_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
     )
 
 
+@shoppinglist_bp.route('/list/<int:list_id>/items/bulk', methods=['POST'])
+@login_required
+def bulk_add_items(list_id):
+    """
+    Add many items to a list at once (AJAX).
+
+    Expects JSON with either:
+        - "items": a list of {name, quantity, measure} objects, or
+        - "text": raw multi-line text (e.g. pasted from a notes app), parsed server-side
+
+    All rows are written with a single multi-row INSERT, the list counters are
+    bumped once and one aggregated activity entry is logged, all in one transaction.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    if not request.is_json:
+        return jsonify({"success": False, "message": "Invalid request: Content-Type must be application/json"}), 415
+
+    data = request.get_json()
+    if isinstance(data.get('text'), str):
+        raw_rows = parse_item_lines(data['text'])
+    elif isinstance(data.get('items'), list):
+        raw_rows = data['items']
+    else:
+        return jsonify({"success": False, "message": "Provide either 'items' or 'text'."}), 400
+
+    if not raw_rows:
+        return jsonify({"success": False, "message": "No items to add."}), 400
+    if len(raw_rows) > BULK_ADD_MAX_ITEMS:
+        return jsonify({"success": False, "message": f"Cannot add more than {BULK_ADD_MAX_ITEMS} items at once."}), 400
+
+    rows = []
+    for index, raw_row in enumerate(raw_rows, start=1):
+        row, error = clean_item_row(raw_row)
+        if error:
+            return jsonify({"success": False, "message": f"Item {index}: {error}"}), 400
+        rows.append(row)
+
+    added_at = datetime.now(tz)
+    for row in rows:
+        row.update(shoppinglist_id=list_id, added_by_user_id=current_user.id, added_at=added_at, purchased=False)
+    added_by = serialize_added_by(current_user)
+
+    try:
+        with unit_of_work():
+            seq = change_seq()
+            for row in rows:
+                row['changed_seq'] = seq
+            # One multi-VALUES INSERT; the returned ids come back in the order of `rows`
+            item_ids = db.session.scalars(
+                db.insert(ListItemModel).returning(ListItemModel.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            counts = ShoppingListModel.adjust_counts(list_id, items=len(rows))
+            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Bulk Item Addition", timestamp=added_at, count=len(rows), list_name=shopping_list.name)
+
+            items = [
+                {
+                    "id": item_id,
+                    "name": row["name"],
+                    "purchased": False,
+                    "added_by": added_by,
+                    "quantity": row["quantity"],
+                    "measure": row["measure"],
+                    "version": 1
+                }
+                for item_id, row in zip(item_ids, rows)
+            ]
+            publish_list_event(list_id, 'items_added', items=items, items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
+        return jsonify({
+            "success": True,
+            "message": f"Added {len(rows)} items.",
+            "item_ids": item_ids,
+            "items": items,
+            "items_count": counts.items_count,
+            "purchased_items_count": counts.purchased_items_count
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error bulk-adding items to list {list_id}: {e}")
+        return jsonify({"success": False, "message": "Error adding items to database."}), 500
+
+
+def edit_list_conflict(list_id):
+    """
+    409 page for a list edit based on an outdated version: the edit form
+    again, filled with the list as currently stored.
+    """
+    db.session.expire_all()
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    form = EditShoppingListForm(formdata=None, obj=shopping_list)
+    flash("This list was renamed by someone else. Review the current name and save again.", "warning")
+    return render_template('shopping/edit_list.html', title=f'Edit List: {shopping_list.name}', form=form, shopping_list=shopping_list), 409
+
+
+def edit_item_conflict(item_id):
+    """
+    409 page for an item edit based on an outdated version: the edit form
+    again, filled with the item as currently stored.
+    """
+    db.session.expire_all()
+    item = db.session.get(ListItemModel, item_id) or abort(404)
+    form = EditItemForm(formdata=None, obj=item)
+    flash("This item was changed by someone else. Review the current values and save again.", "warning")
+    return render_template('shopping/edit_item.html', form=form, item=item), 409
+
+
+def update_item_details(criteria, version, **values):
+    """
+    Bulk-UPDATE the details of the item matching `criteria`, bumping its
+    row_version as the ORM would. With a `version`, only that version matches.
+
+    Returns:
+        Row (id, name, quantity, measure, row_version) after the update, or None
+        if nothing matched.
+    """
+    if version is not None:
+        criteria = (*criteria, ListItemModel.row_version == version)
+    return db.session.execute(
+        db.update(ListItemModel).where(*criteria)
+        .values(row_version=ListItemModel.row_version + 1, changed_seq=change_seq(), **values)
+        .returning(ListItemModel.id, ListItemModel.name, ListItemModel.quantity, ListItemModel.measure,
+                   ListItemModel.row_version)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+
+def batch_item_missing(result, criteria):
+    """
+    Batch result for an update that matched no row: a version conflict if the
+    item still exists, otherwise not found.
+    """
+    current = db.session.execute(
+        db.select(ListItemModel).options(selectinload(ListItemModel.added_by)).where(*criteria)
+    ).scalar_one_or_none()
+    if current is None:
+        return {**result, "success": False, "message": "Item not found"}, 0, 0
+    return {**result, "success": False, "conflict": True, "message": "This item was changed by someone else.",
+            "item": serialize_item(current)}, 0, 0
+
+
+def apply_batch_operation(list_id, operation):
+    """
+    Apply one operation from a batch request to items of `list_id`.
+
+    Every write is a single scoped statement (INSERT, UPDATE or DELETE ...
+    RETURNING) in the caller's transaction, so no item rows are loaded.
+
+    'rename' and 'set_quantity' accept the item's `version`; if it is outdated
+    the operation fails with `conflict` and the current item, and the rest of
+    the batch still applies.
+
+    Returns:
+        tuple: (result dict for the response, items delta, purchased delta)
+    """
+    if not isinstance(operation, dict):
+        return {"success": False, "message": "Each operation must be an object."}, 0, 0
+
+    op = operation.get('op')
+    item_id = operation.get('item_id')
+    result = {"op": op, "item_id": item_id}
+    in_list = (ListItemModel.id == item_id, ListItemModel.shoppinglist_id == list_id)
+
+    if not isinstance(op, str) or op not in BATCH_OPERATIONS:
+        return {**result, "success": False, "message": f"Unknown operation '{op}'."}, 0, 0
+
+    if op == 'add':
+        row, error = clean_item_row(operation)
+        if error:
+            return {**result, "success": False, "message": error}, 0, 0
+        new_id = db.session.execute(
+            db.insert(ListItemModel)
+            .values(shoppinglist_id=list_id, added_by_user_id=current_user.id, added_at=datetime.now(tz), purchased=False,
+                    changed_seq=change_seq(), **row)
+            .returning(ListItemModel.id)
+        ).scalar_one()
+        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Addition", timestamp=datetime.now(tz), item_name=row["name"])
+        added_by = serialize_added_by(current_user)
+        item = {"id": new_id, "purchased": False, "added_by": added_by, "version": 1, **row}
+        publish_list_event(list_id, 'items_added', items=[item])
+        return {**result, "success": True, "item_id": new_id, "item": item}, 1, 0
+
+    if not isinstance(item_id, int):
+        return {**result, "success": False, "message": "An integer item_id is required."}, 0, 0
+
+    if op == 'toggle':
+        toggled = toggle_item(*in_list)
+        if toggled is None:
+            return {**result, "success": False, "message": "Item not found"}, 0, 0
+        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Mark as Purchased", timestamp=datetime.now(tz), item_name=toggled.name)
+        publish_list_event(list_id, 'item_updated', id=item_id, purchased=toggled.purchased)
+        return {**result, "success": True, "purchased": toggled.purchased}, 0, 1 if toggled.purchased else -1
+
+    if op == 'set_purchased':
+        # Unlike toggle, replaying it is harmless, which suits queued offline changes
+        purchased = operation.get('purchased')
+        if not isinstance(purchased, bool):
+            return {**result, "success": False, "message": "purchased must be true or false."}, 0, 0
+        changed = db.session.execute(
+            db.update(ListItemModel)
+            .where(*in_list, db.func.coalesce(ListItemModel.purchased, False).is_(not purchased))
+            .values(purchased=purchased, changed_seq=change_seq())
+            .returning(ListItemModel.name).execution_options(synchronize_session=False)
+        ).first()
+        if changed is None:
+            if db.session.execute(db.select(ListItemModel.id).where(*in_list)).first() is None:
+                return {**result, "success": False, "message": "Item not found"}, 0, 0
+            return {**result, "success": True, "purchased": purchased}, 0, 0
+        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Mark as Purchased", timestamp=datetime.now(tz), item_name=changed.name)
+        publish_list_event(list_id, 'item_updated', id=item_id, purchased=purchased)
+        return {**result, "success": True, "purchased": purchased}, 0, 1 if purchased else -1
+
+    version = operation.get('version')
+    if version is not None and not isinstance(version, int):
+        return {**result, "success": False, "message": "version must be an integer."}, 0, 0
+
+    if op == 'rename':
+        new_name = str(operation.get('name') or '').strip()
+        if not new_name:
+            return {**result, "success": False, "message": "New item name cannot be empty."}, 0, 0
+        if len(new_name) > 100:
+            return {**result, "success": False, "message": "New item name is too long."}, 0, 0
+        # RETURNING only sees the new name, so the old one (for the feed) is read first
+        old_name = db.session.execute(db.select(ListItemModel.name).where(*in_list)).scalar_one_or_none()
+        if old_name is None:
+            return {**result, "success": False, "message": "Item not found"}, 0, 0
+        renamed = update_item_details(in_list, version, name=new_name)
+        if renamed is None:
+            return batch_item_missing(result, in_list)
+        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Renaming", timestamp=datetime.now(tz), old_name=old_name, new_name=new_name)
+        publish_list_event(list_id, 'item_updated', id=item_id, name=new_name, version=renamed.row_version)
+        return {**result, "success": True, "name": new_name, "version": renamed.row_version}, 0, 0
+
+    if op == 'set_quantity':
+        row, error = clean_item_row({"name": "-", "quantity": operation.get('quantity'), "measure": operation.get('measure')})
+        if error:
+            return {**result, "success": False, "message": error}, 0, 0
+        values = {"quantity": row["quantity"]}
+        if 'measure' in operation:
+            values["measure"] = row["measure"]
+        updated = update_item_details(in_list, version, **values)
+        if updated is None:
+            return batch_item_missing(result, in_list)
+        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Editing", timestamp=datetime.now(tz), new_name=updated.name)
+        # Send both values so the row can be redrawn even when only one changed
+        publish_list_event(list_id, 'item_updated', id=item_id, version=updated.row_version,
+                           quantity=updated.quantity, measure=updated.measure)
+        return {**result, "success": True, "version": updated.row_version, **values}, 0, 0
+
+    # op == 'delete'
+    deleted = db.session.execute(
+        db.delete(ListItemModel).where(*in_list)
+        .returning(ListItemModel.name, ListItemModel.purchased).execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        return {**result, "success": False, "message": "Item not found"}, 0, 0
+    record_deletions(current_user.household_id, 'item', [item_id], list_id=list_id)
+    log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Deletion", timestamp=datetime.now(tz), item_name=deleted.name)
+    publish_list_event(list_id, 'items_deleted', ids=[item_id])
+    return {**result, "success": True}, -1, -1 if deleted.purchased else 0
+
+
+@shoppinglist_bp.route('/list/<int:list_id>/batch', methods=['POST'])
+@login_required
+def batch_operations(list_id):
+    """
+    Apply an ordered batch of item operations to a list (AJAX).
+
+    Expects JSON: {"operations": [{"op": ..., ...}, ...]} where op is one of
+        - add:           name, quantity, measure
+        - rename:        item_id, name, optional version
+        - toggle:        item_id
+        - set_purchased: item_id, purchased
+        - delete:        item_id
+        - set_quantity:  item_id, quantity, optional measure, optional version
+
+    Operations run in order inside one transaction and each gets its own
+    entry in "results". Invalid operations (bad input, unknown item) fail on
+    their own without affecting the rest; a database error rolls back the batch.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    if not request.is_json:
+        return jsonify({"success": False, "message": "Invalid request: Content-Type must be application/json"}), 415
+
+    operations = request.get_json().get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"success": False, "message": "Provide a non-empty 'operations' list."}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"success": False, "message": f"Cannot apply more than {BATCH_MAX_OPERATIONS} operations at once."}), 400
+
+    try:
+        with unit_of_work():
+            results = []
+            items_delta = purchased_delta = 0
+            for operation in operations:
+                result, items_change, purchased_change = apply_batch_operation(list_id, operation)
+                results.append(result)
+                items_delta += items_change
+                purchased_delta += purchased_change
+
+            counts = ShoppingListModel.adjust_counts(list_id, items=items_delta, purchased=purchased_delta)
+            if counts is not None:
+                publish_list_event(list_id, 'counts', items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
+        if counts is None:
+            counts = shopping_list
+        return jsonify({
+            "success": True,
+            "results": results,
+            "items_count": counts.items_count,
+            "purchased_items_count": counts.purchased_items_count
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error applying batch to list {list_id}: {e}")
+        return jsonify({"success": False, "message": "Error applying changes. Nothing was saved."}), 500
+
+
+def invalid_mutation(mutation):
+    """
+    Why a queued offline mutation cannot be applied, judged by the types of
+    the fields used as lookup keys (ids come straight from client JSON).
+
+    Returns:
+        An error message, or None if the mutation can be applied.
+    """
+    if not isinstance(mutation.get('op'), str):
+        return "op must be a string."
+    if not isinstance(mutation.get('list_id'), int):
+        return "An integer list_id is required."
+    if mutation.get('item_id') is not None and not isinstance(mutation['item_id'], int):
+        return "item_id must be an integer."
+    for key in ('client_id', 'item_client_id'):
+        if mutation.get(key) is not None and not isinstance(mutation[key], (str, int)):
+            return f"{key} must be a string or an integer."
+    return None
+
+
+def apply_offline_mutations(mutations):
+    """
+    Apply queued offline mutations to the current household's lists.
+
+    Each mutation is a batch operation plus its `list_id`, and may carry a
+    `client_id` that is echoed in its result. A later mutation can refer to
+    an item added earlier in the same request by its client id
+    (`item_client_id`) instead of `item_id`. Runs in the caller's transaction.
+
+    Mutations with ids of the wrong type fail on their own (see
+    `invalid_mutation`); the rest still apply.
+
+    Returns:
+        list[dict]: One result per mutation, in order.
+    """
+    household_lists = set(db.session.scalars(
+        db.select(ShoppingListModel.id).where(ShoppingListModel.household_id == current_user.household_id)
+    ))
+    added_items = {}
+    deltas = defaultdict(lambda: [0, 0])
+    results = []
+
+    for mutation in mutations:
+        if not isinstance(mutation, dict):
+            results.append({"success": False, "message": "Each mutation must be an object."})
+            continue
+
+        error = invalid_mutation(mutation)
+        if error:
+            result = {"op": mutation.get('op'), "item_id": mutation.get('item_id'), "success": False, "message": error}
+            if isinstance(mutation.get('client_id'), (str, int)):
+                result["client_id"] = mutation['client_id']
+            results.append(result)
+            continue
+
+        list_id = mutation['list_id']
+        if mutation.get('item_client_id') in added_items:
+            mutation = {**mutation, 'item_id': added_items[mutation['item_client_id']]}
+
+        if list_id not in household_lists:
+            result = {"op": mutation.get('op'), "item_id": mutation.get('item_id'), "success": False, "message": "List not found"}
+        else:
+            result, items_change, purchased_change = apply_batch_operation(list_id, mutation)
+            deltas[list_id][0] += items_change
+            deltas[list_id][1] += purchased_change
+            if result["success"] and mutation.get('op') == 'add' and 'client_id' in mutation:
+                added_items[mutation['client_id']] = result["item_id"]
+
+        if 'client_id' in mutation:
+            result["client_id"] = mutation['client_id']
+        results.append(result)
+
+    for list_id, (items_delta, purchased_delta) in deltas.items():
+        counts = ShoppingListModel.adjust_counts(list_id, items=items_delta, purchased=purchased_delta)
+        if counts is not None:
+            publish_list_event(list_id, 'counts', items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
+    return results
+
+
+@shoppinglist_bp.route('/sync', methods=['GET', 'POST'])
+@login_required
+def sync():
+    """
+    Delta sync for offline-capable clients (JSON).
+
+    GET /shopping/sync?since=<cursor> returns what changed in the household
+    after the cursor of the previous sync: the full rows of lists and items
+    created or changed, and the ids of deleted ones. Without a cursor, or with
+    one from another household or older than SYNC_TOMBSTONE_RETENTION_DAYS,
+    everything is returned with "reset": true and the client replaces its copy.
+
+    POST takes {"since": <cursor>, "mutations": [...]}: the queued offline
+    mutations are applied first (see `apply_offline_mutations`), each with its
+    own entry in "results", then the response is built as for GET.
+    """
+    household_id = current_user.household_id
+    if not household_id:
+        return jsonify({"success": False, "message": "You are not part of any household."}), 403
+
+    payload = {}
+    if request.method == 'POST':
+        if not request.is_json:
+            return jsonify({"success": False, "message": "Invalid request: Content-Type must be application/json"}), 415
+        payload = request.get_json() or {}
+
+    since = None
+    cursor = request.args.get('since') or payload.get('since')
+    if cursor:
+        decoded = decode_sync_cursor(cursor)
+        if decoded is None:
+            return jsonify({"success": False, "message": "Invalid cursor."}), 400
+        cursor_household_id, cursor_seq, issued_at = decoded
+        retention = timedelta(days=current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+        if cursor_household_id == household_id and issued_at > datetime.now(tz) - retention:
+            since = cursor_seq
+
+    results = []
+    mutations = payload.get('mutations') or []
+    if not isinstance(mutations, list):
+        return jsonify({"success": False, "message": "'mutations' must be a list."}), 400
+    if len(mutations) > SYNC_MAX_MUTATIONS:
+        return jsonify({"success": False, "message": f"Cannot apply more than {SYNC_MAX_MUTATIONS} mutations at once."}), 400
+    if mutations:
+        try:
+            with unit_of_work():
+                results = apply_offline_mutations(mutations)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error applying offline mutations for household {household_id}: {e}")
+            return jsonify({"success": False, "message": "Error applying changes. Nothing was saved."}), 500
+
+    # Read the sequence before the rows: everything up to it has committed
+    seq = db.session.scalar(db.select(HouseholdModel.version).where(HouseholdModel.id == household_id))
+    if since is not None and since >= seq:
+        lists, items, tombstones = [], [], []
+    else:
+        lists, items, tombstones = changes_since(household_id, since)
+
+    return jsonify({
+        "success": True,
+        "reset": since is None,
+        "cursor": encode_sync_cursor(household_id, seq, datetime.now(tz)),
+        "lists": [serialize_list(shopping_list) for shopping_list in lists],
+        "items": [serialize_item(item) for item in items],
+        "deleted": {
+            "lists": [t.entity_id for t in tombstones if t.entity == 'list'],
+            "items": [t.entity_id for t in tombstones if t.entity == 'item']
+        },
+        "results": results
+    })
+
+
+@shoppinglist_bp.route('/list/<int:list_id>/items/clear_purchased', methods=['POST'])
+@login_required
+def clear_purchased(list_id):
+    """
+    Delete every purchased item of a list (end-of-trip cleanup).
+
+    Runs one `DELETE FROM listitems WHERE shoppinglist_id = :id AND purchased`,
+    adjusts the counters and logs a single summary activity row.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    try:
+        with unit_of_work():
+            deleted_ids = db.session.scalars(
+                db.delete(ListItemModel)
+                .where(ListItemModel.shoppinglist_id == list_id, ListItemModel.purchased.is_(True))
+                .returning(ListItemModel.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            deleted = len(deleted_ids)
+            record_deletions(current_user.household_id, 'item', deleted_ids, list_id=list_id)
+
+            if deleted:
+                counts = ShoppingListModel.adjust_counts(list_id, items=-deleted, purchased=-deleted)
+                publish_list_event(list_id, 'items_deleted', ids=deleted_ids, items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Purchased Items Clearing", timestamp=datetime.now(tz), count=deleted, list_name=shopping_list.name)
+
+        return jsonify({"success": True, "deleted": deleted, "message": f"Removed {deleted} purchased items."})
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error clearing purchased items from list {list_id}: {e}")
+        return jsonify({"success": False, "message": "Error clearing purchased items."}), 500
+
+
+@shoppinglist_bp.route('/list/<int:list_id>/items/check_all', methods=['POST'], defaults={'purchased': True})
+@shoppinglist_bp.route('/list/<int:list_id>/items/uncheck_all', methods=['POST'], defaults={'purchased': False})
+@login_required
+def set_all_purchased(list_id, purchased):
+    """
+    Mark every item of a list as purchased (check_all) or not purchased (uncheck_all).
+
+    Runs one `UPDATE listitems SET purchased = :state WHERE shoppinglist_id = :id`
+    limited to the rows that actually change, so the counter can be shifted
+    by the number of affected rows.
+    """
+    shopping_list = ShoppingListModel.query.get_or_404(list_id)
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    currently_purchased = db.func.coalesce(ListItemModel.purchased, False)
+    try:
+        with unit_of_work():
+            changed = db.session.execute(
+                db.update(ListItemModel)
+                .where(ListItemModel.shoppinglist_id == list_id, currently_purchased.is_(not purchased))
+                .values(purchased=purchased, changed_seq=change_seq())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+            if changed:
+                counts = ShoppingListModel.adjust_counts(list_id, purchased=changed if purchased else -changed)
+                publish_list_event(list_id, 'items_marked', purchased=purchased, items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Mark All as Purchased" if purchased else "Unmark All", timestamp=datetime.now(tz), count=changed, list_name=shopping_list.name)
+
+        state = "purchased" if purchased else "not purchased"
+        return jsonify({"success": True, "changed": changed, "message": f"Marked {changed} items as {state}."})
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error updating purchase status for list {list_id}: {e}")
+        return jsonify({"success": False, "message": "Error updating items."}), 500
+
+
 @shoppinglist_bp.route('/list/<int:list_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_list(list_id):
     """
     Rename a shopping list.
+
+    The form carries the list's row_version. If someone else renamed the list
+    in the meantime, the form is shown again with the current name and a 409.
     """
     shopping_list = ShoppingListModel.query.get_or_404(list_id)
-    if not current_user.household or shopping_list.household_id != current_user.household_id:
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
         abort(403)
 
     form = EditShoppingListForm(obj=shopping_list)
+
     if form.validate_on_submit():
+        if is_stale(shopping_list, form.row_version.data):
+            return edit_list_conflict(list_id)
         try:
+            with unit_of_work():
+                old_name = shopping_list.name
+                shopping_list.name = form.name.data
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Renaming", timestamp=datetime.now(tz), old_name=old_name, new_name=form.name.data)
+                publish_list_event(list_id, 'list_updated', name=form.name.data)
 
-            shopping_list.name = form.name.data
-            db.session.commit()
             flash(f'List "{shopping_list.name}" updated.', 'success')
-            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Renaming", timestamp=datetime.now(tz), new_name=form.name.data)
             return redirect(url_for('shoppinglist_bp.view_list', list_id=list_id))
-        
+
+        except StaleDataError:
+            return edit_list_conflict(list_id)
+
         except Exception as e:
             db.session.rollback()
             flash("Error adding item to database.", "danger")
@@ -221,15 +1144,16 @@ def delete_list(list_id):
     Supports JSON and HTML responses.
     """
     shopping_list = ShoppingListModel.query.get_or_404(list_id)
-    if not current_user.household or shopping_list.household_id != current_user.household_id:
+    if not current_user.household_id or shopping_list.household_id != current_user.household_id:
         return jsonify({"success": False, "message": "Forbidden"}), 403
 
     try:
         list_name = shopping_list.name
-        db.session.delete(shopping_list)
-        db.session.commit()
+        with unit_of_work():
+            db.session.delete(shopping_list)
+            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Deletion", timestamp=datetime.now(tz), list_name=list_name)
+            publish_list_event(list_id, 'list_deleted', redirect_url=url_for('main.dashboard'))
 
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="List Deletion", timestamp=datetime.now(tz), list_name=list_name)
         return jsonify({"success": True, "message": f'"{list_name}" deleted.'})
     except Exception as e:
 
@@ -240,23 +1164,34 @@ def delete_list(list_id):
 
 @shoppinglist_bp.route('/list/item/<int:item_id>/edit', methods=['GET', 'POST'])
 @login_required
-def edit_item(item_id):
+@household_item(json_errors=False)
+def edit_item(item):
     """
     Edit a list item's details.
+
+    The form carries the item's row_version. If someone else changed the item
+    in the meantime, the form is shown again with the current values and a 409.
     """
-    item = ListItemModel.query.get_or_404(item_id)
-    if item.shopping_list.household_id != current_user.household_id:
-        abort(403)
 
     form = EditItemForm(obj=item)
+
     if form.validate_on_submit():
-        item.name = form.name.data
-        item.quantity = form.quantity.data
-        item.measure = form.measure.data
-        db.session.commit()
+        item_id = item.id
+        if is_stale(item, form.row_version.data):
+            return edit_item_conflict(item_id)
+        try:
+            with unit_of_work():
+                old_name = item.name
+                item.name = form.name.data
+                item.quantity = form.quantity.data
+                item.measure = form.measure.data
+                db.session.flush()
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Editing", timestamp=datetime.now(tz), old_name=old_name, new_name=form.name.data)
+                publish_list_event(item.shoppinglist_id, 'item_updated', id=item.id, name=item.name, quantity=item.quantity, measure=item.measure, version=item.row_version)
+        except StaleDataError:
+            return edit_item_conflict(item_id)
 
         flash(f'Item "{item.name}" updated.', 'success')
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Editing", timestamp=datetime.now(tz), new_name=form.name.data)
         return redirect(url_for('shoppinglist_bp.view_list', list_id=item.shoppinglist_id))
 
     return render_template('shopping/edit_item.html', form=form, item=item)
@@ -264,21 +1199,38 @@ def edit_item(item_id):
 
 @shoppinglist_bp.route('/list/item/<int:item_id>/delete', methods=['POST', 'GET'])
 @login_required
-def delete_item(item_id):
+@household_item()
+def delete_item(item):
     """
     Delete a shopping list item.
+
+    Runs `DELETE ... WHERE id = :id RETURNING purchased` and adjusts the
+    counters from the returned flag, so a toggle that commits after the
+    item was loaded cannot leave the purchased counter off by one.
     """
-    item = ListItemModel.query.get_or_404(item_id)
-    if item.shopping_list.household_id != current_user.household_id:
-        return jsonify({"success": False, "message": "Forbidden"}), 403
 
+    item_id, item_name, list_id = item.id, item.name, item.shoppinglist_id
     try:
-        item_name = item.name
-        db.session.delete(item)
-        db.session.commit()
+        with unit_of_work():
+            deleted = db.session.execute(
+                db.delete(ListItemModel).where(ListItemModel.id == item_id)
+                .returning(ListItemModel.purchased).execution_options(synchronize_session=False)
+            ).first()
+            if deleted is None:
+                # Deleted by someone else since it was loaded
+                return jsonify({"success": False, "message": "Item not found"}), 404
 
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Deletion", timestamp=datetime.now(tz), item_name=item_name)
-        return jsonify({"success": True, "message": f'"{item_name}" deleted. Refresh to see changes'})
+            record_deletions(current_user.household_id, 'item', [item_id], list_id=list_id)
+            counts = ShoppingListModel.adjust_counts(list_id, items=-1, purchased=-1 if deleted.purchased else 0)
+            publish_list_event(list_id, 'items_deleted', ids=[item_id], items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Deletion", timestamp=datetime.now(tz), item_name=item_name)
+
+        return jsonify({
+            "success": True,
+            "message": f'"{item_name}" deleted.',
+            "items_count": counts.items_count,
+            "purchased_items_count": counts.purchased_items_count
+        })
     except Exception as e:
 
         db.session.rollback()
@@ -291,37 +1243,57 @@ def delete_item(item_id):
 def toggle_purchase(item_id):
     """
     Toggle the 'purchased' status of a list item.
-    """
-    item = ListItemModel.query.get_or_404(item_id)
-    if item.shopping_list.household_id != current_user.household_id:
-        return jsonify({"success": False, "message": "Forbidden"}), 403
 
+    The flip happens in the database as one
+    `UPDATE ... SET purchased = NOT purchased WHERE id = :id AND <household scope> RETURNING ...`,
+    so concurrent taps from several members never lose an update. The list's
+    purchased counter is adjusted in the same transaction.
+    """
     try:
-        item.purchased = not item.purchased
-        db.session.commit()
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Mark as Purchased", timestamp=datetime.now(tz))
+        with unit_of_work():
+            toggled = toggle_item(
+                ListItemModel.id == item_id,
+                ListItemModel.shoppinglist_id.in_(
+                    db.select(ShoppingListModel.id).where(ShoppingListModel.household_id == current_user.household_id)
+                )
+            )
+
+            if toggled is None:
+                # Nothing matched: tell a missing item apart from one in another household
+                exists = db.session.execute(db.select(ListItemModel.id).where(ListItemModel.id == item_id)).first()
+                if exists:
+                    return jsonify({"success": False, "message": "Forbidden"}), 403
+                return jsonify({"success": False, "message": "Item not found"}), 404
+
+            counts = ShoppingListModel.adjust_counts(toggled.shoppinglist_id, purchased=1 if toggled.purchased else -1)
+            log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Mark as Purchased", timestamp=datetime.now(tz), item_name=toggled.name)
+            publish_list_event(toggled.shoppinglist_id, 'item_updated', id=item_id, purchased=toggled.purchased, items_count=counts.items_count, purchased_items_count=counts.purchased_items_count)
+
         return jsonify({
             "success": True,
-            "item_id": item.id,
-            "purchased_status": item.purchased,
-            "message": f'Item "{item.name}" marked as {"purchased" if item.purchased else "not purchased"}.'
+            "item_id": item_id,
+            "purchased_status": toggled.purchased,
+            "items_count": counts.items_count,
+            "purchased_items_count": counts.purchased_items_count,
+            "message": f'Item "{toggled.name}" marked as {"purchased" if toggled.purchased else "not purchased"}.'
         }), 200
     except Exception as e:
         db.session.rollback()
-        logging.error(f"Error toggling purchase status for item {item.name}: {e}")
+        logging.error(f"Error toggling purchase status for item {item_id}: {e}")
         return jsonify({"success": False, "message": "Error updating item status."}), 500
 
 
 @shoppinglist_bp.route('/list/item/<int:item_id>/update_name', methods=['POST'])
 @login_required
-def update_item_name(item_id):
+@household_item()
+def update_item_name(item):
     """
     Inline rename of a shopping list item (AJAX).
-    """
-    item = ListItemModel.query.get_or_404(item_id)
-    if not current_user.household or item.shopping_list.household_id != current_user.household_id:
-        return jsonify({"success": False, "message": "Forbidden"}), 403
 
+    Accepts the item's `version`; if it is outdated, responds 409 with the
+    current item instead of overwriting someone else's change. The rename is
+    one UPDATE ... RETURNING guarded by that version, like batch renames.
+    """
     if not request.is_json:
         return jsonify({"success": False, "message": "Invalid request: Content-Type must be application/json"}), 415
 
@@ -333,11 +1305,24 @@ def update_item_name(item_id):
     if len(new_name) > 100:
         return jsonify({"success": False, "message": "New item name is too long."}), 400
 
+    item_id, old_name, list_id = item.id, item.name, item.shoppinglist_id
+    version = data.get('version')
+    if is_stale(item, version):
+        return item_conflict(item_id)
+    version = None if version in (None, '') else int(version)
+
     try:
-        item.name = new_name
-        db.session.commit()
-        log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Renaming",timestamp=datetime.now(tz), new_name=new_name)
-        return jsonify({"success": True, "new_name": item.name, "message": "Item name updated successfully."})
+        with unit_of_work():
+            renamed = update_item_details((ListItemModel.id == item_id,), version, name=new_name)
+            if renamed is not None:
+                log_activity(user_id=current_user.id, household_id=current_user.household_id, action_type="Item Renaming", timestamp=datetime.now(tz), old_name=old_name, new_name=new_name)
+                publish_list_event(list_id, 'item_updated', id=item_id, name=new_name, version=renamed.row_version)
+        if renamed is None:
+            # Changed or deleted by someone else since it was loaded
+            if version is None:
+                return jsonify({"success": False, "message": "Item not found"}), 404
+            return item_conflict(item_id)
+        return jsonify({"success": True, "new_name": new_name, "version": renamed.row_version, "message": "Item name updated successfully."})
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error updating item name for item {item_id}: {e}")
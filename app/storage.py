@@ -0,0 +1,446 @@
+"""
+storage.py
+
+Content-addressed storage for uploaded files.
+
+Uploads are streamed to a temporary file by the request parser and hashed
+(SHA-256) on the way, so a file is never held in memory and its digest is known
+as soon as the form is parsed. UPLOAD_MAX_BYTES is enforced while streaming:
+the request is cut off with 413 as soon as a file grows past it.
+
+Stored content lives under a blob key derived from its digest, e.g.
+"avatars/<sha256>", and every object of a blob is stored below that prefix
+("avatars/<sha256>/64.webp", ...). The same content is therefore stored once,
+however often it is uploaded. The `upload_blobs` table counts the references
+to each blob; routes take and drop references in the same unit of work that
+saves or replaces them. `flask uploads gc` deletes blobs that have had no
+references for UPLOAD_GC_GRACE_HOURS, and objects left behind without a row
+(e.g. by a request that failed after storing them).
+
+Backends (UPLOAD_STORAGE_BACKEND):
+- local (default): files below UPLOAD_STORAGE_PATH, the upload folder unless
+  set. Every app node needs to see the same directory.
+- s3: objects in UPLOAD_S3_BUCKET on AWS S3 or any S3-compatible server
+  (MinIO, Ceph, ...; set UPLOAD_S3_ENDPOINT_URL). Credentials come from the
+  usual AWS_* environment variables. Needs the `boto3` package. A local MinIO
+  container is enough to run it in development.
+
+Uploads from before this storage existed stay where they are and are still
+served from the upload folder. `flask uploads gc` also deletes the legacy
+avatar files that no user refers to any more.
+
+Serving (UPLOAD_SERVE_MODE, see app/files/routes.py): stored blobs are served
+with immutable caching headers, either by the app ('app'), or by the front
+proxy: 'x-accel-redirect' (nginx, internal location UPLOAD_ACCEL_PREFIX) or
+'x-sendfile' (Apache mod_xsendfile, lighttpd; local backend only).
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import Request, current_app
+from sqlalchemy.exc import IntegrityError
+from tzlocal import get_localzone
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.security import safe_join
+
+from app.extensions import db
+from app.models import UploadBlob
+
+tz = get_localzone()
+
+CHUNK_SIZE = 64 * 1024
+
+# "<namespace>/<sha256>", the prefix all objects of one blob are stored under
+BLOB_KEY = re.compile(r'^([a-z]+/[0-9a-f]{64})/')
+
+# An opened stored object; `path` is set when it is a file on local disk
+StoredObject = namedtuple('StoredObject', 'stream size modified path')
+
+
+def blob_key(path):
+    """
+    Blob key of a stored path ("avatars/<sha256>/64.jpg" -> "avatars/<sha256>"),
+    or None for anything else (external URLs, legacy uploads, ...).
+    """
+    match = BLOB_KEY.match(path or '')
+    return match.group(1) if match else None
+
+
+class HashingFile:
+    """
+    Temporary file for one uploaded file that hashes and counts what is written
+    to it, and refuses to grow past `limit` bytes.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = tempfile.TemporaryFile()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """
+    Request class that streams uploaded files into HashingFiles.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingFile(current_app.config['UPLOAD_MAX_BYTES'])
+
+
+class LocalBackend:
+    """
+    Objects as files below a root directory.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def path(self, key):
+        """
+        Absolute path of an object, or None if the key points outside the root.
+        """
+        return safe_join(self.root, key)
+
+    def put(self, key, stream):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename, so readers never see half a file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                shutil.copyfileobj(stream, target, CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def open(self, key):
+        path = self.path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        return StoredObject(open(path, 'rb'), stat.st_size, stat.st_mtime, path)
+
+    def delete_prefix(self, prefix):
+        path = self.path(prefix)
+        if path is not None and os.path.isdir(path):
+            shutil.rmtree(path)
+
+    def walk(self):
+        """
+        Yields (key, modification time) for every object.
+        """
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, os.stat(path).st_mtime
+
+
+class S3Backend:
+    """
+    Objects in an S3 bucket, below an optional key prefix.
+    """
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("UPLOAD_STORAGE_BACKEND = 's3' needs the boto3 package (pip install boto3)") from e
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def put(self, key, stream):
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        self.client.upload_fileobj(stream, self.bucket, self.prefix + key, ExtraArgs={'ContentType': content_type})
+
+    def open(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return StoredObject(response['Body'], response['ContentLength'], response['LastModified'].timestamp(), None)
+
+    def delete_prefix(self, prefix):
+        keys = [{'Key': self.prefix + key} for key, _ in self._list(prefix)]
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': keys[start:start + 1000], 'Quiet': True})
+
+    def walk(self):
+        """
+        Yields (key, modification time) for every object.
+        """
+        return self._list('')
+
+    def _list(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for entry in page.get('Contents', ()):
+                yield entry['Key'][len(self.prefix):], entry['LastModified'].timestamp()
+
+
+class PendingBlob:
+    """
+    Content for a blob key that may still have to be written to the backend.
+    `write` stores it and is only ever run once.
+    """
+
+    def __init__(self, key, size, write):
+        self.key = key
+        self.size = size
+        self.written = False
+        self._write = write
+
+    def write(self):
+        if not self.written:
+            self._write()
+            self.written = True
+
+
+class UploadStorage:
+    """
+    Deduplicating, reference-counted upload storage.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self.legacy = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the storage to an app, pick its backend and install the hashing
+        request class.
+        """
+        app.config.setdefault('UPLOAD_STORAGE_BACKEND', 'local')
+        app.config.setdefault('UPLOAD_STORAGE_PATH', None)
+        app.config.setdefault('UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('UPLOAD_S3_BUCKET', None)
+        app.config.setdefault('UPLOAD_S3_PREFIX', '')
+        app.config.setdefault('UPLOAD_S3_ENDPOINT_URL', None)
+        app.config.setdefault('UPLOAD_S3_REGION', None)
+        app.config.setdefault('UPLOAD_GC_GRACE_HOURS', 24)
+        app.config.setdefault('UPLOAD_SERVE_MODE', 'app')
+        app.config.setdefault('UPLOAD_ACCEL_PREFIX', '/_uploads/')
+
+        # Uploads from before content-addressed storage are files in the upload folder
+        self.legacy = LocalBackend(app.config['UPLOAD_FOLDER'])
+
+        name = app.config['UPLOAD_STORAGE_BACKEND']
+        if name == 'local':
+            self.backend = LocalBackend(app.config['UPLOAD_STORAGE_PATH'] or app.config['UPLOAD_FOLDER'])
+        elif name == 's3':
+            if not app.config['UPLOAD_S3_BUCKET']:
+                raise ValueError("UPLOAD_STORAGE_BACKEND = 's3' needs UPLOAD_S3_BUCKET")
+            self.backend = S3Backend(app.config['UPLOAD_S3_BUCKET'], app.config['UPLOAD_S3_PREFIX'],
+                                     app.config['UPLOAD_S3_ENDPOINT_URL'], app.config['UPLOAD_S3_REGION'])
+        else:
+            raise ValueError(f"Unknown UPLOAD_STORAGE_BACKEND '{name}'")
+
+        mode = app.config['UPLOAD_SERVE_MODE']
+        if mode not in ('app', 'x-accel-redirect', 'x-sendfile'):
+            raise ValueError(f"Unknown UPLOAD_SERVE_MODE '{mode}'")
+        if mode == 'x-sendfile' and not isinstance(self.backend, LocalBackend):
+            raise ValueError("UPLOAD_SERVE_MODE = 'x-sendfile' needs UPLOAD_STORAGE_BACKEND = 'local'")
+
+        app.request_class = UploadRequest
+        self.app = app
+        app.extensions['upload_storage'] = self
+
+    def digest(self, file_storage):
+        """
+        (SHA-256 hex digest, size) of an uploaded file. Free for files parsed by
+        UploadRequest; anything else is read once to hash it.
+        """
+        stream = file_storage.stream
+        if isinstance(stream, HashingFile):
+            return stream.hexdigest(), stream.size
+        digest, size = hashlib.sha256(), 0
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        stream.seek(0)
+        return digest.hexdigest(), size
+
+    def open(self, key):
+        """
+        Open a stored object, falling back to legacy files in the upload folder.
+
+        Returns:
+            StoredObject, or None if there is no such object.
+        """
+        stored = self.backend.open(key)
+        if stored is None and not (isinstance(self.backend, LocalBackend) and self.backend.root == self.legacy.root):
+            stored = self.legacy.open(key)
+        return stored
+
+    def prepare(self, key, size, write):
+        """
+        Get content ready to be referenced under blob `key`. `write()` stores
+        its objects; it runs now if the blob is not stored yet, and is skipped
+        entirely for content that is.
+
+        Call before the unit of work, so no transaction is open while content
+        is processed and written, then pass the result to `acquire()`.
+        """
+        pending = PendingBlob(key, size, write)
+        exists = db.session.scalar(db.select(UploadBlob.key).where(UploadBlob.key == key))
+        if exists is None:
+            pending.write()
+        return pending
+
+    def acquire(self, pending):
+        """
+        Take a reference to a prepared blob. Call inside the unit of work that
+        saves the reference.
+        """
+        if self._add_references(pending.key, 1):
+            return
+        # New content, or the blob was collected since prepare(): (re)write it
+        pending.write()
+        try:
+            with db.session.begin_nested():
+                db.session.add(UploadBlob(key=pending.key, size=pending.size, ref_count=1))
+        except IntegrityError:
+            # The same content was stored by a concurrent request in the meantime
+            self._add_references(pending.key, 1)
+
+    def release(self, key):
+        """
+        Drop a reference to blob `key`. Call inside the unit of work that
+        removes the reference. The blob is deleted by `collect()` later.
+        """
+        self._add_references(key, -1)
+
+    def _add_references(self, key, count):
+        statement = db.update(UploadBlob).where(UploadBlob.key == key)
+        if count < 0:
+            statement = statement.where(UploadBlob.ref_count > 0)
+        result = db.session.execute(
+            statement
+            .values(ref_count=UploadBlob.ref_count + count, updated_at=datetime.now(tz))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def collect(self, grace=None):
+        """
+        Delete blobs without references and stray objects without a blob row,
+        once they are older than `grace` (default UPLOAD_GC_GRACE_HOURS).
+
+        Returns:
+            (number of blobs deleted, number of stray blobs deleted)
+        """
+        if grace is None:
+            grace = timedelta(hours=self.app.config['UPLOAD_GC_GRACE_HOURS'])
+        cutoff = datetime.now(tz) - grace
+
+        unreferenced = (UploadBlob.ref_count <= 0, UploadBlob.updated_at < cutoff)
+        keys = db.session.scalars(db.select(UploadBlob.key).where(*unreferenced)).all()
+        db.session.rollback()
+
+        deleted = 0
+        for key in keys:
+            # Delete the row first: its lock makes a concurrent acquire() wait, find the
+            # blob gone and write it again, instead of referencing deleted objects
+            try:
+                result = db.session.execute(
+                    db.delete(UploadBlob)
+                    .where(UploadBlob.key == key, *unreferenced)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    self.backend.delete_prefix(key + '/')
+                    deleted += 1
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        # Objects of blobs that never got a row; only touched once older than the grace
+        # period, so blobs between prepare() and acquire() are safe
+        newest = {}
+        for object_key, modified in self.backend.walk():
+            match = BLOB_KEY.match(object_key)
+            if match:
+                newest[match.group(1)] = max(newest.get(match.group(1), 0), modified)
+        stray = 0
+        for key, modified in newest.items():
+            if modified >= cutoff.timestamp():
+                continue
+            if db.session.scalar(db.select(UploadBlob.key).where(UploadBlob.key == key)) is None:
+                logging.info(f"Deleting stray upload objects under {key}/")
+                self.backend.delete_prefix(key + '/')
+                stray += 1
+        db.session.rollback()
+
+        return deleted, stray
+
+    def collect_legacy(self, folder, keep, grace=None):
+        """
+        Delete files from before this storage existed that lie directly in
+        `folder` of the upload folder and are not named in `keep`, once they
+        are older than `grace` (default UPLOAD_GC_GRACE_HOURS). Subdirectories
+        are left alone: they hold stored blobs when the local backend shares
+        the upload folder.
+
+        Returns:
+            number of files deleted
+        """
+        if grace is None:
+            grace = timedelta(hours=self.app.config['UPLOAD_GC_GRACE_HOURS'])
+        cutoff = (datetime.now(tz) - grace).timestamp()
+
+        path = self.legacy.path(folder)
+        if path is None or not os.path.isdir(path):
+            return 0
+
+        deleted = 0
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name in keep or not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    logging.info(f"Deleting unused legacy upload {folder}/{entry.name}")
+                    os.remove(entry.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+
+# Shared upload storage instance, bound to the app in create_app()
+upload_storage = UploadStorage()
@@ -0,0 +1,165 @@
+"""
+sync.py
+
+Change tracking for delta sync (/shopping/sync).
+
+Every list and item row carries `changed_seq`, the household change sequence
+(`Household.version`, see app/bus.py) of the transaction that last changed it.
+Deletions leave a SyncTombstone with the same sequence number. A client that
+synced at sequence N therefore only needs the rows and tombstones above N,
+read through the (household_id, changed_seq) / (shoppinglist_id, changed_seq)
+and (household_id, seq) indexes.
+
+ORM inserts, updates and deletes of ShoppingList and ListItem are stamped
+automatically before each flush. Bulk statements stamp their rows with
+`change_seq()` and record deletions with `record_deletions()`.
+"""
+
+import base64
+from datetime import datetime
+
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from app.bus import change_seq as household_change_seq
+from app.extensions import db
+from app.models import ShoppingList, ListItem, SyncTombstone
+
+
+def encode_sync_cursor(household_id, seq, issued_at):
+    """
+    Opaque cursor for "household `household_id` at change sequence `seq`",
+    handed out by /shopping/sync at `issued_at`.
+    """
+    raw = f"{household_id}|{seq}|{issued_at.isoformat()}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    """
+    Inverse of `encode_sync_cursor`.
+
+    Returns:
+        (household_id, seq, issued_at), or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        household_id, seq, issued_at = raw.split('|', 2)
+        issued_at = datetime.fromisoformat(issued_at)
+    except ValueError:
+        return None
+    if issued_at.tzinfo is None or not household_id.isdigit() or not seq.isdigit():
+        return None
+    return int(household_id), int(seq), issued_at
+
+
+def change_seq():
+    """
+    Change sequence number of the current user's household for this
+    transaction, to stamp on rows written by bulk statements.
+    """
+    return household_change_seq(current_user.household_id)
+
+
+def record_deletions(household_id, entity, ids, list_id=None):
+    """
+    Leave tombstones for rows removed by a bulk DELETE.
+
+    Args:
+        household_id (int): Household the rows belonged to.
+        entity (str): 'list' or 'item'.
+        ids (list[int]): Primary keys of the deleted rows.
+        list_id (int, optional): List the deleted items belonged to.
+    """
+    if not ids:
+        return
+    seq = household_change_seq(household_id)
+    db.session.execute(db.insert(SyncTombstone), [
+        {'household_id': household_id, 'entity': entity, 'entity_id': row_id, 'list_id': list_id, 'seq': seq}
+        for row_id in ids
+    ])
+
+
+def _household_of(session, obj):
+    if isinstance(obj, ShoppingList):
+        return obj.household_id
+    shopping_list = session.get(ShoppingList, obj.shoppinglist_id)
+    return shopping_list.household_id if shopping_list is not None else None
+
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_orm_changes(session, flush_context, instances):
+    """
+    Stamp new and modified lists and items with the household's change
+    sequence, and leave tombstones for deleted ones.
+    """
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, (ShoppingList, ListItem)):
+            continue
+        if obj not in session.new and not session.is_modified(obj, include_collections=False):
+            continue
+        household_id = _household_of(session, obj)
+        if household_id is not None:
+            obj.changed_seq = household_change_seq(household_id)
+
+    for obj in list(session.deleted):
+        if not isinstance(obj, (ShoppingList, ListItem)):
+            continue
+        household_id = _household_of(session, obj)
+        if household_id is None:
+            continue
+        session.add(SyncTombstone(
+            household_id=household_id,
+            entity='list' if isinstance(obj, ShoppingList) else 'item',
+            entity_id=obj.id,
+            list_id=obj.shoppinglist_id if isinstance(obj, ListItem) else None,
+            seq=household_change_seq(household_id)
+        ))
+
+
+def changes_since(household_id, since=None):
+    """
+    Everything a client at change sequence `since` is missing.
+
+    With `since` None the whole household is returned and there are no
+    tombstones. Lists are included when they changed themselves or when one
+    of their items changed or was deleted, so their counters stay current.
+
+    SQLite hands out the id of a deleted row again (its ids are plain rowids).
+    A tombstone whose id belongs to a row written at or after it is therefore
+    left out, so the id is never both changed and deleted in one response.
+
+    Returns:
+        (lists, items, tombstones)
+    """
+    items_query = (
+        db.select(ListItem)
+        .join(ListItem.shopping_list)
+        .options(selectinload(ListItem.added_by))
+        .where(ShoppingList.household_id == household_id)
+    )
+    lists_query = db.select(ShoppingList).where(ShoppingList.household_id == household_id)
+
+    if since is None:
+        items = db.session.scalars(items_query.order_by(ListItem.id)).all()
+        lists = db.session.scalars(lists_query.order_by(ShoppingList.id)).all()
+        return lists, items, []
+
+    items = db.session.scalars(items_query.where(ListItem.changed_seq > since).order_by(ListItem.id)).all()
+    tombstones = db.session.scalars(
+        db.select(SyncTombstone)
+        .where(SyncTombstone.household_id == household_id, SyncTombstone.seq > since)
+        .order_by(SyncTombstone.seq, SyncTombstone.id)
+    ).all()
+
+    touched = {item.shoppinglist_id for item in items} | {t.list_id for t in tombstones if t.list_id is not None}
+    lists = db.session.scalars(
+        lists_query.where(db.or_(ShoppingList.changed_seq > since, ShoppingList.id.in_(touched)))
+        .order_by(ShoppingList.id)
+    ).all()
+
+    live = {('item', item.id): item.changed_seq for item in items}
+    live.update({('list', shopping_list.id): shopping_list.changed_seq for shopping_list in lists})
+    tombstones = [t for t in tombstones if live.get((t.entity, t.entity_id), -1) < t.seq]
+    return lists, items, tombstones
@@ -0,0 +1,224 @@
+"""
+throttle.py
+
+Token-bucket throttling for login and household join attempts.
+
+A failed login still costs a full password hash, and a join attempt costs a
+`join_code` lookup. Routes therefore ask the throttle first, before they hash
+anything or touch the database. Each attempt takes one token from every bucket
+it is keyed by (e.g. the client IP and the join code). Buckets refill at the
+configured rate. When any bucket is empty, the route answers 429 with a
+Retry-After.
+
+Logins take a token from the IP bucket on every attempt, but from the
+per-username bucket only when the password was wrong (`check` before, `hit`
+after). That bucket is keyed by client and username, so nobody can lock a
+user out by failing logins under their name from elsewhere.
+
+Limits are written as "<count>/<second|minute|hour>": a bucket holds `count`
+tokens and refills `count` tokens per period.
+
+Backends (THROTTLE_BACKEND):
+- memory (default): buckets live in this process. Each gunicorn worker counts
+  separately, so the effective limit is multiplied by the number of workers.
+  A sweep every THROTTLE_SWEEP_INTERVAL seconds drops buckets that have
+  refilled, so memory only holds clients seen recently.
+- redis: buckets are shared by all workers in Redis (THROTTLE_REDIS_URL) and
+  expire on their own.
+
+Clients are identified by `request.remote_addr`. Behind a reverse proxy, wrap
+the app in werkzeug's ProxyFix so that this is the real client address.
+"""
+
+import threading
+import time
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+# Takes one token from every bucket in KEYS, or none if any is empty.
+# ARGV: 1 to take tokens or 0 to only check, then capacity and refill rate
+# (tokens/second) for each key, in order.
+# Returns 0 when allowed, otherwise the milliseconds until a token is free.
+REDIS_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens, wait = {}, 0
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'stamp')
+    local level = capacity
+    if bucket[1] then
+        level = math.min(capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+    end
+    tokens[i] = level
+    if level < 1 then
+        wait = math.max(wait, (1 - level) / rate)
+    end
+end
+if wait > 0 then
+    return math.ceil(wait * 1000)
+end
+if ARGV[1] == '0' then
+    return 0
+end
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'stamp', now)
+    redis.call('PEXPIRE', key, math.ceil((capacity - tokens[i] + 1) / rate * 1000))
+end
+return 0
+"""
+
+
+def parse_limit(limit):
+    """
+    "5/minute" -> (capacity 5, refill rate in tokens per second)
+    """
+    count, _, period = limit.partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid throttle limit '{limit}', expected e.g. '5/minute'")
+    return int(count), int(count) / PERIODS[period]
+
+
+class MemoryBackend:
+    """
+    Buckets in a dict of key -> [tokens, last update], guarded by one lock.
+    """
+
+    def __init__(self, limits, sweep_interval):
+        self.limits = limits
+        self.sweep_interval = sweep_interval
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def take(self, buckets, consume=True):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep > self.sweep_interval:
+                self._sweep(now)
+
+            levels, wait = [], 0
+            for key, capacity, rate in buckets:
+                bucket = self._buckets.get(key)
+                level = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                levels.append(level)
+                if level < 1:
+                    wait = max(wait, (1 - level) / rate)
+            if wait or not consume:
+                return wait
+
+            for (key, capacity, rate), level in zip(buckets, levels):
+                self._buckets[key] = [level - 1, now]
+            return 0
+
+    def _sweep(self, now):
+        """
+        Drop buckets that have refilled completely; a missing bucket is a full one.
+        """
+        self._last_sweep = now
+        full = []
+        for key, (tokens, stamp) in self._buckets.items():
+            capacity, rate = self.limits[key[0]]
+            if tokens + (now - stamp) * rate >= capacity:
+                full.append(key)
+        for key in full:
+            del self._buckets[key]
+
+
+class RedisBackend:
+    """
+    Buckets in Redis hashes, updated atomically by a Lua script.
+    """
+
+    def __init__(self, url, prefix):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("THROTTLE_BACKEND = 'redis' needs the redis package (pip install redis)") from e
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(REDIS_SCRIPT)
+
+    def take(self, buckets, consume=True):
+        keys = [self.prefix + ':'.join(key) for key, capacity, rate in buckets]
+        args = [1 if consume else 0] + [value for key, capacity, rate in buckets for value in (capacity, rate)]
+        return self.script(keys=keys, args=args) / 1000
+
+
+class Throttle:
+    """
+    Token-bucket limiter for expensive, abusable requests.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self.limits = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the throttle to an app and parse its limits.
+        """
+        app.config.setdefault('THROTTLE_ENABLED', True)
+        app.config.setdefault('THROTTLE_BACKEND', 'memory')
+        app.config.setdefault('THROTTLE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('THROTTLE_SWEEP_INTERVAL', 60)
+        app.config.setdefault('THROTTLE_LOGIN_PER_IP', '30/minute')
+        app.config.setdefault('THROTTLE_LOGIN_PER_USERNAME', '5/minute')
+        app.config.setdefault('THROTTLE_JOIN_PER_IP', '10/minute')
+        app.config.setdefault('THROTTLE_JOIN_PER_CODE', '5/minute')
+
+        self.limits = {
+            'login-ip': parse_limit(app.config['THROTTLE_LOGIN_PER_IP']),
+            'login-username': parse_limit(app.config['THROTTLE_LOGIN_PER_USERNAME']),
+            'join-ip': parse_limit(app.config['THROTTLE_JOIN_PER_IP']),
+            'join-code': parse_limit(app.config['THROTTLE_JOIN_PER_CODE']),
+        }
+
+        name = app.config['THROTTLE_BACKEND']
+        if name == 'memory':
+            self.backend = MemoryBackend(self.limits, app.config['THROTTLE_SWEEP_INTERVAL'])
+        elif name == 'redis':
+            self.backend = RedisBackend(app.config['THROTTLE_REDIS_URL'], 'throttle:')
+        else:
+            raise ValueError(f"Unknown THROTTLE_BACKEND '{name}'")
+
+        self.app = app
+        app.extensions['throttle'] = self
+
+    def hit(self, **keys):
+        """
+        Count one attempt against the named buckets, e.g.
+        `throttle.hit(login_ip=addr, login_username=name)`.
+
+        Returns:
+            0 if the attempt may go ahead, otherwise the number of seconds
+            until it would be allowed (nothing is taken in that case).
+        """
+        return self._take(keys, consume=True)
+
+    def check(self, **keys):
+        """
+        Like `hit`, but only tells whether an attempt would be allowed; no
+        token is taken.
+        """
+        return self._take(keys, consume=False)
+
+    def _take(self, keys, consume):
+        if not self.app.config['THROTTLE_ENABLED']:
+            return 0
+        buckets = []
+        for name, value in keys.items():
+            name = name.replace('_', '-')
+            capacity, rate = self.limits[name]
+            buckets.append(((name, str(value)), capacity, rate))
+        return self.backend.take(buckets, consume)
+
+
+# Shared throttle instance, bound to the app in create_app()
+throttle = Throttle()
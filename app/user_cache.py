@@ -0,0 +1,147 @@
+"""
+user_cache.py
+
+Per-process cache for the Flask-Login user loader.
+
+Every authenticated request reloads `current_user`, and most of them then
+lazy-load `current_user.household` as well. The cache keeps a small snapshot
+of both (plain column values, keyed by user ID) and rebuilds the ORM objects
+from it without touching the database. The snapshots are attached to the
+request's session as if they had just been loaded, so routes can read and
+modify `current_user` exactly as before.
+
+Left out of the snapshot, and loaded on first access:
+- User.password, so hashes are not held in memory
+- Household.version, which changes with every edit in the household
+
+Entries expire after USER_CACHE_TTL seconds, and the least recently used ones
+are evicted beyond USER_CACHE_SIZE entries. Routes that change a user or
+household invalidate the affected entries after committing. Other workers
+drop theirs when the change arrives on the change bus (app/bus.py).
+Setting USER_CACHE_TTL = 0 disables the cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.bus import change_bus
+from app.extensions import db
+from app.models import User, Household
+
+USER_FIELDS = ('id', 'username', 'name', 'role', 'avatar_url', 'household_id')
+HOUSEHOLD_FIELDS = ('id', 'name', 'join_code', 'admin_id', 'created_at')
+
+
+class UserCache:
+    """
+    TTL + LRU cache of user / household snapshots.
+    Initialised like any other Flask extension in the application factory.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced one is not stored
+        self._generation = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Bind the cache to an app and listen for user / household changes
+        made by other workers.
+        """
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        app.config.setdefault('USER_CACHE_SIZE', 1024)
+
+        self.app = app
+        app.extensions['user_cache'] = self
+        change_bus.subscribe(self._on_change)
+
+    def load(self, user_id):
+        """
+        Return the user with the given ID, attached to the current session,
+        or None if there is no such user.
+        """
+        ttl = self.app.config['USER_CACHE_TTL']
+        if ttl <= 0:
+            return db.session.get(User, user_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+            generation = self._generation
+        if entry is not None and entry[0] > now:
+            return self._attach(entry[1], entry[2])
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        user_values = {field: getattr(user, field) for field in USER_FIELDS}
+        household = user.household
+        household_values = {field: getattr(household, field) for field in HOUSEHOLD_FIELDS} if household else None
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (now + ttl, user_values, household_values)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.app.config['USER_CACHE_SIZE']:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, *user_ids):
+        """
+        Drop the cached snapshots of the given users.
+        """
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def invalidate_household(self, household_id):
+        """
+        Drop the cached snapshots of every member of a household.
+        """
+        with self._lock:
+            self._generation += 1
+            for user_id in [user_id for user_id, entry in self._entries.items()
+                            if entry[1]['household_id'] == household_id]:
+                del self._entries[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _attach(self, user_values, household_values):
+        """
+        Rebuild the user (and household) from a snapshot and merge them into
+        the session as clean, already-loaded rows. No SQL is emitted.
+        """
+        user = User(**user_values)
+        make_transient_to_detached(user)
+        household = None
+        if household_values is not None:
+            household = Household(**household_values)
+            make_transient_to_detached(household)
+        # Set without events, so the household's `members` stays unloaded
+        set_committed_value(user, 'household', household)
+        return db.session.merge(user, load=False)
+
+    def _on_change(self, message):
+        if message['entity'] == 'user':
+            self.invalidate(message['id'])
+        elif message['entity'] == 'household':
+            self.invalidate_household(message['household_id'])
+
+
+# Shared cache instance, bound to the app in create_app()
+user_cache = UserCache()
@@ -2,30 +2,260 @@
 utils.py
 
 This module contains utility functions for the Shopping Manager app:
+- Grouping a route's changes into a single transaction (unit of work)
+- Encoding keyset pagination cursors
+- Conditional GET (weak ETags built from version counters)
 - Logging user activities to the database
 - Formatting human-readable descriptions for those activities
 """
 
+import base64
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, current_app, request, session, make_response
+from flask_login import current_user
 from app.extensions import db
 from app.models import ActivityLog
 
 
-def log_activity(user_id, household_id, action_type, timestamp, item_name=None, list_name=None, new_name=None, old_name=None):
+@contextmanager
+def unit_of_work():
+    """
+    Groups a route's changes and its activity log rows into one transaction.
+
+    Everything added to the session inside the block, including rows staged by
+    log_activity, is committed once on exit and rolled back if an exception
+    escapes. Nested blocks join the outermost one.
+
+    Usage:
+        with unit_of_work():
+            item.name = new_name
+            log_activity(...)
+    """
+    depth = g.get('unit_of_work_depth', 0)
+    g.unit_of_work_depth = depth + 1
+    try:
+        yield db.session
+        if depth == 0:
+            db.session.commit()
+    except Exception:
+        if depth == 0:
+            db.session.rollback()
+        raise
+    finally:
+        g.unit_of_work_depth = depth
+
+
+def encode_cursor(moment, row_id):
+    """
+    Opaque keyset cursor for the row at (moment, row_id).
+
+    Used by paginated endpoints that order rows by a timestamp with the
+    primary key as tie-breaker.
+    """
+    raw = f"{moment.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Inverse of `encode_cursor`.
+
+    Returns:
+        (moment, row_id), or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        moment, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except ValueError:
+        return None
+
+
+def version_etag(*parts):
+    """
+    Weak ETag for a page rendered from version counters.
+
+    Besides `parts` (e.g. a kind of page and the versions it was built from),
+    the tag covers the viewing user, because pages differ per member, and the
+    current half of the CSRF token lifetime, because pages embed a token that
+    expires.
+    """
+    lifetime = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    window = int(time.time() // (lifetime / 2)) if lifetime else 0
+    return '-'.join(str(part) for part in (*parts, f"u{current_user.id}", window))
+
+
+def not_modified(etag):
+    """
+    A 304 response if the client's If-None-Match already holds `etag`,
+    otherwise None. A pending flash message always forces a full response.
+
+    Usage:
+        etag = version_etag('list', shopping_list.id, shopping_list.version)
+        if (response := not_modified(etag)) is not None:
+            return response
+        return with_etag(render_template(...), etag)
+    """
+    if '_flashes' in session or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(('', 304), etag)
+
+
+def with_etag(response, etag):
+    """
+    Attach a weak ETag to a view's return value. Browsers must revalidate on
+    every use and shared caches must not store the page.
+    """
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def too_many_attempts(response, retry_after):
+    """
+    Turn a view's return value into a 429 with a Retry-After of
+    `retry_after` seconds (as returned by `throttle.hit`).
+    """
+    response = make_response(response, 429)
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+def log_activity(user_id, household_id, action_type, timestamp, item_name=None, list_name=None, new_name=None, old_name=None, count=None):
     """
     Logs an action performed by a user into the ActivityLog table.
 
+    The names describing the action are stored in the row's JSON `details`
+    column so the feed can show "Renamed 'Milk' to 'Oat milk'." rather than
+    a generic message. Actions on many items at once store how many in `count`.
+
+    The row is staged in the caller's session, so it is committed together
+    with the change it describes; call it inside the route's unit_of_work().
     """
-    activity = ActivityLog(
+    details = {
+        key: value for key, value in (
+            ('item_name', item_name),
+            ('list_name', list_name),
+            ('old_name', old_name),
+            ('new_name', new_name),
+            ('count', count),
+        ) if value is not None
+    } or None
+
+    db.session.add(ActivityLog(
         user_id=user_id,
         household_id=household_id,
         action_type=action_type,
-        timestamp = timestamp
-    )
-    db.session.add(activity)
-    db.session.commit()
+        timestamp=timestamp,
+        details=details
+    ))
+
+
+# Message templates per action type. Each entry lists (template, required fields)
+# candidates in order of preference; the first whose fields are all present wins.
+# The last candidate of every entry needs no fields.
+ACTION_FORMATS = {
+    "Item Addition": (
+        ("Added '{item_name}' to the list.", ('item_name',)),
+        ("Added an item.", ()),
+    ),
+    "Bulk Item Addition": (
+        ("Added {count} items to {list_name}.", ('count', 'list_name')),
+        # Rows logged before `count` existed hold "<n> items" in item_name
+        ("Added {item_name} to {list_name}.", ('item_name', 'list_name')),
+        ("Added several items.", ()),
+    ),
+    "Item Deletion": (
+        ("Deleted '{item_name}' from {list_name}.", ('item_name', 'list_name')),
+        ("Deleted '{item_name}'.", ('item_name',)),
+        ("Deleted an item.", ()),
+    ),
+    "Item Renaming": (
+        ("Renamed '{old_name}' to '{new_name}'.", ('old_name', 'new_name')),
+        ("Renamed an item to '{new_name}'.", ('new_name',)),
+        ("Renamed an item.", ()),
+    ),
+    "Item Editing": (
+        ("Edited '{old_name}' (now '{new_name}').", ('old_name', 'new_name')),
+        ("Edited '{new_name}'.", ('new_name',)),
+        ("Edited an item.", ()),
+    ),
+    "Household Creation": (
+        ("Created the household.", ()),
+    ),
+    "Household Renaming": (
+        ("Renamed the household from '{old_name}' to '{new_name}'.", ('old_name', 'new_name')),
+        ("Renamed the household to '{new_name}'.", ('new_name',)),
+        ("Renamed the household.", ()),
+    ),
+    "Household Joining": (
+        ("Joined the household.", ()),
+    ),
+    "Household Leaving": (
+        ("Left the household.", ()),
+    ),
+    "Member Removal": (
+        ("Was removed from the household.", ()),
+    ),
+    "List Creation": (
+        ("Created a new list: '{list_name}'.", ('list_name',)),
+        ("Created a new list.", ()),
+    ),
+    "List Deletion": (
+        ("Deleted the list: '{list_name}'.", ('list_name',)),
+        ("Deleted a list.", ()),
+    ),
+    "List Renaming": (
+        ("Renamed the list from '{old_name}' to '{new_name}'.", ('old_name', 'new_name')),
+        ("Renamed the list to '{new_name}'.", ('new_name',)),
+        ("Renamed the list.", ()),
+    ),
+    "Mark as Purchased": (
+        ("Marked '{item_name}' as purchased.", ('item_name',)),
+        ("Marked an item as purchased.", ()),
+    ),
+    "Purchased Items Clearing": (
+        ("Cleared {count} purchased items from {list_name}.", ('count', 'list_name')),
+        ("Cleared purchased items ({item_name}) from {list_name}.", ('item_name', 'list_name')),
+        ("Cleared purchased items.", ()),
+    ),
+    "Mark All as Purchased": (
+        ("Marked all {count} items in {list_name} as purchased.", ('count', 'list_name')),
+        ("Marked all {item_name} in {list_name} as purchased.", ('item_name', 'list_name')),
+        ("Marked all items as purchased.", ()),
+    ),
+    "Unmark All": (
+        ("Unchecked {count} items in {list_name}.", ('count', 'list_name')),
+        ("Unchecked {item_name} in {list_name}.", ('item_name', 'list_name')),
+        ("Unchecked all items.", ()),
+    ),
+    "Admin Leaving": (
+        ("(Admin) left the household, transferred to {new_name}", ('new_name',)),
+        ("(Admin) left the household.", ()),
+    ),
+    "Daily Summary": (
+        ("{total} actions on {date} (older activity summarised).", ('total', 'date')),
+        ("Summary of older activity.", ()),
+    ),
+    "Name Change": (
+        ("Changed their name from '{old_name}' to '{new_name}'.", ('old_name', 'new_name')),
+        ("Changed their name to '{new_name}'.", ('new_name',)),
+        ("Changed their name.", ()),
+    ),
+}
 
+# Templates bound to their str.format method once at import time
+_ACTION_FORMATTERS = {
+    action_type: tuple((template.format, fields) for template, fields in candidates)
+    for action_type, candidates in ACTION_FORMATS.items()
+}
 
-def format_action(action_type, item_name=None, list_name=None, new_name=None, old_name=None):
+
+def format_action(action_type, item_name=None, list_name=None, new_name=None, old_name=None, **extra):
     """
     Generates a human-readable string that describes a logged activity.
 
@@ -35,71 +265,16 @@ def format_action(action_type, item_name=None, list_name=None, new_name=None, ol
         list_name (str, optional): Name of the list involved.
         new_name (str, optional): New name used in renaming.
         old_name (str, optional): Old name used in renaming.
+        **extra: Any other fields stored in the row's details (e.g. summary totals).
 
     Returns:
         str: A formatted message describing the action.
     """
-    if action_type == "Item Addition":
-        return f"Added '{item_name}' to the list." if item_name else "Added an item."
-
-    elif action_type == "Item Deletion":
-        return f"Deleted '{item_name}' from {list_name}." if item_name else "Deleted an item."
-
-    elif action_type == "Item Renaming":
-        if old_name and new_name:
-            return f"Renamed '{old_name}' to '{new_name}'."
-        elif new_name:
-            return f"Renamed an item to '{new_name}'."
-        else:
-            return "Renamed an item."
-
-    elif action_type == "Household Creation":
-        return "Created the household."
-
-    elif action_type == "Household Renaming":
-        if old_name and new_name:
-            return f"Renamed the household from '{old_name}' to '{new_name}'."
-        elif new_name:
-            return f"Renamed the household to '{new_name}'."
-        else:
-            return "Renamed the household."
-
-    elif action_type == "Household Joining":
-        return "Joined the household."
-
-    elif action_type == "Household Leaving":
-        return "Left the household."
-
-    elif action_type == "Member Removal":
-        return "Was removed from the household."
-
-    elif action_type == "List Creation":
-        return f"Created a new list: '{list_name}'." if list_name else "Created a new list."
-
-    elif action_type == "List Deletion":
-        return f"Deleted the list: '{list_name}'." if list_name else "Deleted a list."
-
-    elif action_type == "List Renaming":
-        if old_name and new_name:
-            return f"Renamed the list from '{old_name}' to '{new_name}'."
-        elif new_name:
-            return f"Renamed the list to '{new_name}'."
-        else:
-            return "Renamed the list."
-
-    elif action_type == "Mark as Purchased":
-        return f"Marked '{item_name}' as purchased." if item_name else "Marked an item as purchased."
-
-    elif action_type == "Admin Leaving":
-        return f"(Admin) left the household, transferred to {new_name}"
-    
-    elif action_type == "Name Change":
-        if old_name and new_name:
-            return f"Changed their name from '{old_name}' to '{new_name}'."
-        elif new_name:
-            return f"Changed their name to '{new_name}'."
-        else:
-            return "Changed their name."
-        
-    else:
+    candidates = _ACTION_FORMATTERS.get(action_type)
+    if candidates is None:
         return f"Performed the action: {action_type}"
+
+    details = {'item_name': item_name, 'list_name': list_name, 'new_name': new_name, 'old_name': old_name, **extra}
+    for render, fields in candidates:
+        if all(details.get(field) for field in fields):
+            return render(**details)
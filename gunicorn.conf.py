@@ -0,0 +1,16 @@
+"""
+gunicorn.conf.py
+
+Settings gunicorn reads when started from the project root (`gunicorn run:app`).
+
+Live list updates keep a Server-Sent Events stream open per viewer for up to
+LIST_EVENTS_MAX_AGE seconds. A sync worker would be tied up by each one, so
+workers are threaded: a stream holds one thread, and LIST_EVENTS_MAX_STREAMS
+(below `threads`) keeps the rest free for ordinary requests.
+"""
+
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
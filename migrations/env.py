@@ -97,6 +97,13 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # Batch migrations recreate SQLite tables (DROP + RENAME). With foreign
+        # keys enforced that DROP would cascade into child tables, so switch
+        # enforcement off for the migration run (it must happen outside a transaction).
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,36 @@
+"""Added row versions for optimistic locking of lists and items
+
+Revision ID: 5a7c2e8d4f19
+Revises: b3f4a91c07e2
+Create Date: 2026-10-17 15:12:48.530172
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7c2e8d4f19'
+down_revision = 'b3f4a91c07e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.drop_column('row_version')
+
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.drop_column('row_version')
+
+    # SQLite batch mode rebuilds shoppinglists without reflecting expression indexes
+    op.create_index('ix_shoppinglists_household_id_lower_name', 'shoppinglists',
+                    ['household_id', sa.text('lower(name)')], unique=False, if_not_exists=True)
@@ -0,0 +1,32 @@
+"""Backfilled list item counters
+
+Revision ID: 7d4e2b9c6a13
+Revises: f3a9c41e7b56
+Create Date: 2026-10-17 21:05:37.418902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d4e2b9c6a13'
+down_revision = 'f3a9c41e7b56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The counters are only adjusted by deltas from here on, so start them from the real
+    # numbers; lists created before they were maintained hold 0 or NULL
+    op.execute(
+        "UPDATE shoppinglists SET "
+        "items_count = (SELECT count(*) FROM listitems WHERE listitems.shoppinglist_id = shoppinglists.id), "
+        "purchased_items_count = (SELECT count(*) FROM listitems "
+        "WHERE listitems.shoppinglist_id = shoppinglists.id AND listitems.purchased)"
+    )
+
+
+def downgrade():
+    # Data only: the counts stay valid for the older schema
+    pass
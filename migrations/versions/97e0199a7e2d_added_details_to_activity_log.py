@@ -0,0 +1,26 @@
+"""Added details to activity log
+
+Revision ID: 97e0199a7e2d
+Revises: d1c8a62d3fc6
+Create Date: 2026-10-17 12:24:51.336078
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '97e0199a7e2d'
+down_revision = 'd1c8a62d3fc6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('details', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.drop_column('details')
@@ -0,0 +1,36 @@
+"""Added version counters to households and shopping lists
+
+Revision ID: b3f4a91c07e2
+Revises: 97e0199a7e2d
+Create Date: 2026-10-17 14:05:33.218409
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f4a91c07e2'
+down_revision = '97e0199a7e2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('households', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('households', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    # SQLite batch mode rebuilds shoppinglists without reflecting expression indexes
+    op.create_index('ix_shoppinglists_household_id_lower_name', 'shoppinglists',
+                    ['household_id', sa.text('lower(name)')], unique=False, if_not_exists=True)
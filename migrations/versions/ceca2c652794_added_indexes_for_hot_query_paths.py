@@ -0,0 +1,54 @@
+"""Added indexes for hot query paths
+
+Revision ID: ceca2c652794
+Revises: 8b54da8b8c5d
+Create Date: 2026-10-17 09:12:41.508312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ceca2c652794'
+down_revision = '8b54da8b8c5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # view_list: items of a list in insertion order
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.create_index('ix_listitems_shoppinglist_id_added_at', ['shoppinglist_id', 'added_at'], unique=False)
+
+    # dashboard: latest activity of a household
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_log_household_id_timestamp', ['household_id', 'timestamp'], unique=False)
+
+    # dashboard: lists of a household, newest first
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.create_index('ix_shoppinglists_household_id_created_at', ['household_id', 'created_at'], unique=False)
+
+    # create_list: case-insensitive duplicate name check (functional index)
+    op.create_index('ix_shoppinglists_household_id_lower_name', 'shoppinglists',
+                    ['household_id', sa.text('lower(name)')], unique=False)
+
+    # household pages: members of a household
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_household_id', ['household_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_household_id')
+
+    op.drop_index('ix_shoppinglists_household_id_lower_name', table_name='shoppinglists')
+
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.drop_index('ix_shoppinglists_household_id_created_at')
+
+    with op.batch_alter_table('activity_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_log_household_id_timestamp')
+
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.drop_index('ix_listitems_shoppinglist_id_added_at')
@@ -0,0 +1,65 @@
+"""Database-level cascades for household and list deletion
+
+Revision ID: d1c8a62d3fc6
+Revises: ceca2c652794
+Create Date: 2026-10-17 11:02:17.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1c8a62d3fc6'
+down_revision = 'ceca2c652794'
+branch_labels = None
+depends_on = None
+
+
+# The initial migration created unnamed foreign keys. On SQLite batch mode
+# names them with this convention so they can be dropped; on Postgres the
+# server-generated name is looked up instead.
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+# (table, column, referred table, ON DELETE action)
+FOREIGN_KEYS = [
+    ('listitems', 'shoppinglist_id', 'shoppinglists', 'CASCADE'),
+    ('shoppinglists', 'household_id', 'households', 'CASCADE'),
+    ('activity_log', 'household_id', 'households', 'CASCADE'),
+    ('users', 'household_id', 'households', 'SET NULL'),
+]
+
+
+def _replace_foreign_key(table, column, referred, ondelete):
+    name = f"fk_{table}_{column}_{referred}"
+    existing = next(
+        (fk['name'] for fk in sa.inspect(op.get_bind()).get_foreign_keys(table)
+         if fk['constrained_columns'] == [column]),
+        None,
+    )
+
+    with op.batch_alter_table(table, schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint(existing or name, type_='foreignkey')
+        batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def _restore_functional_index():
+    # SQLite batch mode rebuilds shoppinglists without reflecting expression indexes
+    op.create_index('ix_shoppinglists_household_id_lower_name', 'shoppinglists',
+                    ['household_id', sa.text('lower(name)')], unique=False, if_not_exists=True)
+
+
+def upgrade():
+    for table, column, referred, ondelete in FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, ondelete)
+
+    _restore_functional_index()
+
+
+def downgrade():
+    for table, column, referred, _ in reversed(FOREIGN_KEYS):
+        _replace_foreign_key(table, column, referred, None)
+
+    _restore_functional_index()
@@ -0,0 +1,59 @@
+"""Added change sequence stamps and sync tombstones
+
+Revision ID: e6b1d3a8c925
+Revises: 5a7c2e8d4f19
+Create Date: 2026-10-17 16:40:09.671254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b1d3a8c925'
+down_revision = '5a7c2e8d4f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('household_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=10), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('list_id', sa.Integer(), nullable=True),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['household_id'], ['households.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.create_index('ix_sync_tombstones_household_id_seq', ['household_id', 'seq'], unique=False)
+
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changed_seq', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_shoppinglists_household_id_changed_seq', ['household_id', 'changed_seq'], unique=False)
+
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changed_seq', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_listitems_shoppinglist_id_changed_seq', ['shoppinglist_id', 'changed_seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listitems', schema=None) as batch_op:
+        batch_op.drop_index('ix_listitems_shoppinglist_id_changed_seq')
+        batch_op.drop_column('changed_seq')
+
+    with op.batch_alter_table('shoppinglists', schema=None) as batch_op:
+        batch_op.drop_index('ix_shoppinglists_household_id_changed_seq')
+        batch_op.drop_column('changed_seq')
+
+    # SQLite batch mode rebuilds shoppinglists without reflecting expression indexes
+    op.create_index('ix_shoppinglists_household_id_lower_name', 'shoppinglists',
+                    ['household_id', sa.text('lower(name)')], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_sync_tombstones_household_id_seq')
+
+    op.drop_table('sync_tombstones')
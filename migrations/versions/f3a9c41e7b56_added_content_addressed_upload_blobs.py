@@ -0,0 +1,36 @@
+"""Added content-addressed upload blobs
+
+Revision ID: f3a9c41e7b56
+Revises: e6b1d3a8c925
+Create Date: 2026-10-17 18:12:44.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c41e7b56'
+down_revision = 'e6b1d3a8c925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_blobs',
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('upload_blobs', schema=None) as batch_op:
+        batch_op.create_index('ix_upload_blobs_ref_count_updated_at', ['ref_count', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upload_blobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_upload_blobs_ref_count_updated_at')
+
+    op.drop_table('upload_blobs')
@@ -0,0 +1,199 @@
+"""
+bench_login.py
+
+Login throughput benchmark.
+
+Runs against a live server (e.g. `gunicorn -w 2 -k gthread --threads 8 run:app`)
+in two phases of --duration seconds each:
+
+1. Baseline: probe clients request --probe paths as a logged-in user.
+2. Login storm: --storm clients log in as fast as they can while the probes
+   keep running.
+
+Reports logins/sec and login latency, plus the p50 / p99 latency of the probe
+requests in both phases. If hashing starves the workers, the p99 shows it.
+
+Usage:
+    python scripts/bench_login.py --url http://127.0.0.1:8000 --storm 16 --duration 20
+
+Creates --users throwaway accounts (b<random>_<n>) on the target server.
+Start the server with THROTTLE_ENABLED=0, or the login throttle will answer
+most of the storm with 429s.
+Only uses the standard library.
+"""
+
+import argparse
+import http.cookiejar
+import re
+import secrets
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+PASSWORD = 'bench123'
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def new_client(follow_redirects=True):
+    handlers = [urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())]
+    if not follow_redirects:
+        handlers.append(NoRedirect())
+    return urllib.request.build_opener(*handlers)
+
+
+def request(client, url, data=None):
+    """
+    Returns (status, body, location) and never raises on HTTP error statuses.
+    """
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    try:
+        with client.open(url, body, timeout=60) as response:
+            return response.status, response.read().decode('utf-8', 'replace'), response.headers.get('Location')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8', 'replace'), e.headers.get('Location')
+
+
+def csrf_token(client, base_url):
+    status, body, _ = request(client, f'{base_url}/auth')
+    match = CSRF_PATTERN.search(body)
+    if not match:
+        raise RuntimeError(f"No CSRF token on {base_url}/auth (status {status})")
+    return match.group(1)
+
+
+def register(base_url, username):
+    """
+    Create an account. Returns a client logged in as it.
+    """
+    client = new_client(follow_redirects=False)
+    token = csrf_token(client, base_url)
+    status, _, _ = request(client, f'{base_url}/auth', {
+        'action': 'register', 'name': username, 'username': username,
+        'password': PASSWORD, 'confirm_password': PASSWORD, 'csrf_token': token,
+    })
+    if status != 302:
+        raise RuntimeError(f"Could not register {username} (status {status})")
+    return client
+
+
+def login(base_url, username):
+    """
+    One full login from a fresh session. Times only the credential POST.
+
+    Returns:
+        (status, succeeded, seconds)
+    """
+    client = new_client(follow_redirects=False)
+    token = csrf_token(client, base_url)
+    started = time.perf_counter()
+    status, _, location = request(client, f'{base_url}/auth', {
+        'action': 'login', 'username': username, 'password': PASSWORD, 'csrf_token': token,
+    })
+    elapsed = time.perf_counter() - started
+    return status, status == 302 and (location or '').endswith('/dashboard'), elapsed
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_probes(client, urls, stopping, samples, errors):
+    i = 0
+    while not stopping.is_set():
+        url = urls[i % len(urls)]
+        i += 1
+        started = time.perf_counter()
+        status, _, _ = request(client, url)
+        samples.append(time.perf_counter() - started)
+        if status >= 400:
+            errors.append(status)
+
+
+def run_storm(base_url, usernames, stopping, samples, failures):
+    i = 0
+    while not stopping.is_set():
+        status, ok, elapsed = login(base_url, usernames[i % len(usernames)])
+        i += 1
+        samples.append(elapsed)
+        if not ok:
+            failures.append(status)
+
+
+def phase(args, probe_client, usernames, storm):
+    stopping = threading.Event()
+    probe_samples, probe_errors, login_samples, login_failures = [], [], [], []
+    probe_urls = [args.url + path for path in args.probe]
+
+    threads = [threading.Thread(target=run_probes, args=(probe_client, probe_urls, stopping, probe_samples, probe_errors))
+               for _ in range(args.probes)]
+    if storm:
+        threads += [threading.Thread(target=run_storm, args=(args.url, usernames, stopping, login_samples, login_failures))
+                    for _ in range(args.storm)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stopping.set()
+    for thread in threads:
+        thread.join()
+    return probe_samples, probe_errors, login_samples, login_failures
+
+
+def report(name, samples, duration):
+    ms = [s * 1000 for s in samples]
+    print(f"  {name:<8} {len(ms):>6} req  {len(ms) / duration:>8.1f}/s  "
+          f"p50 {percentile(ms, 0.50):>8.1f} ms  p99 {percentile(ms, 0.99):>8.1f} ms  "
+          f"max {max(ms) if ms else float('nan'):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the running app')
+    parser.add_argument('--users', type=int, default=8, help='Accounts to create and log in as')
+    parser.add_argument('--storm', type=int, default=8, help='Concurrent login clients')
+    parser.add_argument('--probes', type=int, default=2, help='Concurrent probe clients')
+    parser.add_argument('--probe', action='append', help='Path to probe while logged in (repeatable)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per phase')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+    args.probe = args.probe or ['/', '/settings/account']
+
+    # Usernames are limited to 10 characters
+    prefix = f'b{secrets.token_hex(2)}'
+    usernames = [f'{prefix}_{n}' for n in range(args.users)]
+    print(f"Registering {len(usernames)} users ({prefix}_*) on {args.url}")
+    clients = [register(args.url, username) for username in usernames]
+    probe_client = clients[0]
+
+    print(f"Baseline: {args.probes} probe clients, {args.duration:g}s")
+    probe_samples, probe_errors, _, _ = phase(args, probe_client, usernames, storm=False)
+    report('probe', probe_samples, args.duration)
+
+    print(f"Login storm: {args.storm} login clients + {args.probes} probe clients, {args.duration:g}s")
+    probe_storm, storm_errors, logins, failures = phase(args, probe_client, usernames, storm=True)
+    report('login', logins, args.duration)
+    report('probe', probe_storm, args.duration)
+    if failures:
+        throttled = failures.count(429)
+        print(f"  {len(failures)} logins failed ({throttled} throttled with 429)")
+    if probe_errors or storm_errors:
+        print(f"  probe errors: {sorted(set(probe_errors + storm_errors))}")
+
+    if probe_samples and probe_storm:
+        slowdown = percentile(probe_storm, 0.99) / percentile(probe_samples, 0.99)
+        print(f"Probe p99 under login storm: {slowdown:.1f}x baseline "
+              f"(median {statistics.median(probe_storm) / statistics.median(probe_samples):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -125,4 +125,50 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // "Show more" on Recent Activity: fetch older rows one page at a time
+    const loadMoreActivityBtn = document.getElementById('loadMoreActivityBtn');
+    const activityList = document.getElementById('activityList');
+
+    if (loadMoreActivityBtn && activityList) {
+        const escapeHTML = (text) => String(text ?? '').replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+
+        loadMoreActivityBtn.addEventListener('click', async () => {
+            const cursor = loadMoreActivityBtn.dataset.nextCursor;
+            if (!cursor) return;
+            loadMoreActivityBtn.disabled = true;
+            try {
+                const response = await fetch(`${loadMoreActivityBtn.dataset.feedUrl}?before=${encodeURIComponent(cursor)}`, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                });
+                const result = await response.json();
+                if (!response.ok || !result.success) { throw new Error(result.message || 'Could not load activity.'); }
+
+                const fragment = document.createDocumentFragment();
+                result.activities.forEach(activity => {
+                    const li = document.createElement('li');
+                    li.className = 'list-group-item d-flex justify-content-between align-items-start';
+                    const when = new Date(activity.timestamp).toLocaleString(undefined, { day: '2-digit', month: 'long', year: 'numeric', hour: '2-digit', minute: '2-digit' });
+                    li.innerHTML = `
+                        <div>
+                        <strong>${escapeHTML(activity.user.name)}</strong>
+                        <small class="text-muted d-block">${escapeHTML(activity.description)}</small>
+                        </div>
+                        <small class="text-muted text-nowrap utc-time" data-utc="${escapeHTML(activity.timestamp)}">${escapeHTML(when)}</small>`;
+                    fragment.appendChild(li);
+                });
+                activityList.appendChild(fragment);
+
+                if (result.next_cursor) {
+                    loadMoreActivityBtn.dataset.nextCursor = result.next_cursor;
+                } else {
+                    loadMoreActivityBtn.remove();
+                }
+            } catch (error) {
+                showToast(error.message || 'Network error loading activity.', 'danger');
+            } finally {
+                loadMoreActivityBtn.disabled = false;
+            }
+        });
+    }
+
 });
\ No newline at end of file
@@ -1,9 +1,13 @@
 /**
  * view_list.js
  * Handles interactions specific to the shopping list view page:
+ * - Queuing toggles and renames and sending them as one batch request
  * - AJAX for toggling item purchase status
  * - AJAX for adding items (with quantity and measure)
+ * - Bulk-adding a multi-line list pasted into the item name field
  * - Inline editing of item names
+ * - Loading further pages of items as the user scrolls
+ * - Applying live changes from other members (Server-Sent Events)
  * - Updating the custom segmented progress bar with flex-basis animation
  */
 
@@ -24,6 +28,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const newItemMeasureInput = document.getElementById('newItemMeasureInput');
 
     let isSaving = false;
+    const listId = addItemForm?.dataset.listId;
 
     if (!csrfToken) {
         console.error('CSRF token not found.');
@@ -40,14 +45,22 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const GAP_WIDTH_PX = 4;
 
+    // Progress comes from the list counters kept by the server, not from the
+    // rows in the DOM (which may be only the first page of a long list)
+    let totalItems = Number(progressTrackElement?.dataset.itemsCount || 0);
+    let purchasedItems = Number(progressTrackElement?.dataset.purchasedCount || 0);
+
+    function setCounts(result) {
+        if (result?.items_count === undefined || result?.purchased_items_count === undefined) return;
+        totalItems = result.items_count;
+        purchasedItems = result.purchased_items_count;
+        updateProgressBar();
+    }
+
     function updateProgressBar() {
         if (!progressTrackElement || !filledSegment || !gapSegment || !unfilledSegment) { return; }
         if (!percentageLabel) { console.warn("Percentage label for progress bar (#progressPercentageLabel) not found."); }
 
-        const listItems = listContainer?.querySelectorAll('li.list-group-item.item-row') || [];
-        const totalItems = listItems.length;
-        const purchasedItems = listContainer?.querySelectorAll('li.list-group-item.item-row.item-purchased')?.length || 0;
-
         let percentage = totalItems > 0 ? (purchasedItems / totalItems) * 100 : 0;
         percentage = Math.min(100, Math.max(0, percentage));
         const percentageInt = Math.round(percentage);
@@ -82,7 +95,54 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // --- Toggle Purchase Status AJAX Function ---
+    // --- Batched Operations Queue ---
+    // Operations queued within BATCH_WINDOW_MS of each other are sent together
+    // to /shopping/list/<id>/batch and applied server-side in one transaction.
+    const BATCH_WINDOW_MS = 150;
+    let pendingOperations = [];
+    let batchTimer = null;
+
+    function queueOperation(operation) {
+        return new Promise((resolve, reject) => {
+            pendingOperations.push({ operation, resolve, reject });
+            if (!batchTimer) { batchTimer = setTimeout(flushOperations, BATCH_WINDOW_MS); }
+        });
+    }
+
+    async function flushOperations() {
+        const queued = pendingOperations;
+        pendingOperations = [];
+        batchTimer = null;
+        if (!queued.length) return;
+        try {
+            const response = await fetch(`/shopping/list/${listId}/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken, 'X-Requested-With': 'XMLHttpRequest' },
+                body: JSON.stringify({ operations: queued.map(entry => entry.operation) }),
+            });
+            const result = await response.json();
+            if (!response.ok || !result.success) { throw new Error(result.message || 'Could not save changes.'); }
+            setCounts(result);
+            queued.forEach((entry, index) => entry.resolve(result.results[index]));
+        } catch (error) {
+            queued.forEach(entry => entry.reject(error));
+        }
+    }
+
+    // --- Purchase state of one row (used by toggles and live events) ---
+    function setPurchasedState(listItemElement, purchased) {
+        listItemElement.classList.toggle('item-purchased', purchased);
+        listItemElement.querySelector('.item-name')?.classList.toggle('text-decoration-line-through', purchased);
+        const button = listItemElement.querySelector('.toggle-purchase-btn');
+        if (!button) return;
+        const iconClass = purchased ? 'bi-arrow-counterclockwise' : 'bi-check-circle';
+        const buttonText = purchased ? ' Undo' : ' Done';
+        button.innerHTML = `<i class="bi ${iconClass}"></i><span class="d-none d-md-inline">${buttonText}</span>`;
+        button.classList.remove('btn-success', 'btn-warning');
+        button.classList.add(purchased ? 'btn-warning' : 'btn-success');
+    }
+
+    // --- Toggle Purchase Status (batched) ---
     async function togglePurchaseStatus(button, itemId, listItemElement) {
         if (!listItemElement) { showToast('Could not perform action: item structure error.', 'danger'); return; }
         const itemNameElement = listItemElement.querySelector('.item-name-column .item-name-line .item-name');
@@ -91,20 +151,11 @@ document.addEventListener('DOMContentLoaded', () => {
         button.disabled = true;
         button.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span>';
         try {
-            const url = `/shopping/list/item/${itemId}/toggle_purchase`;
-            const response = await fetch(url, { method: 'POST', headers: { 'X-CSRFToken': csrfToken, 'X-Requested-With': 'XMLHttpRequest' } });
-            const result = await response.json();
-            if (response.ok && result.success) {
-                const newStatus = result.purchased_status;
-                listItemElement.classList.toggle('item-purchased', newStatus);
-                itemNameElement.classList.toggle('text-decoration-line-through', newStatus);
-                const iconClass = newStatus ? 'bi-arrow-counterclockwise' : 'bi-check-circle';
-                const buttonText = newStatus ? ' Undo' : ' Done';
-                button.innerHTML = `<i class="bi ${iconClass}"></i><span class="d-none d-md-inline">${buttonText}</span>`;
-                button.classList.remove('btn-success', 'btn-warning');
-                button.classList.add(newStatus ? 'btn-warning' : 'btn-success');
-                updateProgressBar();
-                showToast(result.message || 'Status updated!', 'success');
+            const result = await queueOperation({ op: 'toggle', item_id: Number(itemId) });
+            if (result.success) {
+                const newStatus = result.purchased;
+                setPurchasedState(listItemElement, newStatus);
+                showToast(`"${itemNameElement.textContent.trim()}" marked as ${newStatus ? 'purchased' : 'not purchased'}.`, 'success');
             } else {
                 showToast(result.message || 'Could not update purchase status.', 'danger');
                 button.innerHTML = originalHTML;
@@ -142,7 +193,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (newItemInput) newItemInput.value = '';
                 if (newItemQuantityInput) newItemQuantityInput.value = '';
                 if (newItemMeasureInput) newItemMeasureInput.value = '';
-                updateProgressBar();
+                setCounts(result);
                 showToast(result.message || 'Item added!', 'success');
             } else {
                  showToast(result.message || "Failed to add item.", 'danger');
@@ -152,19 +203,56 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // --- Bulk Add (pasted multi-line list) AJAX Function ---
+    async function bulkAddItems(text, listId) {
+        try {
+            const url = `/shopping/list/${listId}/items/bulk`;
+            const response = await fetch(url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken, 'X-Requested-With': 'XMLHttpRequest' },
+                body: JSON.stringify({ text: text }),
+            });
+            const result = await response.json();
+            if (response.ok && result.success) {
+                const ul = document.getElementById('itemList');
+                const placeholder = document.getElementById('emptyListPlaceholder');
+                if (placeholder) {
+                    if (placeholder.tagName === 'LI') { placeholder.remove(); }
+                    else { placeholder.classList.add('d-none'); }
+                }
+                if (!ul) { console.error("Could not find #itemList to append new items to."); return; }
+                const fragment = document.createDocumentFragment();
+                (result.items || []).forEach(itemData => fragment.appendChild(createListItemElement(itemData, csrfToken)));
+                ul.appendChild(fragment);
+                if (newItemInput) newItemInput.value = '';
+                setCounts(result);
+                showToast(result.message || 'Items added!', 'success');
+            } else {
+                showToast(result.message || "Failed to add items.", 'danger');
+            }
+        } catch (error) {
+            showToast("Network error adding items. Please try again.", 'danger');
+        }
+    }
+
     // --- Function to create List Item HTML (Helper - Includes Profile Pic in Pill) ---
     function createListItemElement(itemData, csrfToken) {
         const li = document.createElement('li');
         li.className = 'list-group-item item-row';
         if (itemData.purchased) li.classList.add('item-purchased');
         li.setAttribute('data-item-id', itemData.id);
+        if (itemData.version !== undefined) li.setAttribute('data-version', itemData.version);
 
 
         const safeName = (itemData.name || '').replace(/</g, "&lt;").replace(/>/g, "&gt;");
        
         const addedByName = itemData.added_by.name || 'You'; 
         const safeAddedBy = addedByName.replace(/</g, "&lt;").replace(/>/g, "&gt;");
-        const avatarUrl = itemData.url || `https://api.dicebear.com/7.x/initials/svg?seed=${safeAddedBy}`; 
+        const avatarUrl = itemData.added_by.avatar_url || `https://api.dicebear.com/7.x/initials/svg?seed=${safeAddedBy}`; 
+        // Processed uploads also come as WebP, with the JPEG as fallback
+        const avatarWebpSource = itemData.added_by.avatar_webp_url
+            ? `<source type="image/webp" srcset="${itemData.added_by.avatar_webp_url}">`
+            : '';
 
         const safeQuantity = itemData.quantity !== null && itemData.quantity !== undefined ? String(itemData.quantity).replace(/</g, "&lt;").replace(/>/g, "&gt;") : '';
         const safeMeasure = (itemData.measure || '').replace(/</g, "&lt;").replace(/>/g, "&gt;");
@@ -194,10 +282,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     <small class="item-details-text d-block mt-1">
                         Added by:
                         <span class="added-by-pill bg-secondary">
-                            <img src="${avatarUrl}"
+                            <picture class="avatar-picture">${avatarWebpSource}<img src="${avatarUrl}"
                                  class="profile-pic-thumb"
                                  alt="${safeAddedBy}'s profile picture"
-                                 onerror="this.style.display='none'; this.nextElementSibling.style.marginLeft='0';">
+                                 onerror="this.style.display='none';"></picture>
                             <span class="added-by-name">${safeAddedBy}</span>
                         </span>
                     </small>
@@ -231,6 +319,151 @@ document.addEventListener('DOMContentLoaded', () => {
         return li;
     }
 
+    // --- Incremental Loading (keyset pages) ---
+    // The server renders the first page; further pages are fetched from
+    // /shopping/list/<id>/items as the sentinel below the list scrolls into view.
+    const itemsSentinel = document.getElementById('itemsSentinel');
+    let nextCursor = listContainer?.dataset.nextCursor || null;
+    let isLoadingPage = false;
+
+    async function loadNextPage() {
+        if (!nextCursor || isLoadingPage) return;
+        isLoadingPage = true;
+        try {
+            const response = await fetch(`/shopping/list/${listId}/items?after=${encodeURIComponent(nextCursor)}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            });
+            const result = await response.json();
+            if (!response.ok || !result.success) { throw new Error(result.message || 'Could not load items.'); }
+
+            const fragment = document.createDocumentFragment();
+            (result.items || []).forEach(itemData => {
+                // Items added on this page since it loaded are already in the DOM
+                if (listContainer.querySelector(`li[data-item-id='${itemData.id}']`)) return;
+                fragment.appendChild(createListItemElement(itemData, csrfToken));
+            });
+            listContainer.appendChild(fragment);
+            nextCursor = result.next_cursor;
+            setCounts(result);
+        } catch (error) {
+            showToast(error.message || 'Network error loading items.', 'danger');
+            return;
+        } finally {
+            isLoadingPage = false;
+        }
+
+        if (!nextCursor) {
+            pageObserver?.disconnect();
+            itemsSentinel?.remove();
+        } else if (itemsSentinel && itemsSentinel.getBoundingClientRect().top < window.innerHeight) {
+            // Sentinel still visible (short page or tall screen): keep going
+            loadNextPage();
+        }
+    }
+
+    const pageObserver = itemsSentinel && nextCursor && 'IntersectionObserver' in window
+        ? new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+        }, { rootMargin: '400px 0px' })
+        : null;
+    if (pageObserver) pageObserver.observe(itemsSentinel);
+
+    // --- Live Updates (Server-Sent Events) ---
+    // Changes committed by anyone (including this tab) arrive on
+    // /shopping/list/<id>/events. Every handler is idempotent, so echoes of
+    // our own requests are harmless.
+    function findItemRow(itemId) {
+        return listContainer?.querySelector(`li.item-row[data-item-id='${itemId}']`);
+    }
+
+    function hideEmptyPlaceholder() {
+        const placeholder = document.getElementById('emptyListPlaceholder');
+        if (placeholder) placeholder.style.display = 'none';
+    }
+
+    const liveEventHandlers = {
+        items_added(data) {
+            const fragment = document.createDocumentFragment();
+            (data.items || []).forEach(itemData => {
+                if (!findItemRow(itemData.id)) fragment.appendChild(createListItemElement(itemData, csrfToken));
+            });
+            if (fragment.childNodes.length) {
+                hideEmptyPlaceholder();
+                listContainer.appendChild(fragment);
+            }
+        },
+        item_updated(data) {
+            const row = findItemRow(data.id);
+            if (!row) return;
+            if (data.purchased !== undefined) setPurchasedState(row, data.purchased);
+            const input = row.querySelector('.item-edit-input');
+            const editing = input && !input.classList.contains('d-none');
+            // Keep the version an open edit started from, so saving it is checked against that
+            if (data.version !== undefined && !editing) row.dataset.version = data.version;
+            // Leave a row alone while it is being edited here
+            if (data.name !== undefined && input && !editing) {
+                const nameSpan = row.querySelector('.item-name');
+                if (nameSpan) nameSpan.textContent = data.name;
+                input.value = data.name;
+            }
+            if (data.quantity !== undefined || data.measure !== undefined) {
+                // Same markup as createListItemElement: "(qty measure)", or a muted "-" when both are empty
+                const hasValue = (data.quantity !== null && data.quantity !== undefined) || !!data.measure;
+                row.querySelectorAll('.item-quantity-measure').forEach(element => {
+                    const inColumn = !!element.closest('.item-quantity-column');
+                    element.classList.toggle('text-muted', !hasValue && inColumn);
+                    // The small-screen copy next to the name is only shown when there is a value
+                    if (!inColumn) element.classList.toggle('d-none', !hasValue);
+                    element.textContent = hasValue ? `(${data.quantity ?? 1} ${data.measure ?? ''})` : '-';
+                });
+            }
+        },
+        items_deleted(data) {
+            (data.ids || []).forEach(itemId => findItemRow(itemId)?.remove());
+            if (data.items_count === 0) {
+                const placeholder = document.getElementById('emptyListPlaceholder');
+                if (placeholder) placeholder.style.display = 'block';
+            }
+        },
+        items_marked(data) {
+            listContainer?.querySelectorAll('li.item-row').forEach(row => setPurchasedState(row, data.purchased));
+        },
+        counts() {},
+        list_updated(data) {
+            const title = listHeader?.querySelector('h1');
+            if (title && data.name) title.textContent = data.name;
+        },
+        list_deleted(data) {
+            showToast('This list was deleted.', 'warning');
+            setTimeout(() => { window.location.href = data.redirect_url || '/dashboard'; }, 1000);
+        },
+        resync() {
+            // The change was too large to send as an event
+            window.location.reload();
+        },
+    };
+
+    if (listId && 'EventSource' in window) {
+        let eventSource = null;
+        const connectLiveEvents = () => {
+            eventSource = new EventSource(`/shopping/list/${listId}/events`);
+            Object.entries(liveEventHandlers).forEach(([eventType, handler]) => {
+                eventSource.addEventListener(eventType, (event) => {
+                    const data = JSON.parse(event.data);
+                    handler(data);
+                    setCounts(data);
+                });
+            });
+            eventSource.addEventListener('error', () => {
+                // A refused stream (503 when the server is at its limit) is not retried by the
+                // browser, so ask again later
+                if (eventSource.readyState === EventSource.CLOSED) setTimeout(connectLiveEvents, 30000);
+            });
+        };
+        connectLiveEvents();
+        window.addEventListener('beforeunload', () => eventSource?.close());
+    }
+
     // --- Inline Editing Helper Functions ---
     function enterItemEditMode(spanElement) {
         const nameColumn = spanElement.closest('.item-name-column');
@@ -293,16 +526,27 @@ document.addEventListener('DOMContentLoaded', () => {
         isSaving = true; inputElement.disabled = true;
         if (errorElement) errorElement.style.display = 'none';
         try {
-            const url = `/shopping/list/item/${itemId}/update_name`;
-            const response = await fetch(url, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrfToken, 'X-Requested-With': 'XMLHttpRequest' },
-                body: JSON.stringify({ new_name: newName })
-            });
-            const result = await response.json();
-            if (response.ok && result.success) {
-                exitItemEditMode(inputElement, result.new_name);
-                showToast(`Item renamed to "${result.new_name}".`, 'success');
+            const operation = { op: 'rename', item_id: Number(itemId), name: newName };
+            // The server rejects the rename if someone changed the item since this version
+            if (listItemElement.dataset.version) operation.version = Number(listItemElement.dataset.version);
+            const result = await queueOperation(operation);
+            if (result.success) {
+                listItemElement.dataset.version = result.version;
+                exitItemEditMode(inputElement, result.name);
+                showToast(`Item renamed to "${result.name}".`, 'success');
+            } else if (result.conflict) {
+                // Show the current name and keep the user's text so they can save it again
+                if (result.item) {
+                    const nameSpan = nameColumn.querySelector('.item-name-line .item-name');
+                    if (nameSpan) nameSpan.textContent = result.item.name;
+                    listItemElement.dataset.version = result.item.version;
+                    inputElement.dataset.originalValue = result.item.name;
+                } else {
+                    listItemElement.remove();
+                }
+                if (errorElement) { errorElement.textContent = result.message; errorElement.style.display = 'block';}
+                else { showToast(result.message, 'warning'); }
+                inputElement.disabled = false; inputElement.focus();
             } else {
                 if (errorElement) { errorElement.textContent = result.message || 'Failed to save.'; errorElement.style.display = 'block';}
                 else { showToast(result.message || 'Failed to save item name.', 'danger'); }
@@ -319,6 +563,17 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Event Listeners Setup ---
+    // Pasting several lines into the item name field adds them all in one request
+    if (newItemInput && addItemForm) {
+        newItemInput.addEventListener('paste', async (event) => {
+            const text = (event.clipboardData || window.clipboardData)?.getData('text') || '';
+            const lines = text.split(/\r?\n/).filter(line => line.trim());
+            if (lines.length < 2) { return; }
+            event.preventDefault();
+            await bulkAddItems(text, addItemForm.dataset.listId);
+        });
+    }
+
     if (listContainer) {
         listContainer.addEventListener('click', async (event) => {
             const toggleButton = event.target.closest('.toggle-purchase-btn');
@@ -342,23 +597,6 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         });
 
-        document.addEventListener('click', async (event) => {
-            const deleteButton = event.target.closest('.btn-danger[data-bs-toggle="modal"]');
-            if (deleteButton) {
-                event.preventDefault();
-                
-                const modal = document.getElementById('confirmModal');
-                const confirmBtn = modal.querySelector('.modal-confirm-btn');
-                
-                confirmBtn.dataset.itemId = deleteButton.dataset.itemId;
-                confirmBtn.dataset.itemName = deleteButton.dataset.itemName;
-                confirmBtn.dataset.targetSelector = `li[data-item-id="${deleteButton.dataset.itemId}"]`;
-                
-                // Show the modal
-                new bootstrap.Modal(modal).show();
-            }
-        });
-
         // Handle edit mode blur/save
         listContainer.addEventListener('focusout', (event) => {
             if (event.target.classList.contains('item-edit-input')) {
@@ -383,47 +621,18 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-        document.querySelector('.modal-confirm-btn')?.addEventListener('click', async function() {
-            const itemId = this.dataset.itemId;
-            const itemName = this.dataset.itemName;
-            const targetSelector = this.dataset.targetSelector;
-            const modal = bootstrap.Modal.getInstance(document.getElementById('confirmModal'));
-            
-            try {
-                const response = await fetch(`/list/item/${itemId}/delete`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': csrfToken
-                    }
-                });
-
-                const data = await response.json();
-                
-                if (data.success) {
-                    // Remove the item from DOM
-                    const itemElement = document.querySelector(targetSelector);
-                    if (itemElement) {
-                        itemElement.remove();
-                        
-                        // Show empty message if no items left
-                        const itemList = document.getElementById('itemList');
-                        if (itemList && itemList.querySelectorAll('.item-row').length === 0) {
-                            const emptyPlaceholder = document.getElementById('emptyListPlaceholder');
-                            if (emptyPlaceholder) emptyPlaceholder.style.display = 'block';
-                        }
-                        
-                        showToast(`"${itemName}" deleted successfully`, 'success');
-                    }
-                } else {
-                    showToast(data.message || 'Error deleting item', 'error');
-                }
-            } catch (error) {
-                console.error('Delete error:', error);
-                showToast('Failed to delete item', 'error');
-            } finally {
-                modal.hide();
-            }
+    // Item deletion goes through the shared confirm modal (main.js); once it
+    // succeeds, drop the row from the DOM instead of asking for a refresh
+    document.body.addEventListener('modalActionSuccess', (event) => {
+        const targetSelector = event.detail?.targetElementSelector;
+        if (!targetSelector || !targetSelector.startsWith('li[data-item-id')) return;
+
+        document.querySelector(targetSelector)?.remove();
+        setCounts(event.detail.response);
+        if (totalItems === 0) {
+            const emptyPlaceholder = document.getElementById('emptyListPlaceholder');
+            if (emptyPlaceholder) emptyPlaceholder.style.display = 'block';
+        }
     });
 
     updateProgressBar();
@@ -0,0 +1,111 @@
+"""
+conftest.py
+
+Shared fixtures for the test suite.
+
+One app is created for the whole session, bound to a throwaway SQLite file
+(the settings are read from the environment when app.config is imported, so
+they are set before anything from the app is). Every test gets freshly
+created tables and a small seeded household.
+"""
+
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+_DB_DIR = tempfile.mkdtemp(prefix='shopping-manager-tests-')
+_DB_PATH = os.path.join(_DB_DIR, 'test.db')
+os.environ['DATABASE_URI'] = 'sqlite:///' + _DB_PATH
+os.environ['THROTTLE_ENABLED'] = '0'
+os.environ['CHANGE_BUS_BACKEND'] = 'local'
+os.environ['UPLOAD_STORAGE_PATH'] = os.path.join(_DB_DIR, 'uploads')
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import User, Household, ShoppingList, ListItem  # noqa: E402
+from app.user_cache import user_cache  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_CHECK_DEFAULT=False)
+    return app
+
+
+@pytest.fixture
+def database(app):
+    """
+    Empty tables for one test.
+    """
+    with app.app_context():
+        # users and households reference each other, so start from a new file
+        # rather than drop_all()
+        db.engine.dispose()
+        if os.path.exists(_DB_PATH):
+            os.remove(_DB_PATH)
+        db.create_all()
+    # Cached users would outlive the rows they came from
+    user_cache.clear()
+    yield db
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def seed(app, database):
+    """
+    A household with one member and a list of three items, the last one purchased.
+
+    Returns:
+        dict of ids: user, household, list and items (in insertion order).
+    """
+    with app.app_context():
+        user = User(username='alice', name='Alice', password='-', role='admin')
+        db.session.add(user)
+        db.session.flush()
+        household = Household(name='Home', admin_id=user.id)
+        db.session.add(household)
+        db.session.flush()
+        user.household_id = household.id
+        shopping_list = ShoppingList(name='Groceries', household_id=household.id, created_by_user_id=user.id,
+                                     items_count=3, purchased_items_count=1)
+        db.session.add(shopping_list)
+        db.session.flush()
+        items = [ListItem(name=name, shoppinglist_id=shopping_list.id, added_by_user_id=user.id, purchased=purchased)
+                 for name, purchased in (('Milk', False), ('Bread', False), ('Eggs', True))]
+        db.session.add_all(items)
+        db.session.commit()
+        return {'user': user.id, 'household': household.id, 'list': shopping_list.id,
+                'items': [item.id for item in items]}
+
+
+@pytest.fixture
+def client(app, seed):
+    """
+    Test client logged in as the seeded user.
+    """
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(seed['user'])
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def statements(app, database):
+    """
+    Records the SQL statements the app sends to the database.
+    """
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(engine, 'before_cursor_execute', record)
@@ -0,0 +1,47 @@
+"""
+Activity feed descriptions.
+"""
+
+from app.utils import format_action
+
+
+def feed(client):
+    response = client.get('/activity')
+    assert response.status_code == 200
+    return [activity['description'] for activity in response.get_json()['activities']]
+
+
+def test_count_actions_describe_the_count(client, seed):
+    client.post(f"/shopping/list/{seed['list']}/items/bulk", json={'text': 'Jam\nTea'})
+    client.post(f"/shopping/list/{seed['list']}/items/check_all")
+    client.post(f"/shopping/list/{seed['list']}/items/uncheck_all")
+    client.post(f"/shopping/list/{seed['list']}/items/check_all")
+    client.post(f"/shopping/list/{seed['list']}/items/clear_purchased")
+
+    assert feed(client) == [
+        "Cleared 5 purchased items from Groceries.",
+        "Marked all 5 items in Groceries as purchased.",
+        "Unchecked 5 items in Groceries.",
+        "Marked all 4 items in Groceries as purchased.",
+        "Added 2 items to Groceries.",
+    ]
+
+
+def test_rows_logged_before_count_still_read_well():
+    assert format_action("Purchased Items Clearing", item_name="7 items", list_name="Groceries") == \
+        "Cleared purchased items (7 items) from Groceries."
+    assert format_action("Bulk Item Addition", item_name="3 items", list_name="Groceries") == \
+        "Added 3 items to Groceries."
+
+
+def test_batch_and_single_renames_read_the_same(client, seed):
+    milk, bread = seed['items'][:2]
+    client.post(f"/shopping/list/item/{milk}/update_name", json={'new_name': 'Oat milk'})
+    client.post(f"/shopping/list/{seed['list']}/batch", json={'operations': [
+        {'op': 'rename', 'item_id': bread, 'name': 'Rye bread'},
+    ]})
+
+    assert feed(client) == [
+        "Renamed 'Bread' to 'Rye bread'.",
+        "Renamed 'Milk' to 'Oat milk'.",
+    ]
@@ -0,0 +1,53 @@
+"""
+The change bus never lets a bad message or a failed publish reach a request.
+"""
+
+import threading
+import time
+
+from app.bus import change_bus, FileBackend
+from app.extensions import db
+from app.models import ListItem
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    def dispatch(self, message):
+        self.messages.append(message)
+
+
+def test_file_listener_skips_torn_lines(tmp_path):
+    bus = Recorder()
+    backend = FileBackend(bus, str(tmp_path / 'bus.jsonl'), 1024 * 1024, 0.01)
+    # Listeners start from the end of the file; make it exist before the lines are written
+    backend.send([])
+    stopping = threading.Event()
+    listener = threading.Thread(target=backend.listen, args=(stopping,))
+    listener.start()
+    try:
+        time.sleep(0.05)
+        with open(backend.path, 'ab') as handle:
+            handle.write(b'{"household_id": 1, "ent\n')
+        backend.send([{'household_id': 1, 'entity': 'list', 'id': 2, 'version': 3}])
+        time.sleep(0.2)
+    finally:
+        stopping.set()
+        listener.join()
+
+    assert bus.messages == [{'household_id': 1, 'entity': 'list', 'id': 2, 'version': 3}]
+
+
+def test_failed_publish_keeps_committed_change(app, client, seed, monkeypatch):
+    def broken_send(messages):
+        raise OSError('bus unavailable')
+
+    monkeypatch.setattr(change_bus._get_backend(), 'send', broken_send)
+    item_id = seed['items'][0]
+
+    response = client.post(f"/shopping/list/item/{item_id}/toggle_purchase")
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(ListItem, item_id).purchased is True
@@ -0,0 +1,78 @@
+"""
+Concurrent writes keep the cached list counters consistent with the rows.
+"""
+
+import threading
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import ListItem, ShoppingList
+
+THREADS = 8
+TOGGLES_PER_THREAD = 25
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def test_concurrent_toggles_keep_counters_consistent(app, seed):
+    clients = [logged_in_client(app, seed['user']) for _ in range(THREADS)]
+    statuses = []
+    start = threading.Barrier(THREADS)
+
+    def toggle_repeatedly(client, offset):
+        start.wait()
+        for n in range(TOGGLES_PER_THREAD):
+            item_id = seed['items'][(offset + n) % len(seed['items'])]
+            statuses.append(client.post(f"/shopping/list/item/{item_id}/toggle_purchase").status_code)
+
+    threads = [threading.Thread(target=toggle_repeatedly, args=(client, n)) for n, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * (THREADS * TOGGLES_PER_THREAD)
+    with app.app_context():
+        shopping_list = db.session.get(ShoppingList, seed['list'])
+        in_list = ListItem.shoppinglist_id == seed['list']
+        assert shopping_list.items_count == db.session.scalar(db.select(db.func.count()).where(in_list))
+        assert shopping_list.purchased_items_count == db.session.scalar(
+            db.select(db.func.count()).where(in_list, ListItem.purchased.is_(True))
+        )
+
+
+def test_delete_counts_a_toggle_committed_after_the_item_was_loaded(app, client, seed):
+    item_id = seed['items'][0]
+    with app.app_context():
+        engine = db.engine
+    toggled = []
+
+    def toggle_before_first_write(conn, cursor, statement, parameters, context, executemany):
+        if toggled or statement.lstrip().upper().startswith('SELECT'):
+            return
+        toggled.append(True)
+        # Another member ticks the item off between the route's load and its delete
+        with engine.begin() as other:
+            other.execute(db.update(ListItem).where(ListItem.id == item_id).values(purchased=True))
+            other.execute(db.update(ShoppingList).where(ShoppingList.id == seed['list'])
+                          .values(purchased_items_count=ShoppingList.purchased_items_count + 1))
+
+    event.listen(engine, 'before_cursor_execute', toggle_before_first_write)
+    try:
+        response = client.post(f"/shopping/list/item/{item_id}/delete")
+    finally:
+        event.remove(engine, 'before_cursor_execute', toggle_before_first_write)
+
+    assert response.status_code == 200
+    with app.app_context():
+        in_list = ListItem.shoppinglist_id == seed['list']
+        assert db.session.get(ShoppingList, seed['list']).purchased_items_count == db.session.scalar(
+            db.select(db.func.count()).where(in_list, ListItem.purchased.is_(True))
+        )
@@ -0,0 +1,35 @@
+"""
+Live list streams are capped per worker so they cannot take every thread, and
+their events carry what the page needs to redraw a row.
+"""
+
+from app.events import list_events
+from app.shopping_lists import routes
+
+
+def test_stream_refused_at_capacity(app, client, seed, monkeypatch):
+    monkeypatch.setitem(app.config, 'LIST_EVENTS_MAX_STREAMS', 1)
+    subscriber = list_events.subscribe(seed['list'])
+    try:
+        response = client.get(f"/shopping/list/{seed['list']}/events")
+    finally:
+        list_events.unsubscribe(seed['list'], subscriber)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
+    assert not list_events.at_capacity()
+
+
+def test_quantity_event_carries_both_values(app, client, seed, monkeypatch):
+    events = []
+    monkeypatch.setattr(routes, 'publish_list_event', lambda list_id, event_type, **data: events.append(data))
+    url = f"/shopping/list/{seed['list']}/batch"
+    item_id = seed['items'][0]
+    client.post(url, json={'operations': [{'op': 'set_quantity', 'item_id': item_id, 'quantity': 2, 'measure': 'l'}]})
+
+    response = client.post(url, json={'operations': [{'op': 'set_quantity', 'item_id': item_id, 'quantity': 3}]})
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    # The measure was left alone, but the row is redrawn from both values
+    assert events[-1]['quantity'] == 3
+    assert events[-1]['measure'] == 'l'
@@ -0,0 +1,67 @@
+"""
+Item and list edits: renames are guarded by the row_version the client saw
+and answer 409 when it is out of date; bulk adds hand back ids in input order.
+"""
+
+import re
+
+from app.extensions import db
+from app.models import ListItem, ShoppingList
+
+
+def test_rename_uses_returned_version(app, client, seed, statements):
+    item_id = seed['items'][0]
+    client.get('/dashboard')
+    statements.clear()
+
+    response = client.post(f"/shopping/list/item/{item_id}/update_name", json={'new_name': 'Oat milk', 'version': 1})
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['version'] == 2
+    # Nothing is read back once the item has been updated
+    update = next(n for n, sql in enumerate(statements) if sql.startswith('UPDATE listitems'))
+    assert not any(sql.startswith('SELECT') for sql in statements[update:]), statements
+    with app.app_context():
+        assert db.session.get(ListItem, item_id).name == 'Oat milk'
+
+
+def test_rename_outdated_version_conflicts(app, client, seed):
+    item_id = seed['items'][0]
+    client.post(f"/shopping/list/item/{item_id}/update_name", json={'new_name': 'Oat milk', 'version': 1})
+
+    response = client.post(f"/shopping/list/item/{item_id}/update_name", json={'new_name': 'Soy milk', 'version': 1})
+
+    assert response.status_code == 409
+    assert response.get_json()['item']['name'] == 'Oat milk'
+
+
+def test_bulk_add_returns_ids_in_input_order(app, client, seed):
+    names = [f'Item {n}' for n in range(50)]
+
+    response = client.post(f"/shopping/list/{seed['list']}/items/bulk", json={'items': [{'name': name} for name in names]})
+
+    assert response.status_code == 201, response.get_data(as_text=True)
+    item_ids = response.get_json()['item_ids']
+    with app.app_context():
+        stored = {item.id: item.name for item in db.session.query(ListItem).filter(ListItem.id.in_(item_ids))}
+    assert [stored[item_id] for item_id in item_ids] == names
+
+
+def test_edit_list_checks_row_version_not_etag_counter(app, client, seed):
+    list_id = seed['list']
+    with app.app_context():
+        # The ETag counter moves with every change in the household
+        db.session.execute(db.update(ShoppingList).where(ShoppingList.id == list_id).values(version=42))
+        db.session.commit()
+
+    page = client.get(f"/shopping/list/{list_id}/edit").get_data(as_text=True)
+    assert 'name="row_version" type="hidden" value="1"' in page
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1)
+
+    def save(**fields):
+        return client.post(f"/shopping/list/{list_id}/edit", data={'csrf_token': token, **fields}).status_code
+
+    assert save(name='Weekly', row_version='1') == 302
+    assert save(name='Monthly', row_version='1') == 409
+    # Forms without the field are not checked
+    assert save(name='Daily') == 302
@@ -0,0 +1,14 @@
+"""
+Password hashing behaves the same whichever bcrypt release is installed.
+"""
+
+from app.passwords import _hash, _verify
+
+
+def test_bcrypt_long_password_verifies():
+    # bcrypt 4.x truncates passwords over 72 bytes and 5.x raises on them
+    password = 'correct horse battery staple ' * 4
+    pw_hash = _hash(password, 'bcrypt', 4)
+
+    assert _verify(pw_hash, password)
+    assert not _verify(pw_hash, 'wrong')
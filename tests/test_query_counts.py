@@ -0,0 +1,66 @@
+"""
+Page renders issue a fixed number of SQL statements, however many items,
+lists or members there are (no N+1 lazy loads). The logged-in user comes from
+the user loader cache, which is warmed by a first request.
+"""
+
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import User, ListItem, ShoppingList
+
+
+def add_items(app, seed, count):
+    """
+    Add `count` items to the seeded list, alternating between two members.
+    """
+    with app.app_context():
+        other = User(username='bob', name='Bob', password='-', household_id=seed['household'])
+        db.session.add(other)
+        db.session.flush()
+        start = datetime.now() - timedelta(hours=1)
+        db.session.add_all(
+            ListItem(name=f'Item {n}', shoppinglist_id=seed['list'], purchased=n % 3 == 0,
+                     added_by_user_id=seed['user'] if n % 2 else other.id, added_at=start + timedelta(seconds=n))
+            for n in range(count)
+        )
+        db.session.execute(db.update(ShoppingList).where(ShoppingList.id == seed['list'])
+                           .values(items_count=ShoppingList.items_count + count))
+        db.session.commit()
+
+
+def test_view_list_with_300_items(app, client, seed, statements):
+    add_items(app, seed, 300)
+    # Warm the user loader cache, which the count below is not about
+    client.get(f"/shopping/list/{seed['list']}")
+    statements.clear()
+
+    response = client.get(f"/shopping/list/{seed['list']}")
+
+    assert response.status_code == 200
+    assert len(statements) <= 3, statements
+
+
+def test_dashboard(app, client, seed, statements):
+    add_items(app, seed, 300)
+    with app.app_context():
+        db.session.add_all(ShoppingList(name=f'List {n}', household_id=seed['household'], created_by_user_id=seed['user'])
+                           for n in range(20))
+        db.session.commit()
+    client.get('/dashboard')
+    statements.clear()
+
+    response = client.get('/dashboard')
+
+    assert response.status_code == 200
+    assert len(statements) <= 3, statements
+
+
+def test_explain_queries_checks_the_item_page_query(app, database):
+    result = app.test_cli_runner().invoke(args=['explain-queries'])
+
+    assert result.exit_code == 0, result.output
+    section = result.output.split('== view_list: items of a list')[1].split('==')[0]
+    assert 'ORDER BY listitems.added_at, listitems.id' in section
+    assert 'LIMIT 101' in section
+    assert 'USING INDEX ix_listitems_shoppinglist_id_added_at' in section
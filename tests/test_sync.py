@@ -0,0 +1,62 @@
+"""
+Delta sync (/shopping/sync).
+"""
+
+
+def sync(client, cursor):
+    response = client.get('/shopping/sync', query_string={'since': cursor})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_deleted_item_is_reported(client, seed):
+    cursor = sync(client, None)['cursor']
+
+    client.post(f"/shopping/list/item/{seed['items'][0]}/delete")
+
+    delta = sync(client, cursor)
+    assert delta['deleted']['items'] == [seed['items'][0]]
+    assert delta['items'] == []
+
+
+def test_reused_item_id_is_not_reported_deleted(client, seed):
+    cursor = sync(client, None)['cursor']
+    last_id = seed['items'][-1]
+
+    client.post(f"/shopping/list/item/{last_id}/delete")
+    added = client.post(f"/shopping/list/{seed['list']}", json={'name': 'Butter'}).get_json()['item']
+    # SQLite gives the freed rowid to the next insert
+    assert added['id'] == last_id
+
+    delta = sync(client, cursor)
+    assert [item['id'] for item in delta['items']] == [last_id]
+    assert delta['deleted']['items'] == []
+
+
+def test_reused_list_id_is_not_reported_deleted(client, seed):
+    cursor = sync(client, None)['cursor']
+
+    client.post(f"/shopping/list/{seed['list']}/delete")
+    created = client.post('/shopping/create_list', json={'name': 'Groceries'}).get_json()['list']
+    assert created['id'] == seed['list']
+
+    delta = sync(client, cursor)
+    assert [shopping_list['id'] for shopping_list in delta['lists']] == [seed['list']]
+    assert delta['deleted']['lists'] == []
+
+
+def test_malformed_mutations_fail_on_their_own(client, seed):
+    response = client.post('/shopping/sync', json={'mutations': [
+        {'op': 'add', 'list_id': seed['list'], 'name': 'Jam', 'client_id': 'a'},
+        {'op': ['add'], 'list_id': seed['list'], 'name': 'x'},
+        {'op': 'toggle', 'list_id': {'id': 1}, 'item_id': seed['items'][0]},
+        {'op': 'toggle', 'list_id': seed['list'], 'item_id': [1]},
+        {'op': 'toggle', 'list_id': seed['list'], 'item_client_id': ['a'], 'client_id': 'b'},
+        {'op': 'toggle', 'list_id': seed['list'], 'item_client_id': 'a'},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, False, False, False, False, True]
+    assert results[4]['client_id'] == 'b'
+    assert results[5]['purchased'] is True
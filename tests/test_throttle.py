@@ -0,0 +1,48 @@
+"""
+Login throttling: failed attempts count against the username only for the
+client that made them, and successful logins never do.
+"""
+
+import re
+
+import pytest
+
+from app.extensions import db
+from app.models import User
+from app.passwords import password_hasher
+from app.throttle import throttle, MemoryBackend
+
+
+@pytest.fixture
+def throttled(app, seed, monkeypatch):
+    monkeypatch.setitem(app.config, 'THROTTLE_ENABLED', True)
+    # Cheap hashes; the throttle is what is under test
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_COST', 4)
+    monkeypatch.setattr(throttle, 'backend', MemoryBackend(throttle.limits, 60))
+    with app.app_context():
+        db.session.get(User, seed['user']).password = password_hasher.hash('right-password')
+        db.session.commit()
+
+
+def log_in(app, address, password):
+    client = app.test_client()
+    client.environ_base['REMOTE_ADDR'] = address
+    page = client.get('/auth').get_data(as_text=True)
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1)
+    return client.post('/auth', data={'action': 'login', 'username': 'alice', 'password': password,
+                                      'csrf_token': token}).status_code
+
+
+def test_failed_logins_do_not_lock_out_other_clients(app, throttled):
+    limit = app.config['THROTTLE_LOGIN_PER_USERNAME'].split('/')[0]
+    for _ in range(int(limit)):
+        assert log_in(app, '10.0.0.1', 'wrong') == 200
+
+    assert log_in(app, '10.0.0.1', 'right-password') == 429
+    assert log_in(app, '10.0.0.2', 'right-password') == 302
+
+
+def test_successful_logins_are_not_counted_against_the_username(app, throttled):
+    limit = app.config['THROTTLE_LOGIN_PER_USERNAME'].split('/')[0]
+    for _ in range(int(limit) + 1):
+        assert log_in(app, '10.0.0.1', 'right-password') == 302
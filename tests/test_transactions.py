@@ -0,0 +1,157 @@
+"""
+Every write endpoint commits its change and its activity rows together, in
+exactly one transaction.
+"""
+
+import io
+import re
+
+import pytest
+from PIL import Image
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import ActivityLog, Household, User
+from app.passwords import password_hasher
+
+
+@pytest.fixture
+def commits(app, database):
+    """
+    Counts COMMITs issued on the app's engine.
+    """
+    recorded = []
+
+    def record(conn):
+        recorded.append(conn)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'commit', record)
+    yield recorded
+    event.remove(engine, 'commit', record)
+
+
+def log_in(client, user_id):
+    with client.session_transaction() as session:
+        session.clear()
+        if user_id is not None:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+
+def form_token(client, url):
+    """
+    CSRF token from a page rendering one of the app's forms.
+    """
+    page = client.get(url).get_data(as_text=True)
+    return re.search(r'name="[\w-]*csrf_token" type="hidden" value="([^"]+)"', page).group(1)
+
+
+def add_member(app, seed, in_household=True):
+    with app.app_context():
+        user = User(username='bob', name='Bob', password='-', role='member' if in_household else None,
+                    household_id=seed['household'] if in_household else None)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), (200, 80, 40)).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+
+# Each entry prepares whatever the write needs and returns
+# (url, keyword arguments for client.post, whether it logs activity)
+
+def create_household(app, client, seed):
+    log_in(client, add_member(app, seed, in_household=False))
+    token = form_token(client, '/household/setup')
+    return '/household/setup', {'data': {'action': 'create', 'create-household_name': 'Flat',
+                                         'create-csrf_token': token}}, True
+
+
+def join_household(app, client, seed):
+    log_in(client, add_member(app, seed, in_household=False))
+    with app.app_context():
+        join_code = db.session.get(Household, seed['household']).join_code
+    token = form_token(client, '/household/setup')
+    return '/household/setup', {'data': {'action': 'join', 'join-join_code': join_code,
+                                         'join-csrf_token': token}}, True
+
+
+def leave_household(app, client, seed):
+    log_in(client, add_member(app, seed))
+    return '/household/leave', {}, True
+
+
+def remove_member(app, client, seed):
+    return f"/household/remove_member/{add_member(app, seed)}", {}, True
+
+
+def change_avatar(app, client, seed):
+    token = form_token(client, '/settings/account')
+    return '/settings/account/change_avatar', {'data': {'avatar_upload': (png(), 'me.png'), 'csrf_token': token},
+                                               'content_type': 'multipart/form-data'}, False
+
+
+def change_password(app, client, seed):
+    with app.app_context():
+        db.session.get(User, seed['user']).password = password_hasher.hash('old-secret')
+        db.session.commit()
+    token = form_token(client, '/settings/account')
+    return '/settings/settings/change-password', {'data': {'old_password': 'old-secret', 'new_password': 'new-secret',
+                                                           'confirm_password': 'new-secret', 'csrf_token': token}}, False
+
+
+def register(app, client, seed):
+    log_in(client, None)
+    token = form_token(client, '/auth')
+    return '/auth', {'data': {'action': 'register', 'name': 'Carol', 'username': 'carol', 'password': 'secret1',
+                              'confirm_password': 'secret1', 'csrf_token': token}}, False
+
+
+WRITES = {
+    'create_list': lambda app, client, seed: ('/shopping/create_list', {'json': {'name': 'Hardware'}}, True),
+    'add_item': lambda app, client, seed: (f"/shopping/list/{seed['list']}", {'json': {'name': 'Butter'}}, True),
+    'toggle': lambda app, client, seed: (f"/shopping/list/item/{seed['items'][0]}/toggle_purchase", {}, True),
+    'delete_item': lambda app, client, seed: (f"/shopping/list/item/{seed['items'][0]}/delete", {}, True),
+    'clear_purchased': lambda app, client, seed: (f"/shopping/list/{seed['list']}/items/clear_purchased", {}, True),
+    'batch': lambda app, client, seed: (f"/shopping/list/{seed['list']}/batch", {'json': {'operations': [
+        {'op': 'add', 'name': 'Jam'},
+        {'op': 'toggle', 'item_id': seed['items'][0]},
+        {'op': 'rename', 'item_id': seed['items'][1], 'name': 'Rye bread'},
+        {'op': 'delete', 'item_id': seed['items'][2]},
+    ]}}, True),
+    'create_household': create_household,
+    'join_household': join_household,
+    'leave_household': leave_household,
+    'rename_household': lambda app, client, seed: (f"/household/rename/{seed['household']}",
+                                                   {'json': {'new_name': 'House'}}, True),
+    'remove_member': remove_member,
+    'regenerate_code': lambda app, client, seed: ('/household/regenerate_code', {}, False),
+    # Activity rows belong to the household, so deleting it leaves none behind
+    'delete_household': lambda app, client, seed: (f"/household/delete/{seed['household']}", {}, False),
+    'change_name': lambda app, client, seed: ('/settings/change-name', {'json': {'new_name': 'Ali'}}, True),
+    'change_avatar': change_avatar,
+    'change_password': change_password,
+    'register': register,
+}
+
+
+@pytest.mark.parametrize('endpoint', WRITES)
+def test_write_endpoint_commits_once(app, client, seed, commits, endpoint):
+    url, post, logs_activity = WRITES[endpoint](app, client, seed)
+    before = len(commits)
+
+    response = client.post(url, **post)
+
+    assert response.status_code in (200, 201, 302), response.get_data(as_text=True)
+    assert len(commits) - before == 1
+    if logs_activity:
+        with app.app_context():
+            # The activity rows went out in that same commit
+            assert db.session.query(ActivityLog).count() >= 1
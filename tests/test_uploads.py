@@ -0,0 +1,35 @@
+"""
+`flask uploads gc` removes avatar files from before the upload storage once
+no user refers to them.
+"""
+
+import os
+import time
+
+from app.extensions import db
+from app.models import User
+from app.storage import upload_storage, LocalBackend
+
+
+def test_gc_deletes_unreferenced_legacy_avatars(app, seed, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, 'legacy', LocalBackend(str(tmp_path)))
+    folder = tmp_path / 'avatars'
+    (folder / 'blob').mkdir(parents=True)
+    old = time.time() - 48 * 3600
+    names = ['1_me.jpg', '2_pic.jpg', '3_gone.jpg', 'blob/64.jpg']
+    for name in names:
+        (folder / name).write_bytes(b'x')
+        os.utime(folder / name, (old, old))
+    (folder / '4_recent.jpg').write_bytes(b'x')
+    with app.app_context():
+        db.session.get(User, seed['user']).avatar_url = '/files/uploads/avatars/1_me.jpg'
+        db.session.add(User(username='bob', name='Bob', password='-', household_id=seed['household'],
+                            avatar_url='/files/uploads/avatars/2_pic.jpg'))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['uploads', 'gc'])
+
+    assert result.exit_code == 0, result.output
+    assert '1 unused legacy avatars' in result.output
+    remaining = sorted(str(path.relative_to(folder)) for path in folder.rglob('*') if path.is_file())
+    assert remaining == ['1_me.jpg', '2_pic.jpg', '4_recent.jpg', 'blob/64.jpg']